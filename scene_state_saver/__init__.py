@@ -0,0 +1,4693 @@
+"""
+Scene State Saver - Blender Plugin
+A modular addon for saving and loading scene states in Blender.
+
+Author: Scene State Saver Team
+Version: 1.0.0
+License: GPL-3.0
+"""
+
+bl_info = {
+    "name": "Scene State Saver",
+    "author": "Scene State Saver Team",
+    "version": (1, 0, 0),
+    "blender": (3, 0, 0),
+    "location": "View3D > N-Panel > Scene States",
+    "description": "Save and load scene states (object transforms and visibility)",
+    "warning": "",
+    "doc_url": "",
+    "category": "Scene",
+}
+
+import bpy
+from bpy.props import StringProperty, BoolProperty, IntProperty, EnumProperty
+from bpy.types import PropertyGroup, AddonPreferences, Panel, Operator
+import json
+import copy
+import datetime
+import os
+import re
+import sys
+import argparse
+import contextlib
+import importlib
+import collections
+import itertools
+import hashlib
+import tempfile
+import atexit
+import time
+import io
+import cProfile
+import pstats
+import tracemalloc
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
+
+if "store" in locals():
+    # Reloading the addon must pick up changes of the storage layer too
+    importlib.reload(store)
+else:
+    from . import store
+
+from .store import (
+    JSON_EXTENSION, LOCK_TIMEOUT,
+    instrumentation, FileIO, DataHandler, StateBlocks, StatesStore, StatesFileScanner,
+)
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+PLUGIN_NAME = "Scene State Saver"
+PLUGIN_VERSION = "1.0.0"
+STATES_SUFFIX = "_states"
+DEFAULT_STATE_NAME = "New State"
+PERFORMANCE_WARNING_THRESHOLD = 100
+PANEL_CATEGORY = "Scene States"
+PANEL_LABEL = "Scene States"
+
+# Error Messages
+ERROR_UNSAVED_BLEND = "Please save your .blend file before creating states"
+ERROR_STATE_EXISTS = "State with this name already exists"
+ERROR_STATE_NOT_FOUND = "State not found"
+ERROR_BATCH_ACTIVE = "A batch is already in progress"
+
+# Success Messages
+SUCCESS_STATE_SAVED = "State saved successfully"
+SUCCESS_STATE_LOADED = "State loaded successfully"
+SUCCESS_STATE_UPDATED = "State updated successfully"
+SUCCESS_STATE_DELETED = "State deleted successfully"
+SUCCESS_LOAD_REVERTED = "Last load reverted"
+SUCCESS_STATE_RENAMED = "State renamed successfully"
+SUCCESS_STATE_DUPLICATED = "State duplicated successfully"
+SUCCESS_BATCH_COMMITTED = "Batch committed"
+SUCCESS_STATES_BAKED = "States baked to keyframes"
+
+# Auto Snapshot Settings
+AUTO_SNAPSHOT_PREFIX = "auto-"
+AUTO_SNAPSHOT_PATTERN = re.compile(r"^auto-(\d+)$")
+SUCCESS_SNAPSHOT_SAVED = "Automatic snapshot saved"
+
+# Library Settings
+LIBRARY_INDEX_FILENAME = "library_index.json"
+LIBRARY_INDEX_VERSION = 1
+CONFLICT_POLICIES = [
+    ('SKIP', "Skip", "Keep the existing state"),
+    ('OVERWRITE', "Overwrite", "Replace the existing state"),
+    ('RENAME', "Rename", "Import under a new, numbered name"),
+    ('NEWER', "Keep Newer", "Keep whichever state was updated last"),
+]
+SUCCESS_STATES_IMPORTED = "States imported"
+SUCCESS_STATES_PUBLISHED = "States published to library"
+
+# Diff Settings
+LIVE_SCENE_KEY = "@live"
+DIFF_EPSILON = 1e-5
+DIFF_RESULT_LIMIT = 1000
+
+# Bake Settings
+BAKE_ACTION_SUFFIX = "_StateBake"
+BAKE_EPSILON = 1e-6
+
+# Warning Messages
+WARNING_PERFORMANCE = "Large scene detected ({} objects). Processing may take time."
+WARNING_MISSING_OBJECTS = "Some objects from the state were not found in the current scene"
+WARNING_WRITE_FAILED = "The states file could not be written, retrying in the background"
+WARNING_WRITES_PENDING = "States file writes are still pending"
+
+# Property Spec Settings
+PROPERTY_SPEC_ENTRY_PATTERN = re.compile(r"^\s*(\*|[A-Za-z_]+)\s*:\s*(.+?)\s*$")
+PROPERTY_SPEC_DATA_PATTERN = re.compile(r"^data\.(\w+)$")
+PROPERTY_SPEC_ITEMS_PATTERN = re.compile(r"^(\w+)\[\*\]\.(\w+)$")
+PROPERTY_SPEC_ATTRIBUTE_PATTERN = re.compile(r"^\w+$")
+PROPERTY_SPEC_PATH_PATTERN = re.compile(r'^(\w+|\["[^"]+"\])(\.\w+|\["[^"]+"\]|\[\d+\]|\[\*\])*$')
+
+# Revert Buffer Settings
+DEFAULT_REVERT_BUFFER_SIZE = 10
+
+# Shared Storage Settings
+STATES_CACHE_DIRNAME = "scene_state_saver_cache"
+
+# History Settings
+DEFAULT_HISTORY_DEPTH = 5
+SUCCESS_VERSION_RESTORED = "State version restored"
+
+# Compression Settings
+COMPRESSION_POLICIES = [
+    ('NONE', "None", "Store states as plain JSON"),
+    ('FAST', "Fast", "Compress with fast zlib, for the quickest saves"),
+    ('BALANCED', "Balanced", "Compress with zlib, and with lzma for large states"),
+    ('SMALLEST', "Smallest", "Try zlib, bz2 and lzma and keep the smallest result"),
+]
+
+# Profiler Settings
+PROFILE_SUFFIX = "_profile"
+PROFILE_STATS_EXTENSION = ".pstats"
+PROFILE_SUMMARY_EXTENSION = ".txt"
+PROFILE_TOP_FUNCTIONS = 30
+PROFILE_TOP_ALLOCATIONS = 15
+
+# ============================================================================
+# PROFILER
+# ============================================================================
+
+class Profiler:
+    """One-shot cProfile and tracemalloc capture of the next state operation.
+
+    Armed from the Performance panel; the next save, load, update or refresh is
+    profiled and a .pstats file plus a text summary are written next to the
+    states file, then the profiler disarms itself.
+    """
+
+    def __init__(self):
+        self.armed = False
+        # Path of the last written summary, shown in the panel
+        self.last_report = ""
+
+    @contextlib.contextmanager
+    def capture(self, operation: str, state_name: str = ""):
+        """Profile the body if the profiler is armed."""
+        if not self.armed:
+            yield
+            return
+
+        self.armed = False
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        flushed = None
+        profile.enable()
+        try:
+            yield
+            # Background writes belong to the operation, they only show up as the wait here.
+            # Bounded, a failing commit is retried forever and must not freeze the UI
+            flushed = state_manager.flush(LOCK_TIMEOUT)
+        finally:
+            profile.disable()
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            snapshot = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+
+            try:
+                self.last_report = self.write_report(profile, operation, state_name, seconds, peak, snapshot,
+                                                     flushed)
+                print(f"Profile written: {self.last_report}")
+            except Exception as e:
+                print(f"Error writing profile: {e}")
+
+    @staticmethod
+    def count_scene_data(scene: bpy.types.Scene) -> Tuple[int, int]:
+        """Count the objects and pose bones of a scene."""
+        objects = scene.objects
+        bones = sum(len(obj.pose.bones) for obj in objects if obj.type == 'ARMATURE' and obj.pose)
+        return len(objects), bones
+
+    def write_report(self, profile: cProfile.Profile, operation: str, state_name: str, seconds: float,
+                     peak: int, snapshot: tracemalloc.Snapshot, flushed: Optional[bool] = None) -> str:
+        """Write the .pstats file and the text summary; returns the summary path.
+
+        Flushed tells whether the background writes were committed in time, None if
+        the operation failed before waiting for them.
+        """
+        states_path = FileManager.get_states_file_path()
+        if not states_path:
+            raise ValueError("Blend file must be saved")
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        base_path = f"{os.path.splitext(states_path)[0]}{PROFILE_SUFFIX}_{operation}_{timestamp}"
+        profile.dump_stats(base_path + PROFILE_STATS_EXTENSION)
+
+        object_count, bone_count = self.count_scene_data(bpy.context.scene)
+        file_size = os.path.getsize(states_path) if os.path.exists(states_path) else 0
+
+        summary = io.StringIO()
+        summary.write(f"Operation: {operation}\n")
+        if state_name:
+            summary.write(f"State: {state_name}\n")
+        summary.write(f"Date: {datetime.datetime.now().isoformat()}\n")
+        summary.write(f"Blender: {'.'.join(map(str, bpy.app.version))}\n")
+        summary.write(f"Duration: {seconds * 1000:.1f} ms\n")
+        summary.write(f"Peak memory: {peak / (1 << 20):.2f} MiB\n")
+        summary.write(f"Objects: {object_count}, pose bones: {bone_count}\n")
+        summary.write(f"States file: {states_path} ({file_size} bytes)\n")
+        if flushed is False:
+            summary.write(f"Background writes: still pending after {LOCK_TIMEOUT:.0f} s, "
+                          f"not included in the duration\n")
+        elif flushed:
+            summary.write("Background writes: committed\n")
+
+        summary.write(f"\nTop {PROFILE_TOP_FUNCTIONS} functions by cumulative time:\n")
+        pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+
+        summary.write(f"Top {PROFILE_TOP_ALLOCATIONS} allocations by size:\n")
+        for statistic in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]:
+            summary.write(f"  {statistic}\n")
+
+        summary_path = base_path + PROFILE_SUMMARY_EXTENSION
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(summary.getvalue())
+        return summary_path
+
+# Global instance
+profiler = Profiler()
+
+def get_addon_preferences():
+    """Get the addon preferences, or None while the addon is not enabled."""
+    addon = bpy.context.preferences.addons.get(__name__)
+    return addon.preferences if addon else None
+
+# ============================================================================
+# FILE MANAGER
+# ============================================================================
+
+class FileManager(FileIO):
+    """Manages file operations and path handling for state files."""
+    
+    @staticmethod
+    def get_blend_file_path():
+        """Get the current .blend file path."""
+        return bpy.data.filepath
+    
+    @staticmethod
+    def is_blend_file_saved():
+        """Check if the current .blend file is saved."""
+        return bool(bpy.data.filepath)
+    
+    @staticmethod
+    def get_blend_file_name():
+        """Get the current .blend file name without extension."""
+        if not FileManager.is_blend_file_saved():
+            return None
+        
+        blend_path = FileManager.get_blend_file_path()
+        return os.path.splitext(os.path.basename(blend_path))[0]
+    
+    @staticmethod
+    def get_blend_directory():
+        """Get the directory containing the current .blend file."""
+        if not FileManager.is_blend_file_saved():
+            return None
+        
+        blend_path = FileManager.get_blend_file_path()
+        return os.path.dirname(blend_path)
+    
+    @staticmethod
+    def get_states_file_path():
+        """Get the full path to the states JSON file."""
+        if not FileManager.is_blend_file_saved():
+            return None
+        
+        blend_name = FileManager.get_blend_file_name()
+        blend_dir = FileManager.get_blend_directory()
+        
+        if not blend_name or not blend_dir:
+            return None
+        
+        states_filename = f"{blend_name}{STATES_SUFFIX}{JSON_EXTENSION}"
+        return os.path.join(blend_dir, states_filename)
+    
+    @staticmethod
+    def states_file_exists():
+        """Check if the states file exists."""
+        states_path = FileManager.get_states_file_path()
+        return states_path and os.path.exists(states_path)
+
+    @staticmethod
+    def validate_blend_file_saved():
+        """Validate that the .blend file is saved, raise exception if not."""
+        if not FileManager.is_blend_file_saved():
+            raise ValueError(ERROR_UNSAVED_BLEND)
+
+# ============================================================================
+# OBJECT CAPTURE
+# ============================================================================
+
+class ObjectCapture:
+    """Captures object transforms and visibility from the current scene."""
+    
+    @staticmethod
+    def get_all_objects() -> List[bpy.types.Object]:
+        """Get all objects in the current scene."""
+        return list(bpy.context.scene.objects)
+    
+    @staticmethod
+    def get_view_layer(scene: bpy.types.Scene) -> bpy.types.ViewLayer:
+        """Get the view layer the Eye-Button state of a scene is read from and written to."""
+        if scene == bpy.context.scene:
+            return bpy.context.view_layer
+        return scene.view_layers[0]
+    
+    @staticmethod
+    def capture_object_data(obj: bpy.types.Object, view_layer: Optional[bpy.types.ViewLayer] = None) -> Dict[str, Any]:
+        """Capture transform and visibility data for a single object."""
+        data = {
+            "location": list(obj.location),
+            "rotation_euler": list(obj.rotation_euler),
+            "scale": list(obj.scale),
+            "hide_viewport": obj.hide_viewport,
+            "hide_render": obj.hide_render,
+            # Capture the actual hide_set() status
+            "hide_set": obj.hide_get(view_layer=view_layer) if view_layer else obj.hide_get()
+        }
+        
+        # Capture bone poses for armatures
+        if obj.type == 'ARMATURE' and obj.pose:
+            data["bone_poses"] = ObjectCapture.capture_bone_poses(obj)
+        
+        return data
+    
+    @staticmethod
+    def capture_bone_poses(armature_obj: bpy.types.Object) -> Dict[str, Dict[str, Any]]:
+        """Capture bone pose data for an armature object."""
+        if armature_obj.type != 'ARMATURE' or not armature_obj.pose:
+            return {}
+        
+        bone_data = {}
+        for pose_bone in armature_obj.pose.bones:
+            # Get the current rotation values based on the rotation mode
+            if pose_bone.rotation_mode == 'QUATERNION':
+                # For quaternion mode, use the quaternion values
+                current_quat = pose_bone.rotation_quaternion.copy()
+                # Convert to euler for backup
+                current_euler = current_quat.to_euler()
+            else:
+                # For euler modes, use the euler values
+                current_euler = pose_bone.rotation_euler.copy()
+                # Convert to quaternion for backup
+                current_quat = current_euler.to_quaternion()
+            
+            bone_data[pose_bone.name] = {
+                "location": list(pose_bone.location),
+                "rotation_euler": list(current_euler),
+                "rotation_quaternion": list(current_quat),
+                "scale": list(pose_bone.scale),
+                "rotation_mode": pose_bone.rotation_mode
+            }
+        
+        return bone_data
+    
+    @staticmethod
+    def capture_all_objects(property_spec: str = "") -> Dict[str, Dict[str, Any]]:
+        """Capture data for all objects in the scene, plus the properties of the given spec."""
+        objects = ObjectCapture.get_all_objects()
+        
+        # Performance warning
+        if len(objects) >= PERFORMANCE_WARNING_THRESHOLD:
+            print(WARNING_PERFORMANCE.format(len(objects)))
+        
+        objects_data = {}
+        for obj in objects:
+            objects_data[obj.name] = ObjectCapture.capture_object_data(obj)
+        
+        if property_spec:
+            PropertySpec.compile(property_spec).capture(bpy.context.scene.objects, objects_data)
+        
+        return objects_data
+    
+    @staticmethod
+    def capture_scenes(scenes: List[bpy.types.Scene], property_spec: str = "",
+                       capture_collections: bool = False) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """Capture several scenes in one pass; returns (objects data, scenes data).
+        
+        Objects linked into several scenes are captured once. Per scene, the names of
+        its objects, the ones hidden in its view layer (the Eye-Button state is per view
+        layer) and a hash of its content are stored.
+        """
+        objects_data = {}
+        scenes_data = {}
+        for scene in scenes:
+            view_layer = ObjectCapture.get_view_layer(scene)
+            for obj in scene.objects:
+                if obj.name not in objects_data:
+                    objects_data[obj.name] = ObjectCapture.capture_object_data(obj, view_layer)
+            
+            scene_data = {
+                "objects": scene.objects.keys(),
+                "view_layer": view_layer.name,
+                "hidden": [obj.name for obj in scene.objects if obj.hide_get(view_layer=view_layer)],
+                "hash": ObjectCapture.hash_scene(scene, view_layer, property_spec),
+            }
+            if capture_collections:
+                scene_data["collections"] = CollectionVisibility.capture(view_layer)
+            scenes_data[scene.name] = scene_data
+        
+        # Performance warning
+        if len(objects_data) >= PERFORMANCE_WARNING_THRESHOLD:
+            print(WARNING_PERFORMANCE.format(len(objects_data)))
+        
+        if property_spec:
+            PropertySpec.compile(property_spec).capture(bpy.data.objects, objects_data)
+        
+        return objects_data, scenes_data
+    
+    @staticmethod
+    def hash_scene(scene: bpy.types.Scene, view_layer: Optional[bpy.types.ViewLayer] = None,
+                   property_spec: str = "") -> str:
+        """Cheaply hash the transforms and visibility of all objects in a scene.
+        
+        The Eye-Button state is read from the given view layer (the active one by
+        default) and the properties of the spec are included when one is given.
+        """
+        objects = scene.objects
+        count = len(objects)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update("\0".join(objects.keys()).encode("utf-8"))
+
+        # Bulk reads straight from RNA, no per-object Python attribute access
+        vectors = np.empty(count * 3, dtype=np.float32)
+        for attribute in ("location", "rotation_euler", "scale"):
+            objects.foreach_get(attribute, vectors)
+            digest.update(vectors.tobytes())
+
+        flags = np.empty(count, dtype=bool)
+        for attribute in ("hide_viewport", "hide_render"):
+            objects.foreach_get(attribute, flags)
+            digest.update(flags.tobytes())
+
+        # The Eye-Button state has no bulk accessor
+        if view_layer:
+            digest.update(bytes(obj.hide_get(view_layer=view_layer) for obj in objects))
+        else:
+            digest.update(bytes(obj.hide_get() for obj in objects))
+
+        for view_layer in scene.view_layers:
+            digest.update(json.dumps(CollectionVisibility.capture(view_layer), sort_keys=True).encode("utf-8"))
+
+        for obj in objects:
+            if obj.type != 'ARMATURE' or not obj.pose:
+                continue
+
+            bones = obj.pose.bones
+            for attribute, length in (("location", 3), ("rotation_quaternion", 4),
+                                      ("rotation_euler", 3), ("scale", 3)):
+                values = np.empty(len(bones) * length, dtype=np.float32)
+                bones.foreach_get(attribute, values)
+                digest.update(values.tobytes())
+
+        if property_spec:
+            props_data = {name: {} for name in objects.keys()}
+            PropertySpec.compile(property_spec).capture(objects, props_data)
+            digest.update(json.dumps(props_data, sort_keys=True).encode("utf-8"))
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def apply_object_data(obj: bpy.types.Object, obj_data: Dict[str, Any], in_view_layer: bool = True,
+                          view_layer: Optional[bpy.types.ViewLayer] = None,
+                          implied_flags: Optional[Tuple[bool, bool, bool]] = None) -> bool:
+        """Apply captured data to an object.
+        
+        Visibility flags are only written where they differ, since every write dirties
+        the view layer. Flags that match implied_flags, the (hide_viewport, hide_render,
+        hide_set) its collections imply, are left to the collections without reading
+        them. Objects outside the view layer (e.g. in excluded collections) have no
+        Eye-Button state to restore. The Eye-Button state is written to the given view
+        layer, the active one by default.
+        """
+        try:
+            # Apply transforms
+            obj.location = obj_data["location"]
+            obj.rotation_euler = obj_data["rotation_euler"]
+            obj.scale = obj_data["scale"]
+            
+            # Apply visibility properly
+            hide_viewport = obj_data["hide_viewport"]
+            hide_render = obj_data["hide_render"]
+            
+            # Set visibility properties
+            implied_viewport, implied_render, implied_hide = implied_flags or (None, None, None)
+            if hide_viewport != implied_viewport and obj.hide_viewport != hide_viewport:
+                obj.hide_viewport = hide_viewport
+            if hide_render != implied_render and obj.hide_render != hide_render:
+                obj.hide_render = hide_render
+            
+            # Apply the hide_set status (Eye-Button status), older states fall back to hide_viewport
+            hide_set_status = obj_data.get("hide_set", hide_viewport)
+            if in_view_layer and hide_set_status != implied_hide:
+                if view_layer:
+                    if obj.hide_get(view_layer=view_layer) != hide_set_status:
+                        obj.hide_set(hide_set_status, view_layer=view_layer)
+                elif obj.hide_get() != hide_set_status:
+                    obj.hide_set(hide_set_status)
+            
+            # Apply bone poses for armatures
+            if obj.type == 'ARMATURE' and "bone_poses" in obj_data:
+                ObjectCapture.apply_bone_poses(obj, obj_data["bone_poses"])
+            
+            return True
+            
+        except Exception as e:
+            print(f"Error applying data to object {obj.name}: {e}")
+            return False
+    
+    @staticmethod
+    def apply_bone_poses(armature_obj: bpy.types.Object, bone_poses: Dict[str, Dict[str, Any]]) -> bool:
+        """Apply bone pose data to an armature object."""
+        if armature_obj.type != 'ARMATURE' or not armature_obj.pose:
+            return False
+        
+        try:
+            for bone_name, bone_data in bone_poses.items():
+                pose_bone = armature_obj.pose.bones.get(bone_name)
+                if pose_bone:
+                    # Apply transforms
+                    pose_bone.location = bone_data["location"]
+                    pose_bone.scale = bone_data["scale"]
+                    
+                    # Set rotation mode first, then apply rotation
+                    if "rotation_mode" in bone_data:
+                        target_mode = bone_data["rotation_mode"]
+                        pose_bone.rotation_mode = target_mode
+                        
+                        # Apply rotation based on the target mode
+                        if target_mode == 'QUATERNION':
+                            pose_bone.rotation_quaternion = bone_data["rotation_quaternion"]
+                        else:
+                            pose_bone.rotation_euler = bone_data["rotation_euler"]
+                    else:
+                        # Fallback: apply both and let Blender handle conversion
+                        pose_bone.rotation_euler = bone_data["rotation_euler"]
+                        if pose_bone.rotation_mode == 'QUATERNION':
+                            pose_bone.rotation_quaternion = bone_data["rotation_quaternion"]
+            
+            return True
+            
+        except Exception as e:
+            print(f"Error applying bone poses to {armature_obj.name}: {e}")
+            return False
+    
+    @staticmethod
+    def refresh_scene(scenes: Optional[List[bpy.types.Scene]] = None) -> None:
+        """Force a complete scene and viewport update after applying data.
+        
+        When scenes are given only their view layers are updated.
+        """
+        if scenes is None:
+            bpy.context.view_layer.update()
+        else:
+            for scene in scenes:
+                for view_layer in scene.view_layers:
+                    view_layer.update()
+        
+        # Without a UI only the active view layer is rendered or exported
+        if bpy.app.background:
+            return
+        
+        # Force update of all view layers
+        if scenes is None:
+            for scene in bpy.data.scenes:
+                for view_layer in scene.view_layers:
+                    view_layer.update()
+        
+        # Force redraw of all areas
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                area.tag_redraw()
+        
+        # Force depsgraph update
+        bpy.context.evaluated_depsgraph_get().update()
+    
+    @staticmethod
+    def apply_all_objects(objects_data: Dict[str, Dict[str, Any]], property_spec: str = "",
+                          objects_by_name: Optional[Dict[str, bpy.types.Object]] = None,
+                          collections_data: Optional[Dict[str, Dict[str, bool]]] = None) -> Dict[str, bool]:
+        """Apply captured data to all objects in the scene.
+        
+        Collection visibility is applied first, and per-object flags that match what
+        the collections imply are skipped. Callers applying many states can pass a
+        name -> object map built once up front.
+        """
+        results = {}
+        missing_objects = []
+        
+        # scene.objects.get() searches the scene, so look objects up in a map built once
+        if objects_by_name is None:
+            objects_by_name = {obj.name: obj for obj in bpy.context.scene.objects}
+        
+        view_layer = bpy.context.view_layer
+        implied = {}
+        if collections_data:
+            CollectionVisibility.apply(view_layer, collections_data)
+            implied = CollectionVisibility.implied_object_flags(view_layer)
+        view_layer_objects = set(view_layer.objects.keys())
+        
+        for obj_name, obj_data in objects_data.items():
+            obj = objects_by_name.get(obj_name)
+            if obj:
+                results[obj_name] = ObjectCapture.apply_object_data(
+                    obj, obj_data, obj_name in view_layer_objects, implied_flags=implied.get(obj_name)
+                )
+            else:
+                missing_objects.append(obj_name)
+                results[obj_name] = False
+        
+        # Spec properties are applied in grouped bulk operations
+        if property_spec:
+            PropertySpec.compile(property_spec).apply(bpy.context.scene.objects, objects_data)
+        
+        ObjectCapture.refresh_scene()
+        
+        # Report missing objects
+        if missing_objects:
+            print(WARNING_MISSING_OBJECTS)
+            print(f"Missing objects: {', '.join(missing_objects)}")
+        
+        return results
+    
+    @staticmethod
+    def get_state_scenes(scenes_data: Dict[str, Dict[str, Any]]) -> List[Tuple[bpy.types.Scene, bpy.types.ViewLayer]]:
+        """Resolve the scenes of a multi-scene state and their view layers, skipping deleted scenes."""
+        resolved = []
+        for scene_name, scene_data in scenes_data.items():
+            scene = bpy.data.scenes.get(scene_name)
+            if scene is None:
+                print(f"Warning: Scene '{scene_name}' no longer exists")
+                continue
+            view_layer = scene.view_layers.get(scene_data.get("view_layer", "")) or ObjectCapture.get_view_layer(scene)
+            resolved.append((scene, view_layer))
+        return resolved
+    
+    @staticmethod
+    def apply_scenes(state_data: Dict[str, Any]) -> Dict[str, bool]:
+        """Apply a multi-scene state, skipping the scenes whose content already matches it.
+        
+        All hashes are compared before anything is written. Objects shared by several
+        changed scenes are written once, only their Eye-Button state is per scene, and
+        only the changed scenes are refreshed.
+        """
+        objects_data = state_data["objects"]
+        property_spec = state_data.get("property_spec", "")
+        scenes_data = state_data["scenes"]
+        
+        changed = [
+            (scene, view_layer) for scene, view_layer in ObjectCapture.get_state_scenes(scenes_data)
+            if ObjectCapture.hash_scene(scene, view_layer, property_spec) != scenes_data[scene.name].get("hash")
+        ]
+        
+        results = {}
+        missing_objects = []
+        for scene, view_layer in changed:
+            scene_data = scenes_data[scene.name]
+            implied = {}
+            if scene_data.get("collections"):
+                CollectionVisibility.apply(view_layer, scene_data["collections"])
+                implied = CollectionVisibility.implied_object_flags(view_layer)
+            
+            view_layer_objects = set(view_layer.objects.keys())
+            hidden = set(scene_data.get("hidden", ()))
+            objects_by_name = {obj.name: obj for obj in scene.objects}
+            
+            for obj_name in scene_data["objects"]:
+                obj = objects_by_name.get(obj_name)
+                if obj is None or obj_name not in objects_data:
+                    missing_objects.append(obj_name)
+                    continue
+                
+                hide_set_status = obj_name in hidden
+                implied_flags = implied.get(obj_name)
+                if obj_name not in results:
+                    obj_data = dict(objects_data[obj_name], hide_set=hide_set_status)
+                    results[obj_name] = ObjectCapture.apply_object_data(
+                        obj, obj_data, obj_name in view_layer_objects, view_layer, implied_flags
+                    )
+                elif (obj_name in view_layer_objects and (not implied_flags or hide_set_status != implied_flags[2])
+                      and obj.hide_get(view_layer=view_layer) != hide_set_status):
+                    obj.hide_set(hide_set_status, view_layer=view_layer)
+        
+        # Spec properties are applied in grouped bulk operations
+        if property_spec and results:
+            PropertySpec.compile(property_spec).apply(
+                bpy.data.objects, {name: objects_data[name] for name in results}
+            )
+        
+        if changed:
+            ObjectCapture.refresh_scene([scene for scene, _ in changed])
+        print(f"Applied {len(changed)}/{len(scenes_data)} scenes ({len(scenes_data) - len(changed)} unchanged)")
+        
+        # Report missing objects
+        if missing_objects:
+            print(WARNING_MISSING_OBJECTS)
+            print(f"Missing objects: {', '.join(sorted(set(missing_objects)))}")
+        
+        return results
+
+# ============================================================================
+# COLLECTION VISIBILITY
+# ============================================================================
+
+class CollectionVisibility:
+    """Captures and applies the visibility flags of collections.
+
+    Per view layer: exclude and hide_viewport of each LayerCollection; per
+    collection: its global hide_viewport and hide_render. Flags are keyed by
+    collection name, a collection linked in several places shares its flags.
+    """
+
+    # (key, on the collection instead of the layer collection, attribute)
+    FLAGS = [
+        ("exclude", False, "exclude"),
+        ("hide", False, "hide_viewport"),
+        ("hide_viewport", True, "hide_viewport"),
+        ("hide_render", True, "hide_render"),
+    ]
+
+    @staticmethod
+    def iter_layer_collections(layer_collection):
+        """Yield all layer collections below the given one, parents first."""
+        for child in layer_collection.children:
+            yield child
+            yield from CollectionVisibility.iter_layer_collections(child)
+
+    @staticmethod
+    def capture(view_layer: bpy.types.ViewLayer) -> Dict[str, Dict[str, bool]]:
+        """Capture the collection flags of a view layer."""
+        collections_data = {}
+        for layer_collection in CollectionVisibility.iter_layer_collections(view_layer.layer_collection):
+            if layer_collection.name in collections_data:
+                continue
+            collections_data[layer_collection.name] = {
+                key: getattr(layer_collection.collection if on_collection else layer_collection, attribute)
+                for key, on_collection, attribute in CollectionVisibility.FLAGS
+            }
+        return collections_data
+
+    @staticmethod
+    def apply(view_layer: bpy.types.ViewLayer, collections_data: Dict[str, Dict[str, bool]]) -> int:
+        """Apply captured collection flags, writing only the ones that differ; returns the number of writes."""
+        writes = 0
+        for layer_collection in CollectionVisibility.iter_layer_collections(view_layer.layer_collection):
+            flags = collections_data.get(layer_collection.name)
+            if flags is None:
+                continue
+
+            for key, on_collection, attribute in CollectionVisibility.FLAGS:
+                target = layer_collection.collection if on_collection else layer_collection
+                if key in flags and getattr(target, attribute) != flags[key]:
+                    setattr(target, attribute, flags[key])
+                    writes += 1
+
+        return writes
+
+    @staticmethod
+    def implied_object_flags(view_layer: bpy.types.ViewLayer) -> Dict[str, Tuple[bool, bool, bool]]:
+        """Get the (hide_viewport, hide_render, hide_set) flags the collections of a view layer
+        imply for their objects.
+
+        A collection implies a flag when it or one of its parents sets it, an object in
+        several collections only when all of them do. Only the object names of each
+        collection are read, nothing per object.
+        """
+        root = view_layer.layer_collection
+        implied = {name: (False, False, False) for name in root.collection.objects.keys()}
+
+        pending = [(child, (False, False, False)) for child in root.children]
+        while pending:
+            layer_collection, parent_flags = pending.pop()
+            collection = layer_collection.collection
+            flags = (
+                parent_flags[0] or collection.hide_viewport,
+                parent_flags[1] or collection.hide_render,
+                parent_flags[2] or layer_collection.hide_viewport,
+            )
+            for name in collection.objects.keys():
+                previous = implied.get(name)
+                implied[name] = flags if previous is None else tuple(a and b for a, b in zip(previous, flags))
+            pending.extend((child, flags) for child in layer_collection.children)
+
+        return implied
+
+# ============================================================================
+# PROPERTY SPEC
+# ============================================================================
+
+class PropertySpec:
+    """Parses declarative property specs and compiles them into grouped accessors.
+
+    A spec is a comma separated list of 'TYPE:path' entries, where TYPE is an
+    object type (LIGHT, CAMERA, MESH, ...) or '*' for all objects:
+
+        LIGHT:data.energy, LIGHT:data.color, CAMERA:data.lens,
+        *:modifiers[*].show_viewport, *:["my_prop"], MESH:material_slots[*].material
+    """
+
+    # Object type -> (bpy.data collection, RNA struct) of its data-block
+    DATA_COLLECTIONS = {
+        'MESH': ("meshes", "Mesh"),
+        'CURVE': ("curves", "Curve"),
+        'SURFACE': ("curves", "Curve"),
+        'FONT': ("curves", "Curve"),
+        'META': ("metaballs", "MetaBall"),
+        'ARMATURE': ("armatures", "Armature"),
+        'LATTICE': ("lattices", "Lattice"),
+        'CAMERA': ("cameras", "Camera"),
+        'LIGHT': ("lights", "Light"),
+        'LIGHT_PROBE': ("lightprobes", "LightProbe"),
+        'SPEAKER': ("speakers", "Speaker"),
+    }
+
+    # RNA struct -> bpy.data collection, for restoring data-block pointers by name
+    ID_COLLECTIONS = {
+        "Material": "materials",
+        "Object": "objects",
+        "Collection": "collections",
+        "Image": "images",
+        "NodeTree": "node_groups",
+        "World": "worlds",
+        "Texture": "textures",
+        "Action": "actions",
+    }
+
+    # RNA property type -> numpy dtype for foreach_get/foreach_set
+    BULK_DTYPES = {
+        'FLOAT': np.float32,
+        'INT': np.int32,
+        'BOOLEAN': bool,
+    }
+
+    # Spec text -> compiled spec
+    _compiled = {}
+
+    @staticmethod
+    def parse(spec_text: str) -> List[Tuple[str, str]]:
+        """Parse spec text into (object type, property path) entries."""
+        entries = []
+        for entry in spec_text.split(","):
+            if not entry.strip():
+                continue
+
+            match = PROPERTY_SPEC_ENTRY_PATTERN.match(entry)
+            if match:
+                object_type, path = match.group(1).upper(), match.group(2)
+            else:
+                object_type, path = "*", entry.strip()
+
+            if not PROPERTY_SPEC_PATH_PATTERN.match(path):
+                raise ValueError(f"Invalid property spec entry '{entry.strip()}'")
+
+            entries.append((object_type, path))
+
+        return entries
+
+    @staticmethod
+    def compile(spec_text: str) -> "CompiledPropertySpec":
+        """Compile spec text once and reuse the result for every capture and apply."""
+        compiled = PropertySpec._compiled.get(spec_text)
+        if compiled is None:
+            compiled = CompiledPropertySpec(PropertySpec.parse(spec_text))
+            PropertySpec._compiled[spec_text] = compiled
+        return compiled
+
+    @staticmethod
+    def bulk_layout(rna, attribute: str) -> Optional[Tuple[int, Any]]:
+        """Get (value length, dtype) if an attribute of an RNA struct definition (bl_rna, fixed_type)
+        can be accessed with foreach_get."""
+        prop = rna.properties.get(attribute)
+        if prop is None or prop.type not in PropertySpec.BULK_DTYPES:
+            return None
+
+        if getattr(prop, "is_array", False):
+            if not prop.array_length:
+                return None
+            return prop.array_length, PropertySpec.BULK_DTYPES[prop.type]
+
+        return 1, PropertySpec.BULK_DTYPES[prop.type]
+
+    @staticmethod
+    def to_json_value(value: Any) -> Any:
+        """Convert a Blender property value into JSON-compatible data."""
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if isinstance(value, bpy.types.ID):
+            return value.name
+        if hasattr(value, "to_dict"):
+            return value.to_dict()
+        if hasattr(value, "to_list"):
+            return value.to_list()
+        try:
+            return [PropertySpec.to_json_value(item) for item in value]
+        except TypeError:
+            raise ValueError(f"Unsupported property value {value!r}")
+
+    @staticmethod
+    def from_json_value(owner, attribute: str, value: Any) -> Any:
+        """Convert stored data back into a value for an RNA attribute (resolving data-block names)."""
+        prop = owner.bl_rna.properties.get(attribute)
+        if prop is not None and prop.type == 'POINTER' and isinstance(value, str):
+            collection_name = PropertySpec.ID_COLLECTIONS.get(prop.fixed_type.identifier)
+            if not collection_name:
+                raise ValueError(f"Cannot restore pointer '{attribute}' of type {prop.fixed_type.identifier}")
+            return getattr(bpy.data, collection_name).get(value)
+        return value
+
+    @staticmethod
+    def assign_path(obj: bpy.types.Object, path: str, value: Any) -> None:
+        """Assign a value to an object-relative property path (including custom properties)."""
+        if path.endswith('"]') and '["' in path:
+            owner_path, _, key = path[:-2].rpartition('["')
+            owner = obj.path_resolve(owner_path) if owner_path else obj
+            owner[key] = value
+            return
+
+        owner_path, _, attribute = path.rpartition(".")
+        owner = obj.path_resolve(owner_path) if owner_path else obj
+        setattr(owner, attribute, PropertySpec.from_json_value(owner, attribute, value))
+
+class CompiledPropertySpec:
+    """A property spec grouped into bulk accessors, with per-object fallbacks."""
+
+    def __init__(self, entries: List[Tuple[str, str]]):
+        # Merge the object types of each path, None means all objects
+        path_types = {}
+        for object_type, path in entries:
+            if object_type == "*" or path_types.get(path, set()) is None:
+                path_types[path] = None
+            else:
+                path_types.setdefault(path, set()).add(object_type)
+
+        # (path, types, attribute, length, dtype) read with scene.objects.foreach_get
+        self.object_bulk = []
+        # (path, object type, collection name, attribute, length, dtype) read with bpy.data.<collection>.foreach_get
+        self.data_bulk = []
+        # (path, types, collection attribute, attribute, length, dtype) read per object with <collection>.foreach_get
+        # (dtype None: per item access)
+        self.item_bulk = []
+        # (path, types) resolved per object
+        self.fallback = []
+
+        for path, types in path_types.items():
+            self._classify(path, types)
+
+    def _classify(self, path: str, types: Optional[set]) -> None:
+        """Sort a path into the cheapest accessor group that supports it."""
+        data_match = PROPERTY_SPEC_DATA_PATTERN.match(path)
+        if data_match and types:
+            attribute = data_match.group(1)
+            for object_type in types:
+                collection_name, struct_name = PropertySpec.DATA_COLLECTIONS.get(object_type, (None, None))
+                struct = getattr(bpy.types, struct_name, None) if struct_name else None
+                layout = PropertySpec.bulk_layout(struct.bl_rna, attribute) if struct else None
+                if layout:
+                    self.data_bulk.append((path, object_type, collection_name, attribute) + layout)
+                else:
+                    self.fallback.append((path, {object_type}))
+            return
+
+        items_match = PROPERTY_SPEC_ITEMS_PATTERN.match(path)
+        if items_match:
+            collection_attribute, attribute = items_match.groups()
+            collection_prop = bpy.types.Object.bl_rna.properties.get(collection_attribute)
+            if collection_prop is not None and collection_prop.type == 'COLLECTION':
+                layout = PropertySpec.bulk_layout(collection_prop.fixed_type, attribute) or (1, None)
+                self.item_bulk.append((path, types, collection_attribute, attribute) + layout)
+                return
+
+        if PROPERTY_SPEC_ATTRIBUTE_PATTERN.match(path):
+            layout = PropertySpec.bulk_layout(bpy.types.Object.bl_rna, path)
+            if layout:
+                self.object_bulk.append((path, types, path) + layout)
+                return
+
+        self.fallback.append((path, types))
+
+    @staticmethod
+    def _read(collection, attribute: str, length: int, dtype) -> np.ndarray:
+        """Bulk read an attribute of every item of a collection as a (count, length) array."""
+        values = np.empty(len(collection) * length, dtype=dtype)
+        collection.foreach_get(attribute, values)
+        return values.reshape(-1, length)
+
+    @staticmethod
+    def _to_json_row(row: np.ndarray, length: int) -> Any:
+        """Convert one row of a bulk read to JSON-compatible data."""
+        return row.tolist() if length > 1 else row[0].item()
+
+    @staticmethod
+    def _matches(obj: bpy.types.Object, types: Optional[set]) -> bool:
+        return types is None or obj.type in types
+
+    def capture(self, objects, objects_data: Dict[str, Dict[str, Any]]) -> None:
+        """Capture the spec properties of all objects in objects_data into their 'props'."""
+        object_list = list(objects)
+        records = [
+            objects_data[obj.name].setdefault("props", {}) if obj.name in objects_data else None
+            for obj in object_list
+        ]
+
+        for path, types, attribute, length, dtype in self.object_bulk:
+            values = self._read(objects, attribute, length, dtype)
+            for row, obj in enumerate(object_list):
+                if records[row] is not None and self._matches(obj, types):
+                    records[row][path] = self._to_json_row(values[row], length)
+
+        data_positions = {}
+        for path, object_type, collection_name, attribute, length, dtype in self.data_bulk:
+            datablocks = getattr(bpy.data, collection_name)
+            if collection_name not in data_positions:
+                data_positions[collection_name] = {data.as_pointer(): i for i, data in enumerate(datablocks)}
+            positions = data_positions[collection_name]
+
+            values = self._read(datablocks, attribute, length, dtype)
+            for row, obj in enumerate(object_list):
+                if records[row] is None or obj.type != object_type or obj.data is None:
+                    continue
+                position = positions.get(obj.data.as_pointer())
+                if position is not None:
+                    records[row][path] = self._to_json_row(values[position], length)
+
+        for path, types, collection_attribute, attribute, length, dtype in self.item_bulk:
+            for row, obj in enumerate(object_list):
+                if records[row] is None or not self._matches(obj, types):
+                    continue
+
+                items = getattr(obj, collection_attribute)
+                if not len(items):
+                    continue
+
+                if dtype is not None:
+                    values = [self._to_json_row(value, length) for value in self._read(items, attribute, length, dtype)]
+                else:
+                    values = [PropertySpec.to_json_value(getattr(item, attribute)) for item in items]
+
+                # Key by item name where names are unique (modifiers), else by position (slots)
+                keys = items.keys()
+                if len(keys) == len(values) and len(set(keys)) == len(keys):
+                    records[row][path] = dict(zip(keys, values))
+                else:
+                    records[row][path] = values
+
+        for path, types in self.fallback:
+            for row, obj in enumerate(object_list):
+                if records[row] is None or not self._matches(obj, types):
+                    continue
+                try:
+                    records[row][path] = PropertySpec.to_json_value(obj.path_resolve(path))
+                except ValueError:
+                    # Path does not exist on this object
+                    continue
+
+    def apply(self, objects, objects_data: Dict[str, Dict[str, Any]]) -> None:
+        """Apply the stored spec properties, writing only values that differ."""
+        object_list = list(objects)
+        records = [objects_data.get(obj.name, {}).get("props") for obj in object_list]
+
+        for path, types, attribute, length, dtype in self.object_bulk:
+            rows = [row for row, record in enumerate(records) if record and path in record]
+            if not rows:
+                continue
+
+            current = self._read(objects, attribute, length, dtype)
+            target = current.copy()
+            target[rows] = np.array([records[row][path] for row in rows], dtype=dtype).reshape(len(rows), length)
+
+            changed = np.flatnonzero(np.any(current != target, axis=1))
+            if len(changed):
+                objects.foreach_set(attribute, target.ravel())
+                for row in changed:
+                    object_list[row].update_tag()
+
+        for path, object_type, collection_name, attribute, length, dtype in self.data_bulk:
+            datablocks = getattr(bpy.data, collection_name)
+            positions = {data.as_pointer(): i for i, data in enumerate(datablocks)}
+
+            targets = {}
+            for row, obj in enumerate(object_list):
+                record = records[row]
+                if record and path in record and obj.type == object_type and obj.data is not None:
+                    position = positions.get(obj.data.as_pointer())
+                    if position is not None:
+                        targets[position] = record[path]
+            if not targets:
+                continue
+
+            current = self._read(datablocks, attribute, length, dtype)
+            target = current.copy()
+            target_rows = list(targets)
+            target[target_rows] = np.array(list(targets.values()), dtype=dtype).reshape(len(target_rows), length)
+
+            changed = np.flatnonzero(np.any(current != target, axis=1))
+            if len(changed):
+                datablocks.foreach_set(attribute, target.ravel())
+                for position in changed:
+                    datablocks[int(position)].update_tag()
+
+        for path, types, collection_attribute, attribute, length, dtype in self.item_bulk:
+            for row, obj in enumerate(object_list):
+                record = records[row]
+                if not record or path not in record:
+                    continue
+
+                items = getattr(obj, collection_attribute)
+                stored = record[path]
+                if isinstance(stored, dict):
+                    indexed = [(i, stored[key]) for i, key in enumerate(items.keys()) if key in stored]
+                else:
+                    indexed = list(enumerate(stored[:len(items)]))
+                if not indexed:
+                    continue
+
+                if dtype is not None:
+                    current = self._read(items, attribute, length, dtype)
+                    target = current.copy()
+                    target[[i for i, _ in indexed]] = np.array(
+                        [value for _, value in indexed], dtype=dtype
+                    ).reshape(len(indexed), length)
+                    if np.any(current != target):
+                        items.foreach_set(attribute, target.ravel())
+                        obj.update_tag()
+                else:
+                    for i, value in indexed:
+                        item = items[i]
+                        value = PropertySpec.from_json_value(item, attribute, value)
+                        if getattr(item, attribute) != value:
+                            setattr(item, attribute, value)
+
+        for path, types in self.fallback:
+            for row, obj in enumerate(object_list):
+                record = records[row]
+                if not record or path not in record:
+                    continue
+                try:
+                    PropertySpec.assign_path(obj, path, record[path])
+                except (ValueError, TypeError, AttributeError, KeyError) as e:
+                    print(f"Could not restore '{path}' on {obj.name}: {e}")
+
+# ============================================================================
+# REVERT BUFFER
+# ============================================================================
+
+class RevertBuffer:
+    """Ring buffer of the values a state load overwrote, for an instant revert."""
+
+    # (attribute, value length) of the object channels a load writes
+    OBJECT_VECTORS = [("location", 3), ("rotation_euler", 3), ("scale", 3)]
+    OBJECT_FLAGS = ["hide_viewport", "hide_render"]
+    BONE_VECTORS = [("location", 3), ("rotation_quaternion", 4), ("rotation_euler", 3), ("scale", 3)]
+
+    def __init__(self):
+        self._entries = collections.deque(maxlen=DEFAULT_REVERT_BUFFER_SIZE)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Drop all recorded loads."""
+        self._entries.clear()
+
+    def _resize(self) -> None:
+        """Follow the buffer size preference, keeping the newest entries."""
+        prefs = get_addon_preferences()
+        size = prefs.revert_buffer_size if prefs else DEFAULT_REVERT_BUFFER_SIZE
+        if self._entries.maxlen != size:
+            self._entries = collections.deque(self._entries, maxlen=size)
+
+    @staticmethod
+    def _read_vectors(collection, attribute: str, length: int, rows: np.ndarray) -> np.ndarray:
+        """Bulk read an attribute of a collection and keep only the given rows."""
+        values = np.empty(len(collection) * length, dtype=np.float32)
+        collection.foreach_get(attribute, values)
+        return values.reshape(-1, length)[rows]
+
+    @staticmethod
+    def _read_flags(collection, attribute: str, rows: np.ndarray) -> np.ndarray:
+        """Bulk read a boolean attribute of a collection and keep only the given rows."""
+        values = np.empty(len(collection), dtype=bool)
+        collection.foreach_get(attribute, values)
+        return values[rows]
+
+    def record(self, scene: bpy.types.Scene, objects_data: Dict[str, Dict[str, Any]], label: str,
+               property_spec: str = "", collections_data: Optional[Dict[str, Dict[str, bool]]] = None,
+               view_layer: Optional[bpy.types.ViewLayer] = None, joined: bool = False) -> None:
+        """Record the current values of every object, bone and collection flag the given state data touches.
+        
+        Joined entries are reverted together with the entry recorded before them, so a
+        load touching several scenes is reverted as a whole.
+        """
+        self._resize()
+        if view_layer is None:
+            view_layer = bpy.context.view_layer
+        view_layer_objects = set(view_layer.objects.keys())
+
+        # Looking objects up by name or index in scene.objects is a linear search
+        objects = scene.objects
+        object_list = list(objects)
+        positions = {obj.name: i for i, obj in enumerate(object_list)}
+        names = [name for name in objects_data if name in positions]
+        rows = np.array([positions[name] for name in names], dtype=np.int64)
+
+        entry = {
+            "label": label,
+            "scene": scene.name,
+            "names": names,
+            "hide_set": np.array([name in view_layer_objects and
+                                  object_list[positions[name]].hide_get(view_layer=view_layer)
+                                  for name in names], dtype=bool),
+            "bones": {},
+            "property_spec": property_spec,
+            "props": {},
+            "view_layer": view_layer.name,
+            "collections": CollectionVisibility.capture(view_layer) if collections_data else None,
+            "joined": joined,
+        }
+        for attribute, length in self.OBJECT_VECTORS:
+            entry[attribute] = self._read_vectors(objects, attribute, length, rows)
+        for attribute in self.OBJECT_FLAGS:
+            entry[attribute] = self._read_flags(objects, attribute, rows)
+
+        # Bone poses are only written for armatures whose state data has them
+        for name in names:
+            obj = object_list[positions[name]]
+            if obj.type != 'ARMATURE' or not obj.pose or "bone_poses" not in objects_data[name]:
+                continue
+
+            bones = obj.pose.bones
+            all_rows = np.arange(len(bones))
+            bone_entry = {
+                "names": bones.keys(),
+                "rotation_mode": [bone.rotation_mode for bone in bones],
+            }
+            for attribute, length in self.BONE_VECTORS:
+                bone_entry[attribute] = self._read_vectors(bones, attribute, length, all_rows)
+            entry["bones"][name] = bone_entry
+
+        # Spec properties are recorded through the same compiled bulk accessors
+        if property_spec:
+            props_data = {name: {} for name in names if "props" in objects_data[name]}
+            PropertySpec.compile(property_spec).capture(objects, props_data)
+            entry["props"] = props_data
+
+        self._entries.append(entry)
+
+    def _revert_bones(self, armature_obj: bpy.types.Object, bone_entry: Dict[str, Any]) -> None:
+        """Write back the recorded bone values that differ from the current pose."""
+        bones = armature_obj.pose.bones
+        if bones.keys() != bone_entry["names"]:
+            # The rig changed since the load, fall back to name lookups
+            rows = None
+        else:
+            rows = np.arange(len(bones))
+
+        for i, bone_name in enumerate(bone_entry["names"]):
+            pose_bone = bones.get(bone_name)
+            if pose_bone and pose_bone.rotation_mode != bone_entry["rotation_mode"][i]:
+                pose_bone.rotation_mode = bone_entry["rotation_mode"][i]
+
+        for attribute, length in self.BONE_VECTORS:
+            recorded = bone_entry[attribute]
+            if rows is not None:
+                changed = np.flatnonzero(np.any(self._read_vectors(bones, attribute, length, rows) != recorded, axis=1))
+            else:
+                changed = range(len(bone_entry["names"]))
+
+            for i in changed:
+                pose_bone = bones.get(bone_entry["names"][i])
+                if pose_bone:
+                    setattr(pose_bone, attribute, recorded[i])
+
+    def revert_last(self) -> Optional[str]:
+        """Restore the values overwritten by the most recent load; returns its label."""
+        if not self._entries:
+            return None
+
+        scenes = []
+        while True:
+            entry = self._entries.pop()
+            scenes.append(self._revert_entry(entry))
+            if not (entry["joined"] and self._entries):
+                break
+
+        ObjectCapture.refresh_scene(scenes if len(scenes) > 1 else None)
+        return entry["label"]
+
+    def _revert_entry(self, entry: Dict[str, Any]) -> bpy.types.Scene:
+        """Write back the recorded values of one entry that differ; returns its scene."""
+        scene = bpy.data.scenes.get(entry["scene"])
+        if not scene:
+            raise ValueError(f"Scene '{entry['scene']}' no longer exists")
+
+        # Looking objects up by name or index in scene.objects is a linear search
+        objects = scene.objects
+        object_list = list(objects)
+        positions = {obj.name: i for i, obj in enumerate(object_list)}
+        present = [i for i, name in enumerate(entry["names"]) if name in positions]
+        rows = np.array([positions[entry["names"][i]] for i in present], dtype=np.int64)
+
+        # Collection flags first, they decide which objects are in the view layer
+        view_layer = scene.view_layers.get(entry["view_layer"])
+        if entry["collections"] and view_layer:
+            CollectionVisibility.apply(view_layer, entry["collections"])
+        view_layer_objects = set(view_layer.objects.keys()) if view_layer else set()
+
+        # Compare vectorized and only write the values that actually changed
+        for attribute, length in self.OBJECT_VECTORS:
+            recorded = entry[attribute][present]
+            current = self._read_vectors(objects, attribute, length, rows)
+            for i in np.flatnonzero(np.any(current != recorded, axis=1)):
+                setattr(object_list[rows[i]], attribute, recorded[i])
+
+        for attribute in self.OBJECT_FLAGS:
+            recorded = entry[attribute][present]
+            current = self._read_flags(objects, attribute, rows)
+            for i in np.flatnonzero(current != recorded):
+                setattr(object_list[rows[i]], attribute, bool(recorded[i]))
+
+        for i, row in zip(present, rows):
+            obj = object_list[row]
+            if obj.name in view_layer_objects and obj.hide_get(view_layer=view_layer) != entry["hide_set"][i]:
+                obj.hide_set(bool(entry["hide_set"][i]), view_layer=view_layer)
+
+        for name, bone_entry in entry["bones"].items():
+            obj = object_list[positions[name]] if name in positions else None
+            if obj and obj.type == 'ARMATURE' and obj.pose:
+                self._revert_bones(obj, bone_entry)
+
+        if entry["props"]:
+            PropertySpec.compile(entry["property_spec"]).apply(objects, entry["props"])
+
+        return scene
+
+# Global instance
+revert_buffer = RevertBuffer()
+
+# ============================================================================
+# STATE MANAGER
+# ============================================================================
+
+class StateManager:
+    """Central coordinator for all state operations."""
+
+    def __init__(self):
+        # (states path, use local cache) -> store; stores of files opened earlier may still be writing
+        self._stores = {}
+        # In-memory states data of the open batch, None outside of a batch
+        self._batch_data = None
+        self._batch_dirty = False
+
+    def in_batch(self) -> bool:
+        """Check if a batch is currently open."""
+        return self._batch_data is not None
+
+    def begin_batch(self) -> None:
+        """Open a batch: all following operations work on one in-memory copy of the states."""
+        if self.in_batch():
+            raise RuntimeError(ERROR_BATCH_ACTIVE)
+
+        states_data = self.load_states_data()
+        if not states_data:
+            raise ValueError("Could not load states")
+
+        self._batch_data = states_data
+        self._batch_dirty = False
+
+    def commit_batch(self) -> bool:
+        """Close the batch and persist all of its changes with a single write."""
+        states_data = self._batch_data
+        dirty = self._batch_dirty
+        self._batch_data = None
+        self._batch_dirty = False
+
+        if states_data is None or not dirty:
+            return True
+
+        success = self.save_states_data(states_data)
+        if success:
+            print(SUCCESS_BATCH_COMMITTED)
+
+        return success
+
+    def abort_batch(self) -> None:
+        """Close the batch and discard all of its changes."""
+        self._batch_data = None
+        self._batch_dirty = False
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Context manager that commits on success and aborts on any exception."""
+        self.begin_batch()
+        try:
+            yield self._batch_data
+        except Exception:
+            self.abort_batch()
+            raise
+
+        if not self.commit_batch():
+            raise IOError("Failed to write states file")
+
+    def get_store(self) -> Optional[StatesStore]:
+        """Get the store of the current states file."""
+        states_path = FileManager.get_states_file_path()
+        if not states_path:
+            return None
+
+        prefs = get_addon_preferences()
+        use_local_cache = prefs.use_local_cache if prefs else True
+
+        key = (states_path, use_local_cache)
+        if key not in self._stores:
+            cache_dir = os.path.join(tempfile.gettempdir(), STATES_CACHE_DIRNAME) if use_local_cache else None
+            # Command line runs exit right after their work, so they write synchronously
+            self._stores[key] = StatesStore(states_path, cache_dir, background_writes=not bpy.app.background)
+
+        return self._stores[key]
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the background writes of all states files are committed."""
+        return all(store.flush(timeout) for store in list(self._stores.values()))
+
+    def close_stores(self) -> None:
+        """Flush and close the stores before unregistering or quitting, warning if writes could not be committed."""
+        flushed = self.flush(LOCK_TIMEOUT)
+        if not flushed:
+            print(f"Warning: {WARNING_WRITES_PENDING} after {LOCK_TIMEOUT:.0f} s, changes may be lost")
+            write_error = self.get_write_error()
+            if write_error:
+                print(f"Last error: {write_error}")
+
+        # Stop the writer threads, a reloaded addon creates new stores
+        for store in list(self._stores.values()):
+            store.close(LOCK_TIMEOUT if flushed else 0)
+        self._stores.clear()
+
+    def get_write_error(self) -> Optional[str]:
+        """Get the error of the last failed background commit, None if all commits succeeded."""
+        for store in list(self._stores.values()):
+            if store.last_error:
+                return store.last_error
+        return None
+
+    def load_states_data(self) -> Optional[Dict[str, Any]]:
+        """Load states data from file."""
+        # Inside a batch every operation shares the same in-memory data
+        if self.in_batch():
+            return self._batch_data
+
+        try:
+            FileManager.validate_blend_file_saved()
+            
+            store = self.get_store()
+            data = store.read() if store else None
+            if data is None:
+                # Create empty states data if file doesn't exist
+                blend_name = FileManager.get_blend_file_name()
+                return DataHandler.create_empty_states_data(blend_name)
+            
+            return data
+            
+        except Exception as e:
+            print(f"Error loading states: {e}")
+            return None
+    
+    def save_states_data(self, states_data: Dict[str, Any]) -> bool:
+        """Save states data to file."""
+        try:
+            FileManager.validate_blend_file_saved()
+            
+            if not DataHandler.validate_states_data(states_data):
+                raise ValueError("Invalid states data format")
+            
+            # Defer the write until the batch is committed
+            if self.in_batch():
+                self._batch_data = states_data
+                self._batch_dirty = True
+                return True
+            
+            store = self.get_store()
+            if not store:
+                return False
+            
+            prefs = get_addon_preferences()
+            policy = prefs.compression_policy if prefs else 'BALANCED'
+            
+            # Concurrent commits of other sessions are merged in, never overwritten;
+            # compression and the commit itself run on the store's writer thread
+            with instrumentation.timed("write"):
+                store.write(states_data, policy)
+
+            # The commit itself may still fail, earlier failures are being retried
+            if store.last_error:
+                print(f"Warning: {WARNING_WRITE_FAILED}: {store.last_error}")
+
+            return True
+
+        except Exception as e:
+            print(f"Error saving states: {e}")
+            return False
+
+    def get_states_index(self) -> Dict[str, Dict[str, Any]]:
+        """Get the metadata index of all states without parsing their objects."""
+        if not FileManager.is_blend_file_saved():
+            return {}
+
+        if self.in_batch():
+            return DataHandler.build_states_index(self._batch_data)
+
+        try:
+            store = self.get_store()
+            return store.read_index() if store else {}
+        except Exception as e:
+            print(f"Error indexing states: {e}")
+            return {}
+
+    def get_state(self, state_name: str) -> Optional[Dict[str, Any]]:
+        """Get one state for reading, parsing only its own part of the states file."""
+        if self.in_batch():
+            return self._batch_data["states"].get(state_name)
+
+        FileManager.validate_blend_file_saved()
+        store = self.get_store()
+        return store.read_state(state_name) if store else None
+
+    def get_states(self, state_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get several states for reading, raising if any of them does not exist."""
+        states = {state_name: self.get_state(state_name) for state_name in state_names}
+
+        missing = [state_name for state_name, state_data in states.items() if state_data is None]
+        if missing:
+            raise ValueError(f"{ERROR_STATE_NOT_FOUND}: {', '.join(missing)}")
+
+        return states
+
+    def get_state_names(self) -> List[str]:
+        """Get list of all state names."""
+        return list(self.get_states_index().keys())
+    
+    def save_state(self, state_name: str, overwrite: bool = False, property_spec: str = "",
+                   capture_collections: bool = False, scenes: Optional[List[bpy.types.Scene]] = None) -> bool:
+        """Save the current scene state with the given name, capturing the extra spec properties
+        and optionally the collection visibility of the view layer.
+        
+        When scenes are given, all of them are captured into one multi-scene state.
+        """
+        try:
+            # Validate blend file is saved
+            FileManager.validate_blend_file_saved()
+            
+            # Load existing states data
+            states_data = self.load_states_data()
+            if not states_data:
+                return False
+            
+            # Check if state already exists
+            if DataHandler.state_exists(states_data, state_name) and not overwrite:
+                print(f"Error: {ERROR_STATE_EXISTS}")
+                return False
+            
+            # Capture current scene data
+            if scenes:
+                objects_data, scenes_data = ObjectCapture.capture_scenes(scenes, property_spec, capture_collections)
+            else:
+                objects_data = ObjectCapture.capture_all_objects(property_spec)
+            
+            # Create state data, remembering the spec for updates and loads
+            state_data = DataHandler.create_state_data(objects_data)
+            if property_spec:
+                state_data["property_spec"] = property_spec
+            if scenes:
+                state_data["scenes"] = scenes_data
+            elif capture_collections:
+                state_data["collections"] = CollectionVisibility.capture(bpy.context.view_layer)
+            
+            # Overwriting keeps the replaced state as a version
+            previous = states_data["states"].get(state_name)
+            if previous is not None and self.get_history_depth() > 0:
+                DataHandler.push_state_version(previous, objects_data, self.get_history_depth(),
+                                               DataHandler.get_state_fields(state_data))
+                if "history" in previous:
+                    state_data["history"] = previous["history"]
+            
+            # Add to states data
+            states_data["states"][state_name] = state_data
+            
+            # Save to file
+            success = self.save_states_data(states_data)
+            
+            if success:
+                print(f"{SUCCESS_STATE_SAVED}: {state_name}")
+            
+            return success
+            
+        except Exception as e:
+            print(f"Error saving state '{state_name}': {e}")
+            return False
+    
+    def load_state(self, state_name: str, record_revert: bool = True) -> bool:
+        """Load a saved state and apply it to the current scene."""
+        try:
+            # Only this state's part of the file is parsed
+            state_data = self.get_state(state_name)
+            if state_data is None:
+                print(f"Error: {ERROR_STATE_NOT_FOUND}")
+                return False
+            
+            # Get state data
+            objects_data = state_data["objects"]
+            
+            property_spec = state_data.get("property_spec", "")
+            collections_data = state_data.get("collections")
+            
+            if "scenes" in state_data:
+                # Record every scene before anything is written, objects may be shared
+                if record_revert:
+                    for i, (scene, view_layer) in enumerate(ObjectCapture.get_state_scenes(state_data["scenes"])):
+                        revert_buffer.record(scene, objects_data, state_name, property_spec,
+                                             state_data["scenes"][scene.name].get("collections"),
+                                             view_layer, joined=i > 0)
+                
+                results = ObjectCapture.apply_scenes(state_data)
+            else:
+                # Remember the values this load overwrites so it can be reverted
+                if record_revert:
+                    revert_buffer.record(bpy.context.scene, objects_data, state_name, property_spec, collections_data)
+                
+                # Apply to scene
+                results = ObjectCapture.apply_all_objects(objects_data, property_spec, collections_data=collections_data)
+            
+            # Check results
+            success_count = sum(1 for success in results.values() if success)
+            total_count = len(results)
+            
+            print(f"{SUCCESS_STATE_LOADED}: {state_name} ({success_count}/{total_count} objects)")
+            
+            return True
+            
+        except Exception as e:
+            print(f"Error loading state '{state_name}': {e}")
+            return False
+    
+    def update_state(self, state_name: str, objects_data: Optional[Dict[str, Dict[str, Any]]] = None) -> bool:
+        """Update an existing state with current scene data (or the given captured data)."""
+        try:
+            # Load states data
+            states_data = self.load_states_data()
+            if not states_data:
+                return False
+            
+            # Check if state exists
+            if not DataHandler.state_exists(states_data, state_name):
+                print(f"Error: {ERROR_STATE_NOT_FOUND}")
+                return False
+            
+            # Capture current scene data unless it was captured up front
+            state_data = states_data["states"][state_name]
+            property_spec = state_data.get("property_spec", "")
+            fields = {}
+            if "scenes" in state_data:
+                # Multi-scene states recapture their own scenes, keeping deleted ones out
+                scenes_data = state_data["scenes"]
+                scenes = [scene for scene, _ in ObjectCapture.get_state_scenes(scenes_data)]
+                capture_collections = any("collections" in scene_data for scene_data in scenes_data.values())
+                objects_data, fields["scenes"] = ObjectCapture.capture_scenes(
+                    scenes, property_spec, capture_collections
+                )
+            elif objects_data is None:
+                objects_data = ObjectCapture.capture_all_objects(property_spec)
+            if "collections" in state_data:
+                fields["collections"] = CollectionVisibility.capture(bpy.context.view_layer)
+            
+            # Update state data, keeping the replaced objects and fields as a version
+            states_data["states"][state_name] = DataHandler.update_state_data(
+                state_data, objects_data, self.get_history_depth(), fields
+            )
+            
+            # Save to file
+            success = self.save_states_data(states_data)
+            
+            if success:
+                print(f"{SUCCESS_STATE_UPDATED}: {state_name}")
+            
+            return success
+            
+        except Exception as e:
+            print(f"Error updating state '{state_name}': {e}")
+            return False
+    
+    @staticmethod
+    def get_history_depth() -> int:
+        """Get the number of previous versions kept per state."""
+        prefs = get_addon_preferences()
+        return prefs.history_depth if prefs else DEFAULT_HISTORY_DEPTH
+
+    def get_state_history(self, state_name: str) -> List[Dict[str, Any]]:
+        """List the previous versions of a state, newest first."""
+        state_data = self.get_state(state_name)
+        if state_data is None:
+            raise ValueError(f"{ERROR_STATE_NOT_FOUND}: {state_name}")
+
+        return [
+            {"version": number, "updated": delta["updated"], "changed": len(delta["changes"])}
+            for number, delta in enumerate(state_data.get("history", []), start=1)
+        ]
+
+    def diff_state_version(self, state_name: str, version: int) -> Dict[str, Any]:
+        """Compare the current objects of a state with one of its previous versions."""
+        state_data = self.get_state(state_name)
+        if state_data is None:
+            raise ValueError(f"{ERROR_STATE_NOT_FOUND}: {state_name}")
+
+        with instrumentation.timed("diff"):
+            return StateDiff.diff_objects(state_data["objects"], DataHandler.get_state_version(state_data, version))
+
+    def restore_state_version(self, state_name: str, version: int) -> bool:
+        """Make a previous version current again; the replaced objects become a version themselves."""
+        try:
+            states_data = self.load_states_data()
+            if not states_data or not DataHandler.state_exists(states_data, state_name):
+                print(f"Error: {ERROR_STATE_NOT_FOUND}")
+                return False
+
+            state_data = states_data["states"][state_name]
+            objects_data = DataHandler.get_state_version(state_data, version)
+            fields = DataHandler.get_state_version_fields(state_data, version)
+            # Keep at least the replaced version, so a restore can always be undone
+            DataHandler.update_state_data(state_data, objects_data, max(self.get_history_depth(), 1), fields)
+
+            success = self.save_states_data(states_data)
+            if success:
+                print(f"{SUCCESS_VERSION_RESTORED}: {state_name} version {version}")
+
+            return success
+
+        except Exception as e:
+            print(f"Error restoring version {version} of state '{state_name}': {e}")
+            return False
+    
+    def delete_state(self, state_name: str) -> bool:
+        """Delete a saved state."""
+        try:
+            # Load states data
+            states_data = self.load_states_data()
+            if not states_data:
+                return False
+            
+            # Check if state exists
+            if not DataHandler.state_exists(states_data, state_name):
+                print(f"Error: {ERROR_STATE_NOT_FOUND}")
+                return False
+            
+            # Remove state
+            del states_data["states"][state_name]
+            
+            # Save to file
+            success = self.save_states_data(states_data)
+            
+            if success:
+                print(f"{SUCCESS_STATE_DELETED}: {state_name}")
+            
+            return success
+            
+        except Exception as e:
+            print(f"Error deleting state '{state_name}': {e}")
+            return False
+
+    def rename_state(self, state_name: str, new_name: str) -> bool:
+        """Rename a saved state, keeping its position in the file."""
+        return self.rename_states({state_name: new_name})
+
+    def rename_states(self, renames: Dict[str, str]) -> bool:
+        """Rename several states at once; names may be swapped or chained."""
+        try:
+            states_data = self.load_states_data()
+            if not states_data:
+                return False
+
+            for state_name in renames:
+                if not DataHandler.state_exists(states_data, state_name):
+                    print(f"Error: {ERROR_STATE_NOT_FOUND}: {state_name}")
+                    return False
+
+            # Validate against the names that exist after all renames are applied
+            final_names = [renames.get(name, name) for name in states_data["states"]]
+            if len(set(final_names)) != len(final_names):
+                print(f"Error: {ERROR_STATE_EXISTS}")
+                return False
+
+            states_data["states"] = {
+                renames.get(name, name): state_data
+                for name, state_data in states_data["states"].items()
+            }
+
+            success = self.save_states_data(states_data)
+
+            if success:
+                for state_name, new_name in renames.items():
+                    print(f"{SUCCESS_STATE_RENAMED}: {state_name} -> {new_name}")
+
+            return success
+
+        except Exception as e:
+            print(f"Error renaming states: {e}")
+            return False
+
+    def duplicate_state(self, state_name: str, new_name: str) -> bool:
+        """Duplicate a saved state under a new name."""
+        try:
+            states_data = self.load_states_data()
+            if not states_data:
+                return False
+
+            if not DataHandler.state_exists(states_data, state_name):
+                print(f"Error: {ERROR_STATE_NOT_FOUND}")
+                return False
+
+            if DataHandler.state_exists(states_data, new_name):
+                print(f"Error: {ERROR_STATE_EXISTS}")
+                return False
+
+            state_data = states_data["states"][state_name]
+            states_data["states"][new_name] = DataHandler.duplicate_state_data(state_data)
+
+            success = self.save_states_data(states_data)
+
+            if success:
+                print(f"{SUCCESS_STATE_DUPLICATED}: {state_name} -> {new_name}")
+
+            return success
+
+        except Exception as e:
+            print(f"Error duplicating state '{state_name}': {e}")
+            return False
+
+    def diff(self, state_a: str, state_b: str = LIVE_SCENE_KEY) -> Optional[Dict[str, Any]]:
+        """Diff two saved states; LIVE_SCENE_KEY stands for the current scene."""
+        try:
+            states = {}
+            for state_name in (state_a, state_b):
+                if state_name != LIVE_SCENE_KEY:
+                    states[state_name] = self.get_state(state_name)
+                    if states[state_name] is None:
+                        print(f"Error: {ERROR_STATE_NOT_FOUND}: {state_name}")
+                        return None
+
+            # The live scene is captured with the other state's spec so extra properties line up
+            property_spec = ""
+            for state_data in states.values():
+                property_spec = property_spec or state_data.get("property_spec", "")
+
+            def get_objects(state_name):
+                if state_name == LIVE_SCENE_KEY:
+                    return ObjectCapture.capture_all_objects(property_spec)
+                return states[state_name]["objects"]
+
+            with instrumentation.timed("diff"):
+                return StateDiff.diff_objects(get_objects(state_a), get_objects(state_b))
+
+        except Exception as e:
+            print(f"Error comparing states '{state_a}' and '{state_b}': {e}")
+            return None
+
+    def import_states(self, source_path: str, state_names: Optional[List[str]] = None,
+                      policy: str = 'SKIP', ranges: Optional[Dict[str, Tuple[int, int]]] = None) -> Dict[str, str]:
+        """Import states from another states file with a single write.
+
+        Only the requested states are parsed; their byte ranges come from the
+        caller (e.g. the library index) or from a scan of the source file.
+        Returns a mapping of source name to the name each state was stored under.
+        """
+        if ranges is None:
+            scanned = StatesFileScanner.scan_file(source_path)["states"]
+            if state_names is None:
+                state_names = list(scanned)
+
+            missing = [name for name in state_names if name not in scanned]
+            if missing:
+                raise ValueError(f"{ERROR_STATE_NOT_FOUND}: {', '.join(missing)}")
+
+            ranges = {name: (scanned[name]["start"], scanned[name]["end"]) for name in state_names}
+
+        imported_states = StatesFileScanner.read_states(source_path, ranges)
+
+        states_data = self.load_states_data()
+        if not states_data:
+            raise ValueError("Could not load states")
+
+        imported = {}
+        for state_name in (state_names or list(imported_states)):
+            stored_name = DataHandler.merge_state(
+                states_data["states"], state_name, imported_states[state_name], policy
+            )
+            if stored_name:
+                imported[state_name] = stored_name
+
+        if imported and not self.save_states_data(states_data):
+            raise IOError("Failed to write states file")
+
+        print(f"{SUCCESS_STATES_IMPORTED}: {len(imported)} of {len(imported_states)} from {source_path}")
+        return imported
+
+# Global instance
+state_manager = StateManager()
+
+# ============================================================================
+# STATE BAKER
+# ============================================================================
+
+class StateBaker:
+    """Bakes an ordered sequence of saved states into F-curves."""
+
+    # (data_path, value length) of the object channels that can be baked
+    OBJECT_CHANNELS = [
+        ("location", 3),
+        ("rotation_euler", 3),
+        ("scale", 3),
+        ("hide_viewport", 1),
+        ("hide_render", 1),
+    ]
+
+    # Channels that only make sense as stepped keys
+    CONSTANT_CHANNELS = {"hide_viewport", "hide_render"}
+
+    # Enum values of Keyframe.interpolation used with foreach_set
+    INTERPOLATION_VALUES = {
+        'CONSTANT': 0,
+        'LINEAR': 1,
+        'BEZIER': 2,
+    }
+
+    @staticmethod
+    def parse_sequence(sequence_text: str) -> List[Tuple[str, int]]:
+        """Parse a 'State A:1, State B:24' string into (state name, frame) pairs."""
+        sequence = []
+        for entry in sequence_text.split(","):
+            entry = entry.strip()
+            if not entry:
+                continue
+
+            state_name, separator, frame = entry.rpartition(":")
+            if not separator or not state_name.strip():
+                raise ValueError(f"Invalid bake entry '{entry}', expected 'State:Frame'")
+
+            sequence.append((state_name.strip(), int(frame)))
+
+        return sequence
+
+    @staticmethod
+    def build_sequence(state_names: List[str], frame_start: int, frame_step: int) -> List[Tuple[str, int]]:
+        """Build an evenly spaced sequence from a list of state names."""
+        return [(name, frame_start + i * frame_step) for i, name in enumerate(state_names)]
+
+    @staticmethod
+    def varying_curves(data_path: str, frames: np.ndarray, values: np.ndarray, group: str) -> List[Tuple]:
+        """Return curve descriptions for the array indices that change across the sequence."""
+        if len(values) < 2:
+            return []
+
+        varying = np.ptp(values, axis=0) > BAKE_EPSILON
+        return [
+            (data_path, int(index), frames, values[:, index], group)
+            for index in np.flatnonzero(varying)
+        ]
+
+    @staticmethod
+    def channel_curves(records: List[Dict[str, Any]], frames: np.ndarray,
+                       key: str, length: int, data_path: str, group: str) -> List[Tuple]:
+        """Collect the varying curves of one channel from a list of captured records."""
+        present = [i for i, record in enumerate(records) if key in record]
+        if len(present) < 2:
+            return []
+
+        values = np.array([records[i][key] for i in present], dtype=np.float64).reshape(len(present), length)
+        return StateBaker.varying_curves(data_path, frames[present], values, group)
+
+    @staticmethod
+    def bone_curves(armature_obj: bpy.types.Object, records: List[Dict[str, Any]], frames: np.ndarray) -> List[Tuple]:
+        """Collect the varying bone channel curves of an armature."""
+        bone_records = [record.get("bone_poses", {}) for record in records]
+        bone_names = list(dict.fromkeys(name for poses in bone_records for name in poses))
+
+        curves = []
+        for bone_name in bone_names:
+            pose_bone = armature_obj.pose.bones.get(bone_name)
+            if not pose_bone:
+                continue
+
+            present = [i for i, poses in enumerate(bone_records) if bone_name in poses]
+            bone_data = [bone_records[i][bone_name] for i in present]
+            bone_frames = frames[present]
+            base_path = f'pose.bones["{bpy.utils.escape_identifier(bone_name)}"]'
+
+            # Only the rotation channel the bone actually evaluates is baked
+            channels = [("location", 3), ("scale", 3)]
+            if pose_bone.rotation_mode == 'QUATERNION':
+                channels.append(("rotation_quaternion", 4))
+            elif pose_bone.rotation_mode != 'AXIS_ANGLE':
+                channels.append(("rotation_euler", 3))
+
+            for key, length in channels:
+                curves.extend(StateBaker.channel_curves(
+                    bone_data, bone_frames, key, length, f"{base_path}.{key}", bone_name
+                ))
+
+        return curves
+
+    @staticmethod
+    def write_fcurves(obj: bpy.types.Object, curves: List[Tuple], interpolation: str) -> int:
+        """Write curve descriptions into the object's action in bulk, returning the keyframe count."""
+        anim_data = obj.animation_data or obj.animation_data_create()
+        action = anim_data.action
+        if action is None:
+            action = bpy.data.actions.new(name=f"{obj.name}{BAKE_ACTION_SUFFIX}")
+            anim_data.action = action
+
+        keyframe_count = 0
+        for data_path, index, frames, values, group in curves:
+            # Replace any previous bake of this channel
+            fcurve = action.fcurves.find(data_path, index=index)
+            if fcurve is not None:
+                action.fcurves.remove(fcurve)
+
+            fcurve = action.fcurves.new(data_path, index=index, action_group=group)
+
+            count = len(frames)
+            co = np.empty(count * 2, dtype=np.float32)
+            co[0::2] = frames
+            co[1::2] = values
+
+            channel = data_path.rsplit(".", 1)[-1]
+            mode = 'CONSTANT' if channel in StateBaker.CONSTANT_CHANNELS else interpolation
+
+            fcurve.keyframe_points.add(count)
+            fcurve.keyframe_points.foreach_set("co", co)
+            fcurve.keyframe_points.foreach_set(
+                "interpolation", np.full(count, StateBaker.INTERPOLATION_VALUES[mode], dtype=np.int32)
+            )
+            fcurve.update()
+            keyframe_count += count
+
+        return keyframe_count
+
+    @staticmethod
+    def bake_states(sequence: List[Tuple[str, int]], interpolation: str = 'CONSTANT') -> Dict[str, int]:
+        """Bake the given (state name, frame) sequence into keyframes on the scene objects."""
+        if len(sequence) < 2:
+            raise ValueError("At least two states are required for baking")
+
+        if interpolation not in StateBaker.INTERPOLATION_VALUES:
+            raise ValueError(f"Unsupported interpolation '{interpolation}'")
+
+        states = state_manager.get_states([state_name for state_name, _ in sequence])
+
+        sequence = sorted(sequence, key=lambda entry: entry[1])
+        frames = np.array([frame for _, frame in sequence], dtype=np.float64)
+        if len(np.unique(frames)) != len(frames):
+            raise ValueError("Each state needs its own frame")
+
+        state_objects = [states[name]["objects"] for name, _ in sequence]
+        object_names = list(dict.fromkeys(name for objects in state_objects for name in objects))
+
+        if len(object_names) >= PERFORMANCE_WARNING_THRESHOLD:
+            print(WARNING_PERFORMANCE.format(len(object_names)))
+
+        stats = {"objects": 0, "fcurves": 0, "keyframes": 0}
+        # scene.objects.get() searches the scene, which is quadratic over thousands of objects
+        objects_by_name = {obj.name: obj for obj in bpy.context.scene.objects}
+
+        for obj_name in object_names:
+            obj = objects_by_name.get(obj_name)
+            if not obj:
+                continue
+
+            present = [i for i, objects in enumerate(state_objects) if obj_name in objects]
+            records = [state_objects[i][obj_name] for i in present]
+            obj_frames = frames[present]
+
+            curves = []
+            for key, length in StateBaker.OBJECT_CHANNELS:
+                curves.extend(StateBaker.channel_curves(
+                    records, obj_frames, key, length, key, "Object Transforms"
+                ))
+
+            if obj.type == 'ARMATURE' and obj.pose:
+                curves.extend(StateBaker.bone_curves(obj, records, obj_frames))
+
+            if not curves:
+                continue
+
+            stats["objects"] += 1
+            stats["fcurves"] += len(curves)
+            stats["keyframes"] += StateBaker.write_fcurves(obj, curves, interpolation)
+
+        print(f"{SUCCESS_STATES_BAKED}: {stats['objects']} objects, "
+              f"{stats['fcurves']} F-curves, {stats['keyframes']} keyframes")
+
+        return stats
+
+# ============================================================================
+# BATCH RUNNER
+# ============================================================================
+
+class BatchRunner:
+    """Applies a list of states one after another for render farms and scripted pipelines.
+
+    The states file is read once and every state's objects are decoded once. After
+    the first state only the records that differ from the previously applied state
+    are written, so the callback must not change the objects of the applied states.
+
+        import scene_state_saver
+        scene_state_saver.BatchRunner.run(
+            ["Wide", "Close"],
+            callback=lambda state_name, index: bpy.ops.render.render(write_still=True),
+        )
+    """
+
+    @staticmethod
+    def load_states(state_names: Optional[List[str]] = None, states_file: Optional[str] = None) -> Dict[str, Any]:
+        """Open the given states file, or the opened .blend file's, once.
+
+        The .blend file's states are read through the index, so states that are
+        not applied are never parsed.
+        """
+        if states_file:
+            states = load_states_file(states_file)["states"]
+            return states if state_names is None else {name: states.get(name) for name in state_names}
+
+        if state_names is None:
+            state_names = state_manager.get_state_names()
+        return {state_name: state_manager.get_state(state_name) for state_name in state_names}
+
+    @staticmethod
+    def run(state_names: Optional[List[str]] = None, callback=None, states_file: Optional[str] = None,
+            skip_unchanged: bool = True) -> List[Dict[str, Any]]:
+        """Apply each state and call callback(state_name, index) after it.
+
+        Returns per-state reports with the number of objects written and the apply
+        and callback durations in seconds.
+        """
+        states = BatchRunner.load_states(state_names, states_file)
+        if state_names is None:
+            state_names = list(states)
+
+        missing = [name for name in state_names if states.get(name) is None]
+        if missing:
+            raise ValueError(f"{ERROR_STATE_NOT_FOUND}: {', '.join(missing)}")
+
+        # Looking objects up by name in scene.objects is a linear search
+        objects_by_name = {obj.name: obj for obj in bpy.context.scene.objects}
+
+        reports = []
+        previous = {}
+        previous_collections = None
+        for index, state_name in enumerate(state_names):
+            start = time.perf_counter()
+
+            state_data = states[state_name]
+            objects_data = state_data["objects"]
+            collections_data = state_data.get("collections")
+            if "scenes" in state_data:
+                # Multi-scene states skip unchanged scenes by their hashes, the next
+                # state is compared against nothing
+                apply_data = ObjectCapture.apply_scenes(state_data)
+                previous = {}
+                previous_collections = None
+            else:
+                # Re-including a collection resets the Eye-Button state of its objects
+                if skip_unchanged and collections_data == previous_collections:
+                    apply_data = {
+                        name: record for name, record in objects_data.items()
+                        if previous.get(name) != record
+                    }
+                else:
+                    apply_data = objects_data
+
+                ObjectCapture.apply_all_objects(apply_data, state_data.get("property_spec", ""), objects_by_name,
+                                                collections_data)
+                previous = objects_data
+                previous_collections = collections_data
+
+            applied = time.perf_counter()
+            if callback:
+                callback(state_name, index)
+            finished = time.perf_counter()
+
+            instrumentation.record("batch_apply", applied - start)
+            report = {
+                "state": state_name,
+                "objects": len(objects_data),
+                "written": len(apply_data),
+                "apply": applied - start,
+                "callback": finished - applied,
+            }
+            reports.append(report)
+            print(f"[{index + 1}/{len(state_names)}] {state_name}: {report['written']}/{report['objects']} objects "
+                  f"applied in {report['apply'] * 1000:.1f} ms, callback {report['callback'] * 1000:.1f} ms")
+
+        return reports
+
+# ============================================================================
+# STATE DIFF
+# ============================================================================
+
+class StateDiff:
+    """Computes vectorized per-channel differences between two sets of object data."""
+
+    # (channel, value length, default for records without the channel)
+    CHANNELS = [
+        ("location", 3, [0.0, 0.0, 0.0]),
+        ("rotation_euler", 3, [0.0, 0.0, 0.0]),
+        ("scale", 3, [1.0, 1.0, 1.0]),
+        ("hide_viewport", 1, False),
+        ("hide_render", 1, False),
+        ("hide_set", 1, False),
+    ]
+
+    BONE_CHANNELS = [("location", 3), ("rotation_quaternion", 4), ("scale", 3)]
+
+    @staticmethod
+    def channel_array(records: List[Dict[str, Any]], key: str, length: int, default: Any) -> np.ndarray:
+        """Gather one channel of the given records into a (count, length) array."""
+        values = (record.get(key, default) for record in records)
+        if length > 1:
+            values = itertools.chain.from_iterable(values)
+        # fromiter avoids building nested lists, which dominates for large states
+        return np.fromiter(values, dtype=np.float64, count=len(records) * length).reshape(len(records), length)
+
+    @staticmethod
+    def bone_magnitude(bones_a: Dict[str, Dict[str, Any]], bones_b: Dict[str, Dict[str, Any]]) -> float:
+        """Sum of the bone channel differences of one armature."""
+        names = [name for name in bones_a if name in bones_b]
+        magnitude = float(len(bones_a.keys() ^ bones_b.keys()))
+        if not names:
+            return magnitude
+
+        for key, length in StateDiff.BONE_CHANNELS:
+            values_a = np.array([bones_a[name][key] for name in names], dtype=np.float64).reshape(-1, length)
+            values_b = np.array([bones_b[name][key] for name in names], dtype=np.float64).reshape(-1, length)
+            if key == "rotation_quaternion":
+                # q and -q are the same rotation
+                distance = np.minimum(
+                    np.linalg.norm(values_b - values_a, axis=1),
+                    np.linalg.norm(values_b + values_a, axis=1)
+                )
+            else:
+                distance = np.linalg.norm(values_b - values_a, axis=1)
+            magnitude += float(distance.sum())
+
+        return magnitude
+
+    @staticmethod
+    def diff_objects(objects_a: Dict[str, Dict[str, Any]], objects_b: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Diff two objects dicts aligned by object name.
+
+        Returns changed objects (with per-channel magnitudes, largest change
+        first), added objects (only in b), removed objects (only in a) and the
+        number of unchanged objects.
+        """
+        common = [name for name in objects_a if name in objects_b]
+        added = [name for name in objects_b if name not in objects_a]
+        removed = [name for name in objects_a if name not in objects_b]
+
+        channel_magnitudes = {}
+        total = np.zeros(len(common), dtype=np.float64)
+
+        records_a = [objects_a[name] for name in common]
+        records_b = [objects_b[name] for name in common]
+
+        if common:
+            for key, length, default in StateDiff.CHANNELS:
+                values_a = StateDiff.channel_array(records_a, key, length, default)
+                values_b = StateDiff.channel_array(records_b, key, length, default)
+                magnitude = np.linalg.norm(values_b - values_a, axis=1)
+                magnitude[magnitude < DIFF_EPSILON] = 0.0
+                channel_magnitudes[key] = magnitude
+                total += magnitude
+
+        # Bones and extra properties only exist on some objects, handle those individually
+        extra = {}
+        for i, (record_a, record_b) in enumerate(zip(records_a, records_b)):
+            if "bone_poses" in record_a or "bone_poses" in record_b:
+                magnitude = StateDiff.bone_magnitude(record_a.get("bone_poses", {}), record_b.get("bone_poses", {}))
+                if magnitude > DIFF_EPSILON:
+                    extra.setdefault(i, {})["bone_poses"] = magnitude
+                    total[i] += magnitude
+
+            props_a, props_b = record_a.get("props", {}), record_b.get("props", {})
+            if props_a != props_b:
+                changed_props = sum(
+                    1 for path in props_a.keys() | props_b.keys()
+                    if props_a.get(path) != props_b.get(path)
+                )
+                extra.setdefault(i, {})["props"] = float(changed_props)
+                total[i] += changed_props
+
+        changed_rows = np.flatnonzero(total > 0.0)
+        changed_rows = changed_rows[np.argsort(-total[changed_rows], kind="stable")]
+
+        changed = []
+        for i in changed_rows:
+            channels = {
+                key: float(magnitudes[i])
+                for key, magnitudes in channel_magnitudes.items()
+                if magnitudes[i] > 0.0
+            }
+            channels.update(extra.get(int(i), {}))
+            changed.append({
+                "name": common[i],
+                "magnitude": float(total[i]),
+                "channels": channels
+            })
+
+        return {
+            "changed": changed,
+            "added": added,
+            "removed": removed,
+            "unchanged": len(common) - len(changed)
+        }
+
+# ============================================================================
+# STATE LIBRARY
+# ============================================================================
+
+class StateLibrary:
+    """Shared directory of states files with a persistent index.
+
+    The index stores names, object counts, scopes, hashes and byte ranges of
+    every state in every member file, so browsing never parses member files
+    and imports read only the selected states.
+    """
+
+    def __init__(self):
+        # (index path, file signature, index) of the last loaded index
+        self._index_cache = None
+
+    @staticmethod
+    def get_directory() -> Optional[str]:
+        """Get the configured library directory, or None if not set."""
+        prefs = get_addon_preferences()
+        if not prefs or not prefs.library_directory:
+            return None
+        return bpy.path.abspath(prefs.library_directory)
+
+    @staticmethod
+    def get_index_path(directory: str) -> str:
+        return os.path.join(directory, LIBRARY_INDEX_FILENAME)
+
+    @staticmethod
+    def is_member_file(file_name: str) -> bool:
+        return file_name.endswith(f"{STATES_SUFFIX}{JSON_EXTENSION}")
+
+    def load_index(self, directory: str) -> Dict[str, Any]:
+        """Load the persistent index, re-reading it only when the index file changed."""
+        index_path = self.get_index_path(directory)
+        signature = FileManager.get_file_signature(index_path)
+
+        if self._index_cache and self._index_cache[:2] == (index_path, signature):
+            return self._index_cache[2]
+
+        index = {"version": LIBRARY_INDEX_VERSION, "members": {}}
+        if signature:
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    loaded = json.load(f)
+                if loaded.get("version") == LIBRARY_INDEX_VERSION:
+                    index = loaded
+            except (OSError, ValueError) as e:
+                print(f"Rebuilding unreadable library index: {e}")
+
+        self._index_cache = (index_path, signature, index)
+        return index
+
+    @staticmethod
+    def index_member(member_path: str) -> Dict[str, Any]:
+        """Build the index entry of one member file; hashes are taken over each state's raw bytes."""
+        with open(member_path, 'rb') as f:
+            data = f.read()
+
+        scanned = StatesFileScanner.scan_bytes(data)
+        scope = scanned["header"].get("blend_file", "")
+
+        states = {}
+        for state_name, entry in scanned["states"].items():
+            states[state_name] = {
+                "start": entry["start"],
+                "end": entry["end"],
+                "object_count": entry["object_count"],
+                "created": entry.get("created", ""),
+                "updated": entry.get("updated", ""),
+                "property_spec": entry.get("property_spec", ""),
+                "scope": scope,
+                "hash": hashlib.sha1(data[entry["start"]:entry["end"]]).hexdigest(),
+            }
+
+        return {"signature": list(FileManager.get_file_signature(member_path)), "states": states}
+
+    def refresh_index(self, directory: str) -> Dict[str, Any]:
+        """Re-index only the member files whose signature changed, then persist the index."""
+        index = self.load_index(directory)
+        members = index["members"]
+        changed = False
+
+        present = set()
+        for file_name in sorted(os.listdir(directory)):
+            if not self.is_member_file(file_name):
+                continue
+
+            present.add(file_name)
+            member_path = os.path.join(directory, file_name)
+            signature = FileManager.get_file_signature(member_path)
+            if signature and members.get(file_name, {}).get("signature") == list(signature):
+                continue
+
+            try:
+                members[file_name] = self.index_member(member_path)
+                changed = True
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable library file {file_name}: {e}")
+
+        for file_name in list(members):
+            if file_name not in present:
+                del members[file_name]
+                changed = True
+
+        if changed:
+            index_path = self.get_index_path(directory)
+            FileManager.write_file_atomic(index_path, json.dumps(index).encode("utf-8"))
+            self._index_cache = (index_path, FileManager.get_file_signature(index_path), index)
+
+        return index
+
+    def search(self, directory: str, query: str = "") -> List[Dict[str, Any]]:
+        """List library states matching a name/scope substring, reading only the index."""
+        needle = query.lower()
+        results = []
+        for file_name, member in self.load_index(directory)["members"].items():
+            for state_name, entry in member["states"].items():
+                if needle and needle not in state_name.lower() and needle not in entry["scope"].lower():
+                    continue
+                results.append(dict(entry, name=state_name, member=file_name))
+        return results
+
+    def import_states(self, directory: str, selection: Dict[str, List[str]], policy: str) -> List[str]:
+        """Import the selected {member file: [state names]} into the current states file.
+
+        Returns the names the imported states were stored under.
+        """
+        index = self.load_index(directory)
+        imported = []
+
+        with state_manager.batch():
+            for file_name, state_names in selection.items():
+                member_path = os.path.join(directory, file_name)
+                member = index["members"].get(file_name)
+
+                # Byte ranges are only trusted while the member file is unchanged
+                signature = FileManager.get_file_signature(member_path)
+                if not member or member.get("signature") != list(signature or ()):
+                    member = self.refresh_index(directory)["members"].get(file_name)
+                    if not member:
+                        raise ValueError(f"Library file not found: {file_name}")
+
+                missing = [name for name in state_names if name not in member["states"]]
+                if missing:
+                    raise ValueError(f"{ERROR_STATE_NOT_FOUND}: {', '.join(missing)}")
+
+                ranges = {name: (member["states"][name]["start"], member["states"][name]["end"])
+                          for name in state_names}
+                imported.extend(state_manager.import_states(member_path, state_names, policy, ranges).values())
+
+        return imported
+
+    def publish_states(self, directory: str, state_names: List[str], policy: str) -> List[str]:
+        """Copy local states into this file's member of the library."""
+        FileManager.validate_blend_file_saved()
+        states = state_manager.get_states(state_names)
+
+        blend_name = FileManager.get_blend_file_name()
+        member_path = os.path.join(directory, f"{blend_name}{STATES_SUFFIX}{JSON_EXTENSION}")
+
+        # Artists publishing at the same time are merged under the member file's lock
+        prefs = get_addon_preferences()
+        published = StatesStore(member_path).add_states(
+            {state_name: copy.deepcopy(states[state_name]) for state_name in state_names}, policy,
+            prefs.compression_policy if prefs else 'BALANCED', blend_name,
+        )
+
+        if published:
+            self.refresh_index(directory)
+
+        print(f"{SUCCESS_STATES_PUBLISHED}: {len(published)} to {member_path}")
+        return published
+
+# Global instance
+state_library = StateLibrary()
+
+# ============================================================================
+# SNAPSHOT SCHEDULER
+# ============================================================================
+
+class SnapshotRetention:
+    """Decides which automatic snapshots to keep (last N, hourly and daily)."""
+
+    @staticmethod
+    def select_pruned(snapshots: List[Tuple[str, datetime.datetime]], keep_last: int,
+                      keep_hourly: int, keep_daily: int) -> List[str]:
+        """Return the names of the snapshots that fall outside the retention policy."""
+        ordered = sorted(snapshots, key=lambda snapshot: snapshot[1], reverse=True)
+        keep = {name for name, _ in ordered[:keep_last]}
+
+        # Keep the newest snapshot of each of the most recent hour/day buckets
+        for bucket_format, bucket_count in (("%Y-%m-%d %H", keep_hourly), ("%Y-%m-%d", keep_daily)):
+            buckets = set()
+            for name, timestamp in ordered:
+                if len(buckets) >= bucket_count:
+                    break
+                bucket = timestamp.strftime(bucket_format)
+                if bucket not in buckets:
+                    buckets.add(bucket)
+                    keep.add(name)
+
+        return [name for name, _ in ordered if name not in keep]
+
+class SnapshotScheduler:
+    """Takes automatic snapshots on a timer when the scene actually changed."""
+
+    def __init__(self):
+        # Hash of the scene at the last snapshot (or last check that found no change)
+        self._last_hash = None
+
+    @staticmethod
+    def get_auto_snapshots(states_data: Dict[str, Any]) -> List[Tuple[str, datetime.datetime]]:
+        """Get (name, created) of all automatic snapshots."""
+        snapshots = []
+        for state_name, state_data in states_data["states"].items():
+            if state_data.get("auto") and AUTO_SNAPSHOT_PATTERN.match(state_name):
+                snapshots.append((state_name, datetime.datetime.fromisoformat(state_data["created"])))
+        return snapshots
+
+    @staticmethod
+    def next_snapshot_name(states_data: Dict[str, Any]) -> str:
+        """Get the next free 'auto-NNN' name."""
+        numbers = [
+            int(match.group(1))
+            for match in map(AUTO_SNAPSHOT_PATTERN.match, states_data["states"])
+            if match
+        ]
+        return f"{AUTO_SNAPSHOT_PREFIX}{max(numbers, default=0) + 1:03d}"
+
+    def take_snapshot(self, scene: bpy.types.Scene, prefs) -> bool:
+        """Save a snapshot if the scene changed since the last one, pruning in the same write."""
+        if not FileManager.is_blend_file_saved():
+            return False
+
+        with instrumentation.timed("auto_snapshot_hash"):
+            scene_hash = ObjectCapture.hash_scene(scene)
+
+        if scene_hash == self._last_hash:
+            return False
+
+        with instrumentation.timed("auto_snapshot_save"):
+            with state_manager.batch() as states_data:
+                # Compare against the stored snapshots too, so a restart doesn't duplicate
+                snapshots = self.get_auto_snapshots(states_data)
+                if snapshots:
+                    latest_name = max(snapshots, key=lambda snapshot: snapshot[1])[0]
+                    if states_data["states"][latest_name].get("hash") == scene_hash:
+                        self._last_hash = scene_hash
+                        return False
+
+                state_name = self.next_snapshot_name(states_data)
+                state_data = DataHandler.create_state_data(ObjectCapture.capture_all_objects())
+                state_data["auto"] = True
+                state_data["hash"] = scene_hash
+                states_data["states"][state_name] = state_data
+
+                snapshots.append((state_name, datetime.datetime.fromisoformat(state_data["created"])))
+                pruned = SnapshotRetention.select_pruned(
+                    snapshots, prefs.auto_snapshot_keep_last,
+                    prefs.auto_snapshot_keep_hourly, prefs.auto_snapshot_keep_daily
+                )
+                for pruned_name in pruned:
+                    del states_data["states"][pruned_name]
+
+                state_manager.save_states_data(states_data)
+
+        self._last_hash = scene_hash
+        print(f"{SUCCESS_SNAPSHOT_SAVED}: {state_name} ({len(pruned)} pruned)")
+        return True
+
+    def next_interval(self, prefs) -> float:
+        """Get the delay until the next check, stretched when the last snapshot exceeded its budget."""
+        interval = float(prefs.auto_snapshot_interval)
+        timings = instrumentation.get_timings().get("auto_snapshot_save")
+        budget = prefs.auto_snapshot_budget_ms / 1000.0
+
+        if timings and budget > 0 and timings["last"] > budget:
+            interval *= timings["last"] / budget
+
+        return interval
+
+# Global instance
+snapshot_scheduler = SnapshotScheduler()
+
+def auto_snapshot_timer():
+    """Timer callback driving the snapshot scheduler; returning None stops the timer."""
+    prefs = get_addon_preferences()
+    if not prefs or not prefs.auto_snapshot_enabled:
+        return None
+
+    try:
+        scene = bpy.context.scene
+        if scene and snapshot_scheduler.take_snapshot(scene, prefs):
+            StateList.sync(scene.scene_state_saver)
+    except Exception as e:
+        print(f"Error taking automatic snapshot: {e}")
+
+    return snapshot_scheduler.next_interval(prefs)
+
+def update_auto_snapshot_timer(self, context):
+    """Start or stop the snapshot timer when the preference changes."""
+    if self.auto_snapshot_enabled:
+        if not bpy.app.timers.is_registered(auto_snapshot_timer):
+            bpy.app.timers.register(auto_snapshot_timer, first_interval=self.auto_snapshot_interval,
+                                    persistent=True)
+    elif bpy.app.timers.is_registered(auto_snapshot_timer):
+        bpy.app.timers.unregister(auto_snapshot_timer)
+
+# ============================================================================
+# PROPERTIES
+# ============================================================================
+
+class StateNameItem(PropertyGroup):
+    """Property group for individual state names in the collection."""
+    name: StringProperty(
+        name="State Name",
+        description="Name of the state"
+    )
+
+    created: StringProperty(
+        name="Created",
+        description="Creation timestamp of the state"
+    )
+
+    updated: StringProperty(
+        name="Updated",
+        description="Last update timestamp of the state"
+    )
+
+    object_count: IntProperty(
+        name="Objects",
+        description="Number of objects captured in the state",
+        default=0
+    )
+
+    selected: BoolProperty(
+        name="Selected",
+        description="Include this state in batch operations",
+        default=False
+    )
+
+class DiffResultItem(PropertyGroup):
+    """Property group for one object of a state comparison."""
+    name: StringProperty(
+        name="Object Name",
+        description="Name of the object"
+    )
+
+    kind: EnumProperty(
+        name="Kind",
+        items=[
+            ('CHANGED', "Changed", "Object differs between the states"),
+            ('ADDED', "Added", "Object only exists in the second state"),
+            ('REMOVED', "Removed", "Object only exists in the first state"),
+        ],
+        default='CHANGED'
+    )
+
+    magnitude: bpy.props.FloatProperty(
+        name="Magnitude",
+        description="Size of the change summed over all channels",
+        default=0.0
+    )
+
+    channels: StringProperty(
+        name="Channels",
+        description="Changed channels"
+    )
+
+class LibraryItem(PropertyGroup):
+    """Property group for one state of the shared library."""
+    name: StringProperty(
+        name="State Name",
+        description="Name of the state"
+    )
+
+    member: StringProperty(
+        name="Library File",
+        description="States file of the library containing the state"
+    )
+
+    scope: StringProperty(
+        name="Scope",
+        description="Blend file the state was published from"
+    )
+
+    object_count: IntProperty(
+        name="Objects",
+        description="Number of objects captured in the state",
+        default=0
+    )
+
+    selected: BoolProperty(
+        name="Selected",
+        description="Include this state in the next import",
+        default=False
+    )
+
+class HistoryVersionItem(PropertyGroup):
+    """Property group for one previous version of a state."""
+    name: StringProperty(
+        name="Updated",
+        description="Time the version was replaced"
+    )
+
+    version: IntProperty(
+        name="Version",
+        description="Number of the version, 1 being the most recent previous version",
+        default=1
+    )
+
+    changed: IntProperty(
+        name="Changed Objects",
+        description="Number of objects that differ from the next newer version",
+        default=0
+    )
+
+class SceneStateProperties(PropertyGroup):
+    """Properties for Scene State Saver stored in scene."""
+    
+    new_state_name: StringProperty(
+        name="State Name",
+        description="Name for the new state",
+        default=DEFAULT_STATE_NAME,
+        maxlen=64
+    )
+    
+    property_spec: StringProperty(
+        name="Extra Properties",
+        description="Additional properties to capture in new states, as comma separated "
+                    "'TYPE:path' entries, e.g. 'LIGHT:data.energy, CAMERA:data.lens, "
+                    "*:modifiers[*].show_viewport, *:[\"my_prop\"]'",
+        default=""
+    )
+    
+    capture_collections: BoolProperty(
+        name="Collections",
+        description="Also capture the visibility of collections (exclude, hide in viewport, "
+                    "disable in viewports and renders) in new states",
+        default=False
+    )
+    
+    include_in_capture: BoolProperty(
+        name="Include in States",
+        description="Capture this scene too when saving a new state, objects linked into "
+                    "several scenes are stored once",
+        default=False
+    )
+    
+    selected_state_index: IntProperty(
+        name="Selected State Index",
+        description="Index of the currently selected state in the list",
+        default=0,
+        min=0
+    )
+    
+    current_active_state: StringProperty(
+        name="Current Active State",
+        description="Name of the currently active (loaded) state",
+        default=""
+    )
+    
+    state_names_collection: bpy.props.CollectionProperty(
+        type=StateNameItem,
+        name="State Names Collection",
+        description="Collection of state names for the UIList"
+    )
+
+    compare_state: StringProperty(
+        name="Compare With",
+        description="State to compare the selected state with. Leave empty to compare with the live scene",
+        default=""
+    )
+    
+    diff_results: bpy.props.CollectionProperty(
+        type=DiffResultItem,
+        name="Diff Results",
+        description="Objects that differ in the last comparison"
+    )
+    
+    diff_results_index: IntProperty(
+        name="Diff Result Index",
+        default=0,
+        min=0
+    )
+    
+    diff_summary: StringProperty(
+        name="Diff Summary",
+        description="Summary of the last comparison",
+        default=""
+    )
+    
+    import_conflict_policy: EnumProperty(
+        name="On Conflict",
+        description="What to do when an imported state has the same name as an existing state",
+        items=CONFLICT_POLICIES,
+        default='SKIP'
+    )
+    
+    library_filter: StringProperty(
+        name="Search",
+        description="Only list library states whose name or scope contains this text",
+        default=""
+    )
+    
+    library_items: bpy.props.CollectionProperty(
+        type=LibraryItem,
+        name="Library Items",
+        description="States found in the shared library"
+    )
+    
+    library_items_index: IntProperty(
+        name="Library Item Index",
+        default=0,
+        min=0
+    )
+    
+    history_state: StringProperty(
+        name="History State",
+        description="State whose versions are listed",
+        default=""
+    )
+    
+    history_versions: bpy.props.CollectionProperty(
+        type=HistoryVersionItem,
+        name="History Versions",
+        description="Previous versions of the listed state"
+    )
+    
+    history_versions_index: IntProperty(
+        name="History Version Index",
+        default=0,
+        min=0
+    )
+    
+    bake_sequence: StringProperty(
+        name="Bake Sequence",
+        description="States and frames to bake, e.g. 'State A:1, State B:24'. "
+                    "Leave empty to bake all states in list order",
+        default=""
+    )
+
+    bake_frame_step: IntProperty(
+        name="Frame Step",
+        description="Frames between states when baking all states in list order",
+        default=10,
+        min=1
+    )
+
+    bake_interpolation: EnumProperty(
+        name="Interpolation",
+        description="Interpolation of the baked transform keyframes",
+        items=[
+            ('CONSTANT', "Constant", "Hold each state until the next one"),
+            ('LINEAR', "Linear", "Blend linearly between states"),
+            ('BEZIER', "Bezier", "Blend smoothly between states"),
+        ],
+        default='CONSTANT'
+    )
+
+class SceneStatePreferences(AddonPreferences):
+    """Addon preferences for Scene State Saver."""
+    
+    bl_idname = __name__
+    
+    show_performance_warnings: BoolProperty(
+        name="Show Performance Warnings",
+        description="Show warnings for scenes with many objects",
+        default=True
+    )
+    
+    performance_threshold: IntProperty(
+        name="Performance Warning Threshold",
+        description="Number of objects that triggers a performance warning",
+        default=100,
+        min=10,
+        max=1000
+    )
+    
+    load_undo_push: BoolProperty(
+        name="Push Undo Step on Load",
+        description="Also push a global undo step when loading a state. "
+                    "This can be slow and memory heavy in large files; "
+                    "'Revert Last Load' works without it",
+        default=False
+    )
+    
+    revert_buffer_size: IntProperty(
+        name="Revert Buffer Size",
+        description="Number of state loads that can be reverted",
+        default=DEFAULT_REVERT_BUFFER_SIZE,
+        min=1,
+        max=100
+    )
+    
+    history_depth: IntProperty(
+        name="Versions Kept",
+        description="Number of previous versions kept per state when it is updated or overwritten. "
+                    "Versions only store the objects that changed",
+        default=DEFAULT_HISTORY_DEPTH,
+        min=0,
+        max=100
+    )
+    
+    compression_policy: EnumProperty(
+        name="Compression",
+        description="How the objects of each state are compressed. Every state is compressed on its own, "
+                    "so loading one state never decompresses the others",
+        items=COMPRESSION_POLICIES,
+        default='BALANCED'
+    )
+    
+    use_local_cache: BoolProperty(
+        name="Cache States File Locally",
+        description="Keep a local copy of the states file so it is only read from "
+                    "network storage again after another session changed it",
+        default=True
+    )
+    
+    developer_tools: BoolProperty(
+        name="Developer Tools",
+        description="Show the profiler in the Performance panel, to attach reproducible "
+                    "performance reports to bug reports",
+        default=False
+    )
+    
+    library_directory: StringProperty(
+        name="Library Directory",
+        description="Shared directory of states files to import states from and publish states to",
+        subtype='DIR_PATH',
+        default=""
+    )
+    
+    auto_snapshot_enabled: BoolProperty(
+        name="Automatic Snapshots",
+        description="Periodically save 'auto-NNN' states when the scene changed",
+        default=False,
+        update=update_auto_snapshot_timer
+    )
+    
+    auto_snapshot_interval: IntProperty(
+        name="Interval (s)",
+        description="Seconds between checks for scene changes",
+        default=300,
+        min=10,
+        max=86400
+    )
+    
+    auto_snapshot_budget_ms: IntProperty(
+        name="Time Budget (ms)",
+        description="Snapshots that take longer than this stretch the interval proportionally",
+        default=250,
+        min=0
+    )
+    
+    auto_snapshot_keep_last: IntProperty(
+        name="Keep Last",
+        description="Number of most recent snapshots to keep",
+        default=10,
+        min=1
+    )
+    
+    auto_snapshot_keep_hourly: IntProperty(
+        name="Keep Hourly",
+        description="Number of hours for which the newest snapshot is kept",
+        default=24,
+        min=0
+    )
+    
+    auto_snapshot_keep_daily: IntProperty(
+        name="Keep Daily",
+        description="Number of days for which the newest snapshot is kept",
+        default=7,
+        min=0
+    )
+    
+    def draw(self, context):
+        """Draw the preferences panel."""
+        layout = self.layout
+        
+        box = layout.box()
+        box.label(text="Performance Settings:")
+        box.prop(self, "show_performance_warnings")
+        box.prop(self, "performance_threshold")
+        box.prop(self, "developer_tools")
+        
+        box = layout.box()
+        box.label(text="Loading:")
+        box.prop(self, "load_undo_push")
+        box.prop(self, "revert_buffer_size")
+        box.prop(self, "history_depth")
+        
+        box = layout.box()
+        box.label(text="Storage:")
+        box.prop(self, "compression_policy")
+        box.prop(self, "use_local_cache")
+        box.prop(self, "library_directory")
+        
+        box = layout.box()
+        box.label(text="Automatic Snapshots:")
+        box.prop(self, "auto_snapshot_enabled")
+        col = box.column()
+        col.active = self.auto_snapshot_enabled
+        row = col.row()
+        row.prop(self, "auto_snapshot_interval")
+        row.prop(self, "auto_snapshot_budget_ms")
+        row = col.row()
+        row.prop(self, "auto_snapshot_keep_last")
+        row.prop(self, "auto_snapshot_keep_hourly")
+        row.prop(self, "auto_snapshot_keep_daily")
+
+# ============================================================================
+# STATE LIST
+# ============================================================================
+
+class StateList:
+    """Keeps the UIList collection in sync with the states file."""
+
+    @staticmethod
+    def get_selected_state_name(scene_props) -> Optional[str]:
+        """Get the name of the selected state, or None if nothing valid is selected."""
+        collection = scene_props.state_names_collection
+        index = scene_props.selected_state_index
+
+        if 0 <= index < len(collection):
+            return collection[index].name
+
+        return None
+
+    @staticmethod
+    def get_batch_state_names(scene_props) -> List[str]:
+        """Get the checked state names, falling back to the selected state."""
+        names = [item.name for item in scene_props.state_names_collection if item.selected]
+        if names:
+            return names
+
+        selected_name = StateList.get_selected_state_name(scene_props)
+        return [selected_name] if selected_name else []
+
+    @staticmethod
+    def format_batch_name(pattern: str, state_name: str, number: int) -> str:
+        """Build a new state name from a pattern with {name} and {n} placeholders."""
+        try:
+            new_name = pattern.format(name=state_name, n=number).strip()
+        except (KeyError, IndexError, ValueError) as e:
+            raise ValueError(f"Invalid name pattern '{pattern}': {e}")
+
+        if not new_name:
+            raise ValueError(f"Name pattern '{pattern}' produced an empty name")
+
+        return new_name
+
+    @staticmethod
+    def sync(scene_props) -> None:
+        """Incrementally sync the state collection with the metadata index."""
+        index = state_manager.get_states_index()
+        collection = scene_props.state_names_collection
+        selected_name = StateList.get_selected_state_name(scene_props)
+
+        # Remove stale entries back to front so the remaining indices stay valid
+        for i in range(len(collection) - 1, -1, -1):
+            if collection[i].name not in index:
+                collection.remove(i)
+
+        existing = {item.name: item for item in collection}
+        for state_name, metadata in index.items():
+            item = existing.get(state_name)
+            if item is None:
+                item = collection.add()
+                item.name = state_name
+
+            # Only write changed values to avoid needless property updates
+            if item.created != metadata["created"]:
+                item.created = metadata["created"]
+            if item.updated != metadata["updated"]:
+                item.updated = metadata["updated"]
+            if item.object_count != metadata["object_count"]:
+                item.object_count = metadata["object_count"]
+
+        # Keep the selection on the same state even if its position changed
+        positions = {item.name: i for i, item in enumerate(collection)}
+        if selected_name in positions:
+            new_index = positions[selected_name]
+        else:
+            new_index = min(scene_props.selected_state_index, max(0, len(collection) - 1))
+
+        if scene_props.selected_state_index != new_index:
+            scene_props.selected_state_index = new_index
+
+    @staticmethod
+    def show_diff(scene_props, result: Dict[str, Any], label: str) -> None:
+        """Fill the comparison results; only the largest changes are listed, the rest is summarized."""
+        results = scene_props.diff_results
+        results.clear()
+        for change in result["changed"][:DIFF_RESULT_LIMIT]:
+            item = results.add()
+            item.name = change["name"]
+            item.kind = 'CHANGED'
+            item.magnitude = change["magnitude"]
+            item.channels = ", ".join(change["channels"])
+        for kind in ('ADDED', 'REMOVED'):
+            for name in result[kind.lower()][:DIFF_RESULT_LIMIT]:
+                item = results.add()
+                item.name = name
+                item.kind = kind
+        scene_props.diff_results_index = 0
+
+        scene_props.diff_summary = (
+            f"{label}: {len(result['changed'])} changed, "
+            f"{len(result['added'])} added, {len(result['removed'])} removed, "
+            f"{result['unchanged']} unchanged"
+        )
+
+    @staticmethod
+    def sync_history(scene_props, state_name: str) -> None:
+        """Fill the version list of a state."""
+        scene_props.history_state = state_name
+        scene_props.history_versions.clear()
+        for entry in state_manager.get_state_history(state_name):
+            item = scene_props.history_versions.add()
+            item.name = entry["updated"]
+            item.version = entry["version"]
+            item.changed = entry["changed"]
+        scene_props.history_versions_index = 0
+
+@bpy.app.handlers.persistent
+def load_post_handler(*_args):
+    """Reset per-file runtime data and sync the state lists after a .blend file was loaded."""
+    revert_buffer.clear()
+    
+    for scene in bpy.data.scenes:
+        StateList.sync(scene.scene_state_saver)
+
+# ============================================================================
+# UI LIST
+# ============================================================================
+
+class SCENE_STATE_UL_states_list(bpy.types.UIList):
+    """UIList for displaying scene states."""
+
+    use_filter_regex: BoolProperty(
+        name="Regex",
+        description="Interpret the filter as a regular expression",
+        default=False
+    )
+
+    sort_mode: EnumProperty(
+        name="Sort By",
+        description="Order of the states in the list",
+        items=[
+            ('NONE', "File Order", "Keep the order of the states file"),
+            ('NAME', "Name", "Sort by state name"),
+            ('CREATED', "Created", "Sort by creation time"),
+            ('UPDATED', "Updated", "Sort by last update time"),
+            ('SIZE', "Size", "Sort by number of captured objects"),
+        ],
+        default='NONE'
+    )
+
+    # Item attribute used for each sort mode
+    SORT_ATTRIBUTES = {
+        'CREATED': "created",
+        'UPDATED': "updated",
+        'SIZE': "object_count",
+    }
+
+    def draw_filter(self, context, layout):
+        """Draw the filter and sort options."""
+        row = layout.row(align=True)
+        row.prop(self, "filter_name", text="")
+        row.prop(self, "use_filter_regex", text="", icon='SORTBYEXT')
+        row.prop(self, "use_filter_invert", text="", icon='ARROW_LEFTRIGHT')
+
+        row = layout.row(align=True)
+        row.prop(self, "sort_mode", text="")
+        row.prop(self, "use_filter_sort_reverse", text="", icon='SORT_DESC')
+
+    def filter_items(self, context, data, propname):
+        """Filter by substring or regex and sort by the precomputed metadata."""
+        items = getattr(data, propname)
+        flt_flags = []
+        flt_neworder = []
+
+        if self.filter_name:
+            if self.use_filter_regex:
+                try:
+                    pattern = re.compile(self.filter_name, re.IGNORECASE)
+                    matches = lambda name: pattern.search(name) is not None
+                except re.error:
+                    # Show everything while the expression is still being typed
+                    matches = lambda name: True
+            else:
+                needle = self.filter_name.lower()
+                matches = lambda name: needle in name.lower()
+
+            flt_flags = [self.bitflag_filter_item if matches(item.name) else 0 for item in items]
+
+        if self.sort_mode == 'NAME':
+            flt_neworder = bpy.types.UI_UL_list.sort_items_by_name(items, "name")
+        elif self.sort_mode in self.SORT_ATTRIBUTES:
+            attribute = self.SORT_ATTRIBUTES[self.sort_mode]
+            flt_neworder = bpy.types.UI_UL_list.sort_items_helper(
+                [(i, getattr(item, attribute)) for i, item in enumerate(items)],
+                key=lambda entry: entry[1]
+            )
+
+        return flt_flags, flt_neworder
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        """Draw a single item in the list."""
+        scene_props = context.scene.scene_state_saver
+        state_name = item.name  # item is a StateNameItem with .name property
+        
+        # Check if this is the currently active state
+        is_active = (state_name == scene_props.current_active_state)
+        
+        if self.layout_type in {'DEFAULT', 'COMPACT'}:
+            # Checkbox for batch operations
+            layout.prop(item, "selected", text="")
+            
+            # Show state name with icon
+            if is_active:
+                layout.label(text=state_name, icon='RADIOBUT_ON')
+            else:
+                layout.label(text=state_name, icon='RADIOBUT_OFF')
+        elif self.layout_type in {'GRID'}:
+            layout.alignment = 'CENTER'
+            layout.label(text="", icon='PRESET')
+
+class SCENE_STATE_UL_diff_results(bpy.types.UIList):
+    """UIList for displaying the objects of a state comparison."""
+
+    KIND_ICONS = {
+        'CHANGED': 'MODIFIER',
+        'ADDED': 'ADD',
+        'REMOVED': 'REMOVE',
+    }
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        """Draw a single comparison result."""
+        if self.layout_type in {'DEFAULT', 'COMPACT'}:
+            row = layout.row()
+            row.label(text=item.name, icon=self.KIND_ICONS[item.kind])
+            if item.kind == 'CHANGED':
+                row.label(text=f"{item.magnitude:.3f}  {item.channels}")
+        elif self.layout_type in {'GRID'}:
+            layout.alignment = 'CENTER'
+            layout.label(text="", icon=self.KIND_ICONS[item.kind])
+
+class SCENE_STATE_UL_history(bpy.types.UIList):
+    """UIList for displaying the previous versions of a state."""
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        """Draw a single version."""
+        if self.layout_type in {'DEFAULT', 'COMPACT'}:
+            row = layout.row()
+            row.label(text=f"v-{item.version}  {item.name[:19].replace('T', ' ')}", icon='TIME')
+            sub = row.row()
+            sub.alignment = 'RIGHT'
+            sub.label(text=f"{item.changed} changed")
+        elif self.layout_type in {'GRID'}:
+            layout.alignment = 'CENTER'
+            layout.label(text="", icon='TIME')
+
+class SCENE_STATE_UL_library(bpy.types.UIList):
+    """UIList for displaying the states of the shared library."""
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        """Draw a single library state."""
+        if self.layout_type in {'DEFAULT', 'COMPACT'}:
+            row = layout.row(align=True)
+            row.prop(item, "selected", text="")
+            row.label(text=item.name, icon='ASSET_MANAGER')
+            sub = row.row()
+            sub.alignment = 'RIGHT'
+            sub.label(text=f"{item.scope}  {item.object_count}")
+        elif self.layout_type in {'GRID'}:
+            layout.alignment = 'CENTER'
+            layout.label(text="", icon='ASSET_MANAGER')
+
+# ============================================================================
+# OPERATORS
+# ============================================================================
+
+def report_write_error(operator: Operator) -> None:
+    """Warn in the operator report if background commits of the states file are failing."""
+    write_error = state_manager.get_write_error()
+    if write_error:
+        operator.report({'WARNING'}, f"{WARNING_WRITE_FAILED}: {write_error}")
+
+class SCENE_STATE_OT_save_state(Operator):
+    """Save current scene state."""
+    
+    bl_idname = "scene_state.save_state"
+    bl_label = "Save State"
+    bl_description = "Save current scene state with transforms and visibility"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    def execute(self, context):
+        """Execute the save operation."""
+        try:
+            # Check if blend file is saved
+            if not FileManager.is_blend_file_saved():
+                self.report({'ERROR'}, "Please save your .blend file first")
+                return {'CANCELLED'}
+            
+            # Get state name from scene properties
+            scene_props = context.scene.scene_state_saver
+            state_name = scene_props.new_state_name.strip()
+            
+            # Validate state name
+            if not state_name or state_name == DEFAULT_STATE_NAME:
+                self.report({'ERROR'}, "Please enter a valid state name")
+                return {'CANCELLED'}
+            
+            # Validate the property spec before capturing anything
+            property_spec = scene_props.property_spec.strip()
+            if property_spec:
+                PropertySpec.parse(property_spec)
+            
+            # Save the state
+            # Checked scenes are captured together with the current one
+            scenes = [scene for scene in bpy.data.scenes if scene.scene_state_saver.include_in_capture]
+            if scenes and context.scene not in scenes:
+                scenes.insert(0, context.scene)
+            
+            with profiler.capture("save", state_name):
+                success = state_manager.save_state(state_name, property_spec=property_spec,
+                                                   capture_collections=scene_props.capture_collections,
+                                                   scenes=scenes or None)
+            
+            if success:
+                # Set the newly saved state as the current active state
+                scene_props.current_active_state = state_name
+                self.report({'INFO'}, f"State '{state_name}' saved successfully")
+                report_write_error(self)
+                # Clear the input field
+                scene_props.new_state_name = DEFAULT_STATE_NAME
+                # Refresh the collection after saving
+                bpy.ops.scene_state.refresh_list()
+                return {'FINISHED'}
+            else:
+                self.report({'ERROR'}, f"Failed to save state '{state_name}'")
+                return {'CANCELLED'}
+                
+        except Exception as e:
+            self.report({'ERROR'}, f"Error saving state: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_load_state(Operator):
+    """Load the selected scene state from the list."""
+    
+    bl_idname = "scene_state.load_state"
+    bl_label = "Load State"
+    bl_description = "Load the selected scene state"
+    # No 'UNDO': loads are reverted through the revert buffer, the global
+    # undo push is optional (see preferences)
+    bl_options = {'REGISTER'}
+    
+    def execute(self, context):
+        """Execute the load operation."""
+        try:
+            scene_props = context.scene.scene_state_saver
+            
+            # Resolve the selected state by name so list ordering doesn't matter
+            state_name = StateList.get_selected_state_name(scene_props)
+            if not state_name:
+                self.report({'ERROR'}, "No state selected")
+                return {'CANCELLED'}
+            
+            # Load the state
+            with profiler.capture("load", state_name):
+                success = state_manager.load_state(state_name)
+            
+            if success:
+                # Update current active state
+                scene_props.current_active_state = state_name
+                
+                prefs = get_addon_preferences()
+                if prefs and prefs.load_undo_push:
+                    bpy.ops.ed.undo_push(message=f"Load State '{state_name}'")
+                
+                self.report({'INFO'}, f"State '{state_name}' loaded successfully")
+                return {'FINISHED'}
+            else:
+                self.report({'ERROR'}, f"Failed to load state '{state_name}'")
+                return {'CANCELLED'}
+                
+        except Exception as e:
+            self.report({'ERROR'}, f"Error loading state: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_update_state(Operator):
+    """Update the selected scene state with current scene data."""
+    
+    bl_idname = "scene_state.update_state"
+    bl_label = "Update State"
+    bl_description = "Update the selected scene state with current scene data"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    def execute(self, context):
+        """Execute the update operation."""
+        try:
+            scene_props = context.scene.scene_state_saver
+            
+            # Resolve the selected state by name so list ordering doesn't matter
+            state_name = StateList.get_selected_state_name(scene_props)
+            if not state_name:
+                self.report({'ERROR'}, "No state selected")
+                return {'CANCELLED'}
+            
+            # Update the state
+            with profiler.capture("update", state_name):
+                success = state_manager.update_state(state_name)
+            
+            if success:
+                # Refresh the collection so the updated metadata is sortable
+                bpy.ops.scene_state.refresh_list()
+                self.report({'INFO'}, f"State '{state_name}' updated successfully")
+                report_write_error(self)
+                return {'FINISHED'}
+            else:
+                self.report({'ERROR'}, f"Failed to update state '{state_name}'")
+                return {'CANCELLED'}
+                
+        except Exception as e:
+            self.report({'ERROR'}, f"Error updating state: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_delete_state(Operator):
+    """Delete the selected scene state."""
+    
+    bl_idname = "scene_state.delete_state"
+    bl_label = "Delete State"
+    bl_description = "Delete the selected scene state"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    def invoke(self, context, event):
+        """Show confirmation dialog."""
+        scene_props = context.scene.scene_state_saver
+        
+        # Check that a valid state is selected
+        if not StateList.get_selected_state_name(scene_props):
+            self.report({'ERROR'}, "No state selected")
+            return {'CANCELLED'}
+        
+        return context.window_manager.invoke_confirm(self, event)
+    
+    def execute(self, context):
+        """Execute the delete operation."""
+        try:
+            scene_props = context.scene.scene_state_saver
+            
+            # Resolve the selected state by name so list ordering doesn't matter
+            state_name = StateList.get_selected_state_name(scene_props)
+            if not state_name:
+                self.report({'ERROR'}, "No state selected")
+                return {'CANCELLED'}
+            
+            # Delete the state
+            success = state_manager.delete_state(state_name)
+            
+            if success:
+                # Clear current active state if it was deleted
+                if scene_props.current_active_state == state_name:
+                    scene_props.current_active_state = ""
+                
+                # Refresh the collection after deletion
+                bpy.ops.scene_state.refresh_list()
+                
+                self.report({'INFO'}, f"State '{state_name}' deleted successfully")
+                report_write_error(self)
+                return {'FINISHED'}
+            else:
+                self.report({'ERROR'}, f"Failed to delete state '{state_name}'")
+                return {'CANCELLED'}
+                
+        except Exception as e:
+            self.report({'ERROR'}, f"Error deleting state: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_select_state(Operator):
+    """Select a state in the list."""
+    
+    bl_idname = "scene_state.select_state"
+    bl_label = "Select State"
+    bl_description = "Select this state in the list"
+    bl_options = {'REGISTER'}
+    
+    state_index: IntProperty(
+        name="State Index",
+        description="Index of the state to select"
+    )
+    
+    def execute(self, context):
+        """Execute the selection."""
+        scene_props = context.scene.scene_state_saver
+        scene_props.selected_state_index = self.state_index
+        return {'FINISHED'}
+
+class SCENE_STATE_OT_refresh_list(Operator):
+    """Refresh the states list."""
+    
+    bl_idname = "scene_state.refresh_list"
+    bl_label = "Refresh List"
+    bl_description = "Refresh the states list"
+    bl_options = {'REGISTER'}
+    
+    def execute(self, context):
+        """Execute the refresh operation."""
+        scene_props = context.scene.scene_state_saver
+        
+        # Apply only the differences between the file and the collection
+        with profiler.capture("refresh"):
+            StateList.sync(scene_props)
+        
+        return {'FINISHED'}
+
+class SCENE_STATE_OT_select_all_states(Operator):
+    """Check or uncheck all states for batch operations."""
+
+    bl_idname = "scene_state.select_all_states"
+    bl_label = "Select All States"
+    bl_description = "Check, uncheck or invert the states used by batch operations"
+    bl_options = {'REGISTER'}
+
+    action: EnumProperty(
+        name="Action",
+        items=[
+            ('SELECT', "Select", "Check all states"),
+            ('DESELECT', "Deselect", "Uncheck all states"),
+            ('INVERT', "Invert", "Invert the checked states"),
+        ],
+        default='SELECT'
+    )
+
+    def execute(self, context):
+        """Execute the selection change."""
+        scene_props = context.scene.scene_state_saver
+        for item in scene_props.state_names_collection:
+            if self.action == 'INVERT':
+                item.selected = not item.selected
+            else:
+                item.selected = self.action == 'SELECT'
+        return {'FINISHED'}
+
+class SCENE_STATE_OT_batch_delete(Operator):
+    """Delete all checked states with a single write."""
+
+    bl_idname = "scene_state.batch_delete"
+    bl_label = "Delete Checked States"
+    bl_description = "Delete all checked states"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def invoke(self, context, event):
+        """Show confirmation dialog."""
+        if not StateList.get_batch_state_names(context.scene.scene_state_saver):
+            self.report({'ERROR'}, "No states selected")
+            return {'CANCELLED'}
+
+        return context.window_manager.invoke_confirm(self, event)
+
+    def execute(self, context):
+        """Execute the batch delete."""
+        try:
+            scene_props = context.scene.scene_state_saver
+            state_names = StateList.get_batch_state_names(scene_props)
+            if not state_names:
+                self.report({'ERROR'}, "No states selected")
+                return {'CANCELLED'}
+
+            with state_manager.batch():
+                for state_name in state_names:
+                    if not state_manager.delete_state(state_name):
+                        raise ValueError(f"Failed to delete state '{state_name}'")
+
+            if scene_props.current_active_state in state_names:
+                scene_props.current_active_state = ""
+
+            bpy.ops.scene_state.refresh_list()
+
+            self.report({'INFO'}, f"Deleted {len(state_names)} states")
+            report_write_error(self)
+            return {'FINISHED'}
+
+        except Exception as e:
+            self.report({'ERROR'}, f"Error deleting states: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_batch_duplicate(Operator):
+    """Duplicate all checked states with a single write."""
+
+    bl_idname = "scene_state.batch_duplicate"
+    bl_label = "Duplicate Checked States"
+    bl_description = "Duplicate all checked states using a name pattern"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    name_pattern: StringProperty(
+        name="Name Pattern",
+        description="Name of the copies. {name} is the original name, {n} the running number",
+        default="{name} copy"
+    )
+
+    def invoke(self, context, event):
+        """Ask for the name pattern."""
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        """Execute the batch duplicate."""
+        try:
+            scene_props = context.scene.scene_state_saver
+            state_names = StateList.get_batch_state_names(scene_props)
+            if not state_names:
+                self.report({'ERROR'}, "No states selected")
+                return {'CANCELLED'}
+
+            with state_manager.batch():
+                for number, state_name in enumerate(state_names, start=1):
+                    new_name = StateList.format_batch_name(self.name_pattern, state_name, number)
+                    if not state_manager.duplicate_state(state_name, new_name):
+                        raise ValueError(f"Failed to duplicate state '{state_name}' as '{new_name}'")
+
+            bpy.ops.scene_state.refresh_list()
+
+            self.report({'INFO'}, f"Duplicated {len(state_names)} states")
+            report_write_error(self)
+            return {'FINISHED'}
+
+        except Exception as e:
+            self.report({'ERROR'}, f"Error duplicating states: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_batch_rename(Operator):
+    """Rename all checked states with a single write."""
+
+    bl_idname = "scene_state.batch_rename"
+    bl_label = "Rename Checked States"
+    bl_description = "Rename all checked states using a name pattern"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    name_pattern: StringProperty(
+        name="Name Pattern",
+        description="New names. {name} is the current name, {n} the running number",
+        default="{name}"
+    )
+
+    def invoke(self, context, event):
+        """Ask for the name pattern."""
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        """Execute the batch rename."""
+        try:
+            scene_props = context.scene.scene_state_saver
+            state_names = StateList.get_batch_state_names(scene_props)
+            if not state_names:
+                self.report({'ERROR'}, "No states selected")
+                return {'CANCELLED'}
+
+            renamed = {}
+            for number, state_name in enumerate(state_names, start=1):
+                new_name = StateList.format_batch_name(self.name_pattern, state_name, number)
+                if new_name != state_name:
+                    renamed[state_name] = new_name
+
+            # All names are validated and swapped together in one write
+            if renamed and not state_manager.rename_states(renamed):
+                raise ValueError("Name pattern produced duplicate or existing names")
+
+            if scene_props.current_active_state in renamed:
+                scene_props.current_active_state = renamed[scene_props.current_active_state]
+
+            # Keep the renamed states checked under their new names
+            bpy.ops.scene_state.refresh_list()
+            for item in scene_props.state_names_collection:
+                if item.name in renamed.values():
+                    item.selected = True
+
+            self.report({'INFO'}, f"Renamed {len(renamed)} states")
+            report_write_error(self)
+            return {'FINISHED'}
+
+        except Exception as e:
+            self.report({'ERROR'}, f"Error renaming states: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_batch_update(Operator):
+    """Update all checked states with the current scene using a single capture and write."""
+
+    bl_idname = "scene_state.batch_update"
+    bl_label = "Update Checked States"
+    bl_description = "Update all checked states with current scene data"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def invoke(self, context, event):
+        """Show confirmation dialog."""
+        if not StateList.get_batch_state_names(context.scene.scene_state_saver):
+            self.report({'ERROR'}, "No states selected")
+            return {'CANCELLED'}
+
+        return context.window_manager.invoke_confirm(self, event)
+
+    def execute(self, context):
+        """Execute the batch update."""
+        try:
+            scene_props = context.scene.scene_state_saver
+            state_names = StateList.get_batch_state_names(scene_props)
+            if not state_names:
+                self.report({'ERROR'}, "No states selected")
+                return {'CANCELLED'}
+
+            # The scene is the same for every state, so capture it only once per property spec
+            captured = {}
+
+            with state_manager.batch() as states_data:
+                for state_name in state_names:
+                    state_data = states_data["states"].get(state_name, {})
+                    property_spec = state_data.get("property_spec", "")
+                    if property_spec not in captured:
+                        captured[property_spec] = ObjectCapture.capture_all_objects(property_spec)
+
+                    objects_data = copy.deepcopy(captured[property_spec])
+                    if not state_manager.update_state(state_name, objects_data):
+                        raise ValueError(f"Failed to update state '{state_name}'")
+
+            bpy.ops.scene_state.refresh_list()
+
+            self.report({'INFO'}, f"Updated {len(state_names)} states")
+            report_write_error(self)
+            return {'FINISHED'}
+
+        except Exception as e:
+            self.report({'ERROR'}, f"Error updating states: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_compare_states(Operator):
+    """Compare the selected state with another state or the live scene."""
+
+    bl_idname = "scene_state.compare_states"
+    bl_label = "Compare States"
+    bl_description = "Show which objects differ between the selected state and another state or the live scene"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        """Execute the comparison."""
+        try:
+            scene_props = context.scene.scene_state_saver
+
+            state_name = StateList.get_selected_state_name(scene_props)
+            if not state_name:
+                self.report({'ERROR'}, "No state selected")
+                return {'CANCELLED'}
+
+            other_name = scene_props.compare_state.strip() or LIVE_SCENE_KEY
+            result = state_manager.diff(state_name, other_name)
+            if result is None:
+                self.report({'ERROR'}, f"Failed to compare '{state_name}' with '{other_name}'")
+                return {'CANCELLED'}
+
+            other_label = "live scene" if other_name == LIVE_SCENE_KEY else f"'{other_name}'"
+            StateList.show_diff(scene_props, result, f"'{state_name}' vs {other_label}")
+
+            self.report({'INFO'}, scene_props.diff_summary)
+            return {'FINISHED'}
+
+        except Exception as e:
+            self.report({'ERROR'}, f"Error comparing states: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_revert_last_load(Operator):
+    """Revert the most recent state load."""
+
+    bl_idname = "scene_state.revert_last_load"
+    bl_label = "Revert Last Load"
+    bl_description = "Restore the values overwritten by the most recent state load"
+    bl_options = {'REGISTER'}
+
+    @classmethod
+    def poll(cls, context):
+        return len(revert_buffer) > 0
+
+    def execute(self, context):
+        """Execute the revert."""
+        try:
+            label = revert_buffer.revert_last()
+            if label is None:
+                self.report({'ERROR'}, "Nothing to revert")
+                return {'CANCELLED'}
+
+            # The scene no longer matches the reverted state
+            scene_props = context.scene.scene_state_saver
+            if scene_props.current_active_state == label:
+                scene_props.current_active_state = ""
+
+            print(f"{SUCCESS_LOAD_REVERTED}: {label}")
+            self.report({'INFO'}, f"Reverted load of '{label}'")
+            return {'FINISHED'}
+
+        except Exception as e:
+            self.report({'ERROR'}, f"Error reverting load: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_reset_instrumentation(Operator):
+    """Reset the recorded timings."""
+
+    bl_idname = "scene_state.reset_instrumentation"
+    bl_label = "Reset Timings"
+    bl_description = "Reset the recorded operation timings"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        """Execute the reset."""
+        instrumentation.reset()
+        return {'FINISHED'}
+
+class SCENE_STATE_OT_arm_profiler(Operator):
+    """Arm or disarm the profiler for the next state operation."""
+
+    bl_idname = "scene_state.arm_profiler"
+    bl_label = "Profile Next Operation"
+    bl_description = ("Profile the next save, load, update or refresh with cProfile and tracemalloc "
+                      "and write the report next to the states file")
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        """Execute the arming."""
+        if profiler.armed:
+            profiler.armed = False
+            self.report({'INFO'}, "Profiler disarmed")
+            return {'FINISHED'}
+
+        if not FileManager.is_blend_file_saved():
+            self.report({'ERROR'}, "Please save your .blend file first")
+            return {'CANCELLED'}
+
+        profiler.armed = True
+        self.report({'INFO'}, "The next save, load, update or refresh will be profiled")
+        return {'FINISHED'}
+
+class SCENE_STATE_OT_bake_states(Operator):
+    """Bake a sequence of saved states into keyframes."""
+
+    bl_idname = "scene_state.bake_states"
+    bl_label = "Bake States"
+    bl_description = "Bake a sequence of saved states into transform and visibility keyframes"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        """Execute the bake operation."""
+        try:
+            scene_props = context.scene.scene_state_saver
+
+            # Use the explicit sequence or fall back to all states in list order
+            if scene_props.bake_sequence.strip():
+                sequence = StateBaker.parse_sequence(scene_props.bake_sequence)
+            else:
+                sequence = StateBaker.build_sequence(
+                    [item.name for item in scene_props.state_names_collection],
+                    context.scene.frame_start,
+                    scene_props.bake_frame_step
+                )
+
+            stats = StateBaker.bake_states(sequence, scene_props.bake_interpolation)
+
+            self.report({'INFO'}, f"Baked {len(sequence)} states into {stats['fcurves']} F-curves "
+                                  f"on {stats['objects']} objects")
+            return {'FINISHED'}
+
+        except Exception as e:
+            self.report({'ERROR'}, f"Error baking states: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_list_history(Operator):
+    """List the previous versions of the selected state."""
+
+    bl_idname = "scene_state.list_history"
+    bl_label = "Show History"
+    bl_description = "List the previous versions of the selected state"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        """Execute the history listing."""
+        try:
+            scene_props = context.scene.scene_state_saver
+            state_name = StateList.get_selected_state_name(scene_props)
+            if not state_name:
+                self.report({'ERROR'}, "No state selected")
+                return {'CANCELLED'}
+
+            StateList.sync_history(scene_props, state_name)
+            return {'FINISHED'}
+
+        except Exception as e:
+            self.report({'ERROR'}, f"Error listing history: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_diff_version(Operator):
+    """Preview what restoring a previous version would change."""
+
+    bl_idname = "scene_state.diff_version"
+    bl_label = "Preview Version"
+    bl_description = "Compare the listed state with the active previous version"
+    bl_options = {'REGISTER'}
+
+    @classmethod
+    def poll(cls, context):
+        return len(context.scene.scene_state_saver.history_versions) > 0
+
+    def execute(self, context):
+        """Execute the version comparison."""
+        try:
+            scene_props = context.scene.scene_state_saver
+            version = scene_props.history_versions[scene_props.history_versions_index].version
+
+            result = state_manager.diff_state_version(scene_props.history_state, version)
+            StateList.show_diff(scene_props, result, f"'{scene_props.history_state}' vs v-{version}")
+
+            self.report({'INFO'}, scene_props.diff_summary)
+            return {'FINISHED'}
+
+        except Exception as e:
+            self.report({'ERROR'}, f"Error comparing version: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_restore_version(Operator):
+    """Restore a previous version of a state."""
+
+    bl_idname = "scene_state.restore_version"
+    bl_label = "Restore Version"
+    bl_description = "Make the active previous version current again, keeping the replaced one in the history"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return len(context.scene.scene_state_saver.history_versions) > 0
+
+    def invoke(self, context, event):
+        """Show confirmation dialog."""
+        return context.window_manager.invoke_confirm(self, event)
+
+    def execute(self, context):
+        """Execute the restore."""
+        try:
+            scene_props = context.scene.scene_state_saver
+            state_name = scene_props.history_state
+            version = scene_props.history_versions[scene_props.history_versions_index].version
+
+            if not state_manager.restore_state_version(state_name, version):
+                self.report({'ERROR'}, f"Failed to restore version {version} of '{state_name}'")
+                return {'CANCELLED'}
+
+            # The stored state no longer matches the scene
+            if scene_props.current_active_state == state_name:
+                scene_props.current_active_state = ""
+
+            bpy.ops.scene_state.refresh_list()
+            StateList.sync_history(scene_props, state_name)
+
+            self.report({'INFO'}, f"Restored version {version} of '{state_name}'")
+            report_write_error(self)
+            return {'FINISHED'}
+
+        except Exception as e:
+            self.report({'ERROR'}, f"Error restoring version: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_import_states(Operator):
+    """Import states from another states file."""
+
+    bl_idname = "scene_state.import_states"
+    bl_label = "Import States"
+    bl_description = "Import states from another states file with a single write"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filepath: StringProperty(subtype='FILE_PATH')
+
+    filter_glob: StringProperty(default=f"*{JSON_EXTENSION}", options={'HIDDEN'})
+
+    state_filter: StringProperty(
+        name="States",
+        description="Comma separated names of the states to import. Leave empty to import all states",
+        default=""
+    )
+
+    policy: EnumProperty(
+        name="On Conflict",
+        description="What to do when an imported state has the same name as an existing state",
+        items=CONFLICT_POLICIES,
+        default='SKIP'
+    )
+
+    def invoke(self, context, event):
+        """Open the file browser."""
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        """Execute the import."""
+        try:
+            FileManager.validate_blend_file_saved()
+
+            state_names = [name.strip() for name in self.state_filter.split(",") if name.strip()]
+            with instrumentation.timed("import"):
+                imported = state_manager.import_states(self.filepath, state_names or None, self.policy)
+
+            bpy.ops.scene_state.refresh_list()
+
+            self.report({'INFO'}, f"Imported {len(imported)} states")
+            report_write_error(self)
+            return {'FINISHED'}
+
+        except Exception as e:
+            self.report({'ERROR'}, f"Error importing states: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_refresh_library(Operator):
+    """Re-index the shared library and list its states."""
+
+    bl_idname = "scene_state.refresh_library"
+    bl_label = "Refresh Library"
+    bl_description = "Re-index changed library files and list the states matching the search"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        """Execute the library refresh."""
+        try:
+            directory = StateLibrary.get_directory()
+            if not directory or not os.path.isdir(directory):
+                self.report({'ERROR'}, "Set an existing library directory in the addon preferences")
+                return {'CANCELLED'}
+
+            scene_props = context.scene.scene_state_saver
+
+            with instrumentation.timed("library_index"):
+                state_library.refresh_index(directory)
+            results = state_library.search(directory, scene_props.library_filter.strip())
+
+            # Keep the checked states checked across refreshes
+            checked = {(item.member, item.name) for item in scene_props.library_items if item.selected}
+            scene_props.library_items.clear()
+            for entry in sorted(results, key=lambda entry: (entry["name"].lower(), entry["member"])):
+                item = scene_props.library_items.add()
+                item.name = entry["name"]
+                item.member = entry["member"]
+                item.scope = entry["scope"]
+                item.object_count = entry["object_count"]
+                item.selected = (entry["member"], entry["name"]) in checked
+            scene_props.library_items_index = 0
+
+            return {'FINISHED'}
+
+        except Exception as e:
+            self.report({'ERROR'}, f"Error refreshing library: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_import_library_states(Operator):
+    """Import the checked library states."""
+
+    bl_idname = "scene_state.import_library_states"
+    bl_label = "Import Checked"
+    bl_description = "Import the checked library states into this file's states"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        """Execute the library import."""
+        try:
+            FileManager.validate_blend_file_saved()
+            scene_props = context.scene.scene_state_saver
+
+            selection = {}
+            for item in scene_props.library_items:
+                if item.selected:
+                    selection.setdefault(item.member, []).append(item.name)
+            if not selection:
+                self.report({'ERROR'}, "No library states checked")
+                return {'CANCELLED'}
+
+            with instrumentation.timed("import"):
+                imported = state_library.import_states(
+                    StateLibrary.get_directory(), selection, scene_props.import_conflict_policy
+                )
+
+            bpy.ops.scene_state.refresh_list()
+
+            self.report({'INFO'}, f"Imported {len(imported)} states")
+            report_write_error(self)
+            return {'FINISHED'}
+
+        except Exception as e:
+            self.report({'ERROR'}, f"Error importing library states: {str(e)}")
+            return {'CANCELLED'}
+
+class SCENE_STATE_OT_publish_states(Operator):
+    """Publish the checked states to the shared library."""
+
+    bl_idname = "scene_state.publish_states"
+    bl_label = "Publish Checked"
+    bl_description = "Copy the checked states into this file's entry of the shared library"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        """Execute the publish operation."""
+        try:
+            directory = StateLibrary.get_directory()
+            if not directory or not os.path.isdir(directory):
+                self.report({'ERROR'}, "Set an existing library directory in the addon preferences")
+                return {'CANCELLED'}
+
+            scene_props = context.scene.scene_state_saver
+            state_names = StateList.get_batch_state_names(scene_props)
+            if not state_names:
+                self.report({'ERROR'}, "No states selected")
+                return {'CANCELLED'}
+
+            published = state_library.publish_states(directory, state_names, scene_props.import_conflict_policy)
+            bpy.ops.scene_state.refresh_library()
+
+            self.report({'INFO'}, f"Published {len(published)} states")
+            return {'FINISHED'}
+
+        except Exception as e:
+            self.report({'ERROR'}, f"Error publishing states: {str(e)}")
+            return {'CANCELLED'}
+
+# ============================================================================
+# PANELS
+# ============================================================================
+
+class SCENE_STATE_PT_main_panel(Panel):
+    """Main panel for Scene State Saver in N-Panel."""
+    
+    bl_label = PANEL_LABEL
+    bl_idname = "SCENE_STATE_PT_main_panel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = PANEL_CATEGORY
+    bl_context = "objectmode"
+    
+    def draw(self, context):
+        """Draw the main panel."""
+        layout = self.layout
+        scene = context.scene
+        scene_props = scene.scene_state_saver
+        
+        # Check if .blend file is saved
+        if not FileManager.is_blend_file_saved():
+            box = layout.box()
+            box.label(text="Save .blend file first", icon='ERROR')
+            box.label(text="States require a saved project")
+            return
+        
+        # Show current .blend file info
+        blend_name = FileManager.get_blend_file_name()
+        if blend_name:
+            box = layout.box()
+            box.label(text=f"Project: {blend_name}", icon='FILE_BLEND')
+        
+        # Failed background commits are retried, but the user must know
+        write_error = state_manager.get_write_error()
+        if write_error:
+            box = layout.box()
+            box.alert = True
+            box.label(text="States file not written, retrying", icon='ERROR')
+            box.label(text=write_error)
+        
+        # State creation section
+        box = layout.box()
+        box.label(text="Create New State:", icon='ADD')
+        
+        # State name input
+        row = box.row()
+        row.prop(scene_props, "new_state_name", text="Name")
+        
+        # Extra properties captured on top of transforms and visibility
+        row = box.row()
+        row.prop(scene_props, "property_spec", text="Extra", icon='PROPERTIES')
+        row.prop(scene_props, "capture_collections", text="", icon='OUTLINER_COLLECTION')
+        
+        # Save button
+        row = box.row()
+        row.operator("scene_state.save_state", text="Save State", icon='FILE_TICK')
+        
+        # States list section
+        box = layout.box()
+        row = box.row()
+        row.label(text="Saved States:", icon='PRESET')
+        row.operator("scene_state.refresh_list", text="", icon='FILE_REFRESH', emboss=False)
+        
+        # Get list of saved states (served from the cached metadata index)
+        state_names = state_manager.get_state_names()
+        
+        if state_names:
+            # Native Blender UIList (like in your screenshot)
+            row = box.row()
+            row.template_list(
+                "SCENE_STATE_UL_states_list",  # UIList class
+                "",  # list_id
+                scene_props,  # dataptr (object containing the collection)
+                "state_names_collection",  # propname (collection property name)
+                scene_props,  # active_dataptr (object containing active index)
+                "selected_state_index",  # active_propname (active index property)
+                rows=4,  # Number of visible rows
+                maxrows=8  # Maximum rows before scrolling
+            )
+            
+            # Action buttons below the list
+            row = box.row(align=True)
+            row.operator("scene_state.load_state", text="Load", icon='IMPORT')
+            row.operator("scene_state.update_state", text="Update", icon='FILE_REFRESH')
+            row.operator("scene_state.delete_state", text="Delete", icon='TRASH')
+            box.operator("scene_state.revert_last_load", text="Revert Last Load", icon='LOOP_BACK')
+
+            # Batch operations on the checked states
+            checked_count = sum(1 for item in scene_props.state_names_collection if item.selected)
+            row = box.row(align=True)
+            row.label(text=f"Checked: {checked_count}")
+            row.operator("scene_state.select_all_states", text="", icon='CHECKBOX_HLT').action = 'SELECT'
+            row.operator("scene_state.select_all_states", text="", icon='CHECKBOX_DEHLT').action = 'DESELECT'
+            row = box.row(align=True)
+            row.operator("scene_state.batch_duplicate", text="Duplicate", icon='DUPLICATE')
+            row.operator("scene_state.batch_rename", text="Rename", icon='SORTALPHA')
+            row.operator("scene_state.batch_update", text="Update", icon='FILE_REFRESH')
+            row.operator("scene_state.batch_delete", text="Delete", icon='TRASH')
+
+            # Bake section
+            box = layout.box()
+            box.label(text="Bake to Keyframes:", icon='KEYINGSET')
+            box.prop(scene_props, "bake_sequence", text="")
+            row = box.row(align=True)
+            row.prop(scene_props, "bake_frame_step")
+            row.prop(scene_props, "bake_interpolation", text="")
+            box.operator("scene_state.bake_states", text="Bake States", icon='KEY_HLT')
+
+        else:
+            box.label(text="No states saved yet", icon='INFO')
+
+class SCENE_STATE_PT_compare_panel(Panel):
+    """Sub-panel comparing the selected state with another state or the live scene."""
+
+    bl_label = "Compare"
+    bl_idname = "SCENE_STATE_PT_compare_panel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = PANEL_CATEGORY
+    bl_parent_id = "SCENE_STATE_PT_main_panel"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        """Draw the comparison controls and results."""
+        layout = self.layout
+        scene_props = context.scene.scene_state_saver
+
+        layout.prop_search(scene_props, "compare_state", scene_props, "state_names_collection",
+                           text="With", icon='PRESET')
+        if not scene_props.compare_state:
+            layout.label(text="Comparing with the live scene", icon='SCENE_DATA')
+        layout.operator("scene_state.compare_states", text="Compare", icon='ARROW_LEFTRIGHT')
+
+        if scene_props.diff_summary:
+            layout.label(text=scene_props.diff_summary)
+            layout.template_list(
+                "SCENE_STATE_UL_diff_results", "",
+                scene_props, "diff_results",
+                scene_props, "diff_results_index",
+                rows=5, maxrows=10
+            )
+
+class SCENE_STATE_PT_scenes_panel(Panel):
+    """Sub-panel choosing the scenes captured together in new states."""
+
+    bl_label = "Scenes"
+    bl_idname = "SCENE_STATE_PT_scenes_panel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = PANEL_CATEGORY
+    bl_parent_id = "SCENE_STATE_PT_main_panel"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        """Draw a checkbox per scene."""
+        layout = self.layout
+
+        column = layout.column(align=True)
+        for scene in bpy.data.scenes:
+            column.prop(scene.scene_state_saver, "include_in_capture", text=scene.name,
+                        icon='SCENE_DATA' if scene == context.scene else 'NONE')
+
+        if any(scene.scene_state_saver.include_in_capture for scene in bpy.data.scenes):
+            layout.label(text="New states capture the checked scenes and this one", icon='INFO')
+
+class SCENE_STATE_PT_history_panel(Panel):
+    """Sub-panel listing and restoring previous versions of the selected state."""
+
+    bl_label = "History"
+    bl_idname = "SCENE_STATE_PT_history_panel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = PANEL_CATEGORY
+    bl_parent_id = "SCENE_STATE_PT_main_panel"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        """Draw the version list and its actions."""
+        layout = self.layout
+        scene_props = context.scene.scene_state_saver
+
+        row = layout.row(align=True)
+        row.label(text=scene_props.history_state or "No state listed", icon='PRESET')
+        row.operator("scene_state.list_history", text="", icon='FILE_REFRESH')
+
+        if not scene_props.history_state:
+            return
+
+        if not scene_props.history_versions:
+            layout.label(text="No previous versions", icon='INFO')
+            return
+
+        layout.template_list(
+            "SCENE_STATE_UL_history", "",
+            scene_props, "history_versions",
+            scene_props, "history_versions_index",
+            rows=3, maxrows=8
+        )
+
+        row = layout.row(align=True)
+        row.operator("scene_state.diff_version", text="Preview", icon='ARROW_LEFTRIGHT')
+        row.operator("scene_state.restore_version", text="Restore", icon='RECOVER_LAST')
+
+        if scene_props.diff_summary:
+            layout.label(text=scene_props.diff_summary)
+
+class SCENE_STATE_PT_library_panel(Panel):
+    """Sub-panel for importing states from files and the shared library."""
+
+    bl_label = "Library"
+    bl_idname = "SCENE_STATE_PT_library_panel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = PANEL_CATEGORY
+    bl_parent_id = "SCENE_STATE_PT_main_panel"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        """Draw the import and library controls."""
+        layout = self.layout
+        scene_props = context.scene.scene_state_saver
+
+        layout.operator("scene_state.import_states", text="Import From File...", icon='IMPORT')
+        layout.prop(scene_props, "import_conflict_policy")
+
+        if not StateLibrary.get_directory():
+            layout.label(text="Set a library directory in the preferences", icon='INFO')
+            return
+
+        row = layout.row(align=True)
+        row.prop(scene_props, "library_filter", text="", icon='VIEWZOOM')
+        row.operator("scene_state.refresh_library", text="", icon='FILE_REFRESH')
+
+        layout.template_list(
+            "SCENE_STATE_UL_library", "",
+            scene_props, "library_items",
+            scene_props, "library_items_index",
+            rows=4, maxrows=10
+        )
+
+        row = layout.row(align=True)
+        row.operator("scene_state.import_library_states", text="Import Checked", icon='IMPORT')
+        row.operator("scene_state.publish_states", text="Publish Checked", icon='EXPORT')
+
+class SCENE_STATE_PT_instrumentation_panel(Panel):
+    """Sub-panel showing the recorded operation timings."""
+
+    bl_label = "Performance"
+    bl_idname = "SCENE_STATE_PT_instrumentation_panel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = PANEL_CATEGORY
+    bl_parent_id = "SCENE_STATE_PT_main_panel"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        """Draw the timing table."""
+        layout = self.layout
+        timings = instrumentation.get_timings()
+        values = instrumentation.get_values()
+
+        prefs = get_addon_preferences()
+        if prefs and prefs.developer_tools:
+            box = layout.box()
+            if profiler.armed:
+                box.operator("scene_state.arm_profiler", text="Profiler Armed (Cancel)", icon='REC', depress=True)
+            else:
+                box.operator("scene_state.arm_profiler", text="Profile Next Operation", icon='REC')
+            if profiler.last_report:
+                box.label(text=f"Last report: {os.path.basename(profiler.last_report)}", icon='TEXT')
+
+        if not timings and not values:
+            layout.label(text="No timings recorded yet", icon='INFO')
+            return
+
+        col = layout.column(align=True)
+        for name, stats in timings.items():
+            col.label(text=f"{name}: {stats['last'] * 1000:.1f} ms "
+                           f"(mean {stats['mean'] * 1000:.1f}, max {stats['max'] * 1000:.1f}, "
+                           f"n={stats['count']})")
+        for name, value in values.items():
+            col.label(text=f"{name}: {value:.2f}")
+
+        layout.operator("scene_state.reset_instrumentation", text="Reset", icon='X')
+
+# ============================================================================
+# REGISTRATION
+# ============================================================================
+
+classes = [
+    StateNameItem,
+    DiffResultItem,
+    LibraryItem,
+    HistoryVersionItem,
+    SceneStateProperties,
+    SceneStatePreferences,
+    SCENE_STATE_UL_states_list,
+    SCENE_STATE_UL_diff_results,
+    SCENE_STATE_UL_history,
+    SCENE_STATE_UL_library,
+    SCENE_STATE_OT_save_state,
+    SCENE_STATE_OT_load_state,
+    SCENE_STATE_OT_update_state,
+    SCENE_STATE_OT_delete_state,
+    SCENE_STATE_OT_select_state,
+    SCENE_STATE_OT_refresh_list,
+    SCENE_STATE_OT_select_all_states,
+    SCENE_STATE_OT_batch_delete,
+    SCENE_STATE_OT_batch_duplicate,
+    SCENE_STATE_OT_batch_rename,
+    SCENE_STATE_OT_batch_update,
+    SCENE_STATE_OT_compare_states,
+    SCENE_STATE_OT_revert_last_load,
+    SCENE_STATE_OT_reset_instrumentation,
+    SCENE_STATE_OT_arm_profiler,
+    SCENE_STATE_OT_bake_states,
+    SCENE_STATE_OT_list_history,
+    SCENE_STATE_OT_diff_version,
+    SCENE_STATE_OT_restore_version,
+    SCENE_STATE_OT_import_states,
+    SCENE_STATE_OT_refresh_library,
+    SCENE_STATE_OT_import_library_states,
+    SCENE_STATE_OT_publish_states,
+    SCENE_STATE_PT_main_panel,
+    SCENE_STATE_PT_scenes_panel,
+    SCENE_STATE_PT_compare_panel,
+    SCENE_STATE_PT_history_panel,
+    SCENE_STATE_PT_library_panel,
+    SCENE_STATE_PT_instrumentation_panel,
+]
+
+def register():
+    """Register all addon classes."""
+    try:
+        for cls in classes:
+            bpy.utils.register_class(cls)
+        
+        # Add properties to scene
+        bpy.types.Scene.scene_state_saver = bpy.props.PointerProperty(type=SceneStateProperties)
+        
+        # Keep the state lists in sync when files are opened
+        bpy.app.handlers.load_post.append(load_post_handler)
+        
+        # Background writes must not be lost when Blender quits
+        atexit.register(state_manager.close_stores)
+        
+        # The timer stops itself right away if automatic snapshots are disabled
+        bpy.app.timers.register(auto_snapshot_timer, first_interval=1.0, persistent=True)
+        
+        print(f"Scene State Saver v{bl_info['version'][0]}.{bl_info['version'][1]}.{bl_info['version'][2]} registered successfully")
+        
+    except Exception as e:
+        print(f"Error registering Scene State Saver: {e}")
+        unregister()
+        raise
+
+def unregister():
+    """Unregister all addon classes."""
+    try:
+        # Remove timers and handlers
+        if bpy.app.timers.is_registered(auto_snapshot_timer):
+            bpy.app.timers.unregister(auto_snapshot_timer)
+        
+        if load_post_handler in bpy.app.handlers.load_post:
+            bpy.app.handlers.load_post.remove(load_post_handler)
+        
+        state_manager.close_stores()
+        atexit.unregister(state_manager.close_stores)
+        
+        # Remove properties from scene
+        if hasattr(bpy.types.Scene, 'scene_state_saver'):
+            del bpy.types.Scene.scene_state_saver
+        
+        for cls in reversed(classes):
+            bpy.utils.unregister_class(cls)
+                
+        print("Scene State Saver unregistered successfully")
+        
+    except Exception as e:
+        print(f"Error unregistering Scene State Saver: {e}")
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def load_states_file(states_path: str) -> Dict[str, Any]:
+    """Load and validate a states file from an explicit path."""
+    with open(states_path, 'r', encoding='utf-8') as f:
+        data = DataHandler.deserialize_from_json(f.read())
+
+    if not DataHandler.validate_states_data(data):
+        raise ValueError(f"Invalid states file format: {states_path}")
+
+    return StateBlocks.wrap_states(data)
+
+def cli_diff(args) -> int:
+    """Print the differences between two states."""
+    if args.states_file:
+        states = load_states_file(args.states_file)["states"]
+        for state_name in (args.state_a, args.state_b):
+            if state_name not in states:
+                print(f"Error: {ERROR_STATE_NOT_FOUND}: {state_name}")
+                return 1
+        start = time.perf_counter()
+        result = StateDiff.diff_objects(states[args.state_a]["objects"], states[args.state_b]["objects"])
+        elapsed = time.perf_counter() - start
+    else:
+        # Use the states file of the opened .blend, which also allows @live
+        start = time.perf_counter()
+        result = state_manager.diff(args.state_a, args.state_b)
+        elapsed = time.perf_counter() - start
+        if result is None:
+            return 1
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+
+    print(f"{args.state_a} -> {args.state_b}: {len(result['changed'])} changed, "
+          f"{len(result['added'])} added, {len(result['removed'])} removed, "
+          f"{result['unchanged']} unchanged ({elapsed * 1000:.1f} ms)")
+    for change in result["changed"][:args.limit]:
+        print(f"  ~ {change['name']}: {change['magnitude']:.4f} ({', '.join(change['channels'])})")
+    for name in result["added"][:args.limit]:
+        print(f"  + {name}")
+    for name in result["removed"][:args.limit]:
+        print(f"  - {name}")
+
+    return 0
+
+def load_cli_callback(spec: str):
+    """Import a 'module:function' callback, e.g. 'farm_hooks:render_state'."""
+    module_name, _, function_name = spec.partition(":")
+    if not module_name or not function_name:
+        raise ValueError(f"Callback must be given as 'module:function', got '{spec}'")
+    return getattr(importlib.import_module(module_name), function_name)
+
+def cli_apply(args) -> int:
+    """Apply states one after another, rendering or calling a user callback after each."""
+    callbacks = []
+    if args.callback:
+        callbacks.append(load_cli_callback(args.callback))
+
+    if args.render:
+        scene = bpy.context.scene
+
+        def render_state(state_name, index):
+            scene.render.filepath = args.output.format(state=bpy.path.clean_name(state_name), index=index)
+            bpy.ops.render.render(write_still=True)
+
+        callbacks.append(render_state)
+
+    def callback(state_name, index):
+        for function in callbacks:
+            function(state_name, index)
+
+    try:
+        reports = BatchRunner.run(args.states or None, callback, args.states_file, not args.full_apply)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        total = sum(report["apply"] for report in reports)
+        print(f"Applied {len(reports)} states in {total * 1000:.1f} ms")
+
+    return 0
+
+def cli_main(argv: List[str]) -> int:
+    """Command line entry point, see run_cli."""
+    parser = argparse.ArgumentParser(prog="scene_state_saver", description=bl_info["description"])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    diff_parser = subparsers.add_parser("diff", help="Show the differences between two states")
+    diff_parser.add_argument("state_a", help=f"First state ('{LIVE_SCENE_KEY}' for the live scene)")
+    diff_parser.add_argument("state_b", help=f"Second state ('{LIVE_SCENE_KEY}' for the live scene)")
+    diff_parser.add_argument("--states-file", help="States file to read instead of the opened .blend file's")
+    diff_parser.add_argument("--limit", type=int, default=50, help="Maximum number of objects listed per kind")
+    diff_parser.add_argument("--json", action="store_true", help="Print the full result as JSON")
+    diff_parser.set_defaults(handler=cli_diff)
+
+    apply_parser = subparsers.add_parser("apply", help="Apply states one after another, e.g. to render each of them")
+    apply_parser.add_argument("states", nargs="*", help="States to apply in order (default: all states)")
+    apply_parser.add_argument("--states-file", help="States file to read instead of the opened .blend file's")
+    apply_parser.add_argument("--render", action="store_true", help="Render a still after applying each state")
+    apply_parser.add_argument("--output", default="//renders/{state}",
+                              help="Render output path, {state} and {index} are replaced (default: %(default)s)")
+    apply_parser.add_argument("--callback", help="Function called after each state, as 'module:function'; "
+                                                 "it receives the state name and index")
+    apply_parser.add_argument("--full-apply", action="store_true",
+                              help="Apply every object of every state, also when unchanged since the previous state")
+    apply_parser.add_argument("--json", action="store_true", help="Print the per-state timings as JSON")
+    apply_parser.set_defaults(handler=cli_apply)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+def run_cli() -> None:
+    """Run the command given after '--' and exit, used as:
+    blender -b [file.blend] --python-expr "import scene_state_saver; scene_state_saver.run_cli()" -- <command>
+    """
+    # Arguments after '--' are meant for the addon
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    sys.exit(cli_main(argv))
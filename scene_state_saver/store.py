@@ -0,0 +1,1179 @@
+"""
+Scene State Saver - States Storage
+The storage layer of Scene State Saver: states data, compressed state blocks,
+the shared states file store and the states file scanner.
+
+This module does not use bpy, so it can be used and tested outside of Blender,
+e.g. with several plain processes writing the same states file.
+
+Author: Scene State Saver Team
+Version: 1.0.0
+License: GPL-3.0
+"""
+
+import json
+import copy
+import datetime
+import os
+import re
+import contextlib
+import collections
+import itertools
+import hashlib
+import socket
+import threading
+import base64
+import zlib
+import bz2
+import lzma
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+JSON_EXTENSION = ".json"
+JSON_SCHEMA_VERSION = "1.0"
+
+# Shared Storage Settings
+LOCK_SUFFIX = ".lock"
+LOCK_TIMEOUT = 10.0
+LOCK_STALE_TIMEOUT = 60.0
+LOCK_RETRY_INTERVAL = 0.05
+STORE_REVISION_HISTORY = 8
+INDEX_SUFFIX = ".index"
+STATES_INDEX_VERSION = 1
+HEADER_READ_SIZE = 4096
+ERROR_STATES_LOCKED = "States file is locked by another session"
+WRITE_RETRY_INTERVAL = 2.0
+
+# Compression Settings
+BLOCK_MIN_SIZE = 1024
+BLOCK_LARGE_SIZE = 1 << 20
+BLOCK_MAX_RATIO = 0.9
+
+# ============================================================================
+# INSTRUMENTATION
+# ============================================================================
+
+class Instrumentation:
+    """Collects timings of state operations for the performance panel."""
+
+    def __init__(self):
+        # name -> {"count", "last", "total", "max"} in seconds
+        self._timings = {}
+        # name -> last value of non-timing measurements such as compression ratios
+        self._values = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        """Record one timing sample."""
+        stats = self._timings.setdefault(name, {"count": 0, "last": 0.0, "total": 0.0, "max": 0.0})
+        stats["count"] += 1
+        stats["last"] = seconds
+        stats["total"] += seconds
+        stats["max"] = max(stats["max"], seconds)
+
+    @contextlib.contextmanager
+    def timed(self, name: str):
+        """Context manager that records the duration of its body."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def get_timings(self) -> Dict[str, Dict[str, float]]:
+        """Get all timings including the mean duration."""
+        # Copy first, the background writer may record while the panel draws
+        return {
+            name: dict(stats, mean=stats["total"] / stats["count"])
+            for name, stats in sorted(list(self._timings.items()))
+        }
+
+    def set_value(self, name: str, value: float) -> None:
+        """Record the latest value of a measurement."""
+        self._values[name] = value
+
+    def get_values(self) -> Dict[str, float]:
+        """Get all recorded measurements."""
+        return dict(sorted(list(self._values.items())))
+
+    def reset(self) -> None:
+        """Drop all recorded timings and measurements."""
+        self._timings.clear()
+        self._values.clear()
+
+# Global instance
+instrumentation = Instrumentation()
+
+# ============================================================================
+# FILE IO
+# ============================================================================
+
+class FileIO:
+    """File operations shared by the storage layer and the addon."""
+
+    @staticmethod
+    def get_file_signature(file_path):
+        """Get a cheap (mtime, size) signature of a file, or None if it does not exist."""
+        if not file_path:
+            return None
+
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    @staticmethod
+    def write_file_atomic(file_path, content: bytes):
+        """Write a file through a temporary file and rename, so readers never see partial data."""
+        FileIO.ensure_directory_exists(file_path)
+        # Host and pid keep temporary names unique across machines sharing the directory
+        temp_path = f"{file_path}.{socket.gethostname()}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    @staticmethod
+    def ensure_directory_exists(file_path):
+        """Ensure the directory for the given file path exists."""
+        directory = os.path.dirname(file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+# ============================================================================
+# DATA HANDLER
+# ============================================================================
+
+class DataHandler:
+    """Handles data transformation and validation for state files."""
+    
+    @staticmethod
+    def create_empty_states_data(blend_filename: str) -> Dict[str, Any]:
+        """Create an empty states data structure."""
+        return {
+            "version": JSON_SCHEMA_VERSION,
+            "created": datetime.datetime.now().isoformat(),
+            "blend_file": blend_filename,
+            "states": {}
+        }
+    
+    @staticmethod
+    def create_state_data(objects_data: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Create a state data structure from objects data."""
+        now = datetime.datetime.now().isoformat()
+        return {
+            "created": now,
+            "updated": now,
+            "objects": objects_data
+        }
+    
+    # State fields captured together with the objects, versioned with them
+    VERSIONED_FIELDS = ["collections", "scenes"]
+    
+    @staticmethod
+    def get_state_fields(state_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the versioned fields of a state, None for the ones it doesn't have."""
+        return {name: state_data.get(name) for name in DataHandler.VERSIONED_FIELDS}
+    
+    @staticmethod
+    def update_state_data(state_data: Dict[str, Any], objects_data: Dict[str, Dict[str, Any]],
+                          history_depth: int = 0, fields: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Update existing state data with new objects data, keeping up to history_depth old versions.
+        
+        Fields holds new values of versioned fields, None removing a field; fields that
+        are left out keep their value.
+        """
+        new_fields = dict(DataHandler.get_state_fields(state_data), **(fields or {}))
+        if history_depth > 0:
+            DataHandler.push_state_version(state_data, objects_data, history_depth, new_fields)
+        state_data["updated"] = datetime.datetime.now().isoformat()
+        state_data["objects"] = objects_data
+        for name, value in new_fields.items():
+            if value is None:
+                state_data.pop(name, None)
+            else:
+                state_data[name] = value
+        return state_data
+    
+    @staticmethod
+    def push_state_version(state_data: Dict[str, Any], objects_data: Dict[str, Dict[str, Any]],
+                           history_depth: int, fields: Optional[Dict[str, Any]] = None) -> None:
+        """Record the current objects as the newest version before they are replaced.
+
+        Versions are reverse deltas: each holds only the records that differ from the
+        next newer version (None for objects that did not exist), so unchanged records
+        are shared with the current objects instead of being stored again. Versioned
+        fields that differ from the given new values are stored whole.
+        """
+        old_objects = state_data.get("objects", {})
+        changes = {
+            name: old_objects.get(name)
+            for name in itertools.chain(old_objects, (name for name in objects_data if name not in old_objects))
+            if old_objects.get(name) != objects_data.get(name)
+        }
+        old_fields = DataHandler.get_state_fields(state_data)
+        new_fields = dict(old_fields, **(fields or {}))
+        field_changes = {name: value for name, value in old_fields.items() if value != new_fields[name]}
+        if not changes and not field_changes:
+            return
+        
+        version = {"updated": state_data.get("updated", ""), "changes": changes}
+        if field_changes:
+            version["fields"] = field_changes
+        state_data["history"] = ([version] + state_data.get("history", []))[:history_depth]
+    
+    @staticmethod
+    def get_state_version(state_data: Dict[str, Any], version: int) -> Dict[str, Dict[str, Any]]:
+        """Rebuild the objects of a previous version, 1 being the version before the current one."""
+        history = state_data.get("history", [])
+        if not 1 <= version <= len(history):
+            raise ValueError(f"Version {version} does not exist")
+        
+        objects = dict(state_data["objects"])
+        for delta in history[:version]:
+            for name, record in delta["changes"].items():
+                if record is None:
+                    objects.pop(name, None)
+                else:
+                    objects[name] = record
+        return objects
+    
+    @staticmethod
+    def get_state_version_fields(state_data: Dict[str, Any], version: int) -> Dict[str, Any]:
+        """Rebuild the versioned fields of a previous version, None for the ones it didn't have."""
+        history = state_data.get("history", [])
+        if not 1 <= version <= len(history):
+            raise ValueError(f"Version {version} does not exist")
+        
+        fields = DataHandler.get_state_fields(state_data)
+        for delta in history[:version]:
+            fields.update(delta.get("fields", {}))
+        return fields
+    
+    @staticmethod
+    def duplicate_state_data(state_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create an independent copy of a state with fresh timestamps."""
+        duplicate = copy.deepcopy(state_data)
+        now = datetime.datetime.now().isoformat()
+        duplicate["created"] = now
+        duplicate["updated"] = now
+        return duplicate
+    
+    @staticmethod
+    def merge_state(states: Dict[str, Any], state_name: str, state_data: Dict[str, Any], policy: str) -> Optional[str]:
+        """Merge one state into a states dict; returns the name it was stored under, or None if skipped."""
+        if state_name not in states or policy == 'OVERWRITE':
+            states[state_name] = state_data
+            return state_name
+        
+        if policy == 'SKIP':
+            return None
+        
+        if policy == 'NEWER':
+            if state_data.get("updated", "") > states[state_name].get("updated", ""):
+                states[state_name] = state_data
+                return state_name
+            return None
+        
+        if policy == 'RENAME':
+            number = 2
+            while f"{state_name} ({number})" in states:
+                number += 1
+            new_name = f"{state_name} ({number})"
+            states[new_name] = state_data
+            return new_name
+        
+        raise ValueError(f"Unknown conflict policy '{policy}'")
+    
+    @staticmethod
+    def serialize_to_json(data: Dict[str, Any]) -> str:
+        """Serialize data to JSON string."""
+        return json.dumps(data, indent=2, ensure_ascii=False)
+    
+    @staticmethod
+    def deserialize_from_json(json_string: str) -> Dict[str, Any]:
+        """Deserialize JSON string to data."""
+        return json.loads(json_string)
+    
+    @staticmethod
+    def validate_states_data(data: Dict[str, Any]) -> bool:
+        """Validate the structure of states data."""
+        required_keys = ["version", "created", "blend_file", "states"]
+        
+        if not isinstance(data, dict):
+            return False
+        
+        for key in required_keys:
+            if key not in data:
+                return False
+        
+        if not isinstance(data["states"], dict):
+            return False
+        
+        return True
+    
+    @staticmethod
+    def get_state_names(states_data: Dict[str, Any]) -> List[str]:
+        """Get list of state names from states data."""
+        if not DataHandler.validate_states_data(states_data):
+            return []
+        
+        return list(states_data["states"].keys())
+
+    @staticmethod
+    def build_states_index(states_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Build the metadata index (timestamps and object count) of all states."""
+        if not DataHandler.validate_states_data(states_data):
+            return {}
+
+        return {
+            state_name: {
+                "created": state_data.get("created", ""),
+                "updated": state_data.get("updated", ""),
+                "object_count": StateBlocks.object_count(state_data)
+            }
+            for state_name, state_data in states_data["states"].items()
+        }
+
+    @staticmethod
+    def state_exists(states_data: Dict[str, Any], state_name: str) -> bool:
+        """Check if a state exists in the states data."""
+        if not DataHandler.validate_states_data(states_data):
+            return False
+        
+        return state_name in states_data["states"]
+
+    @staticmethod
+    def state_markers(states: Dict[str, Any]) -> Dict[str, str]:
+        """Get the change marker (last update timestamp) of every state."""
+        return {state_name: state_data.get("updated", "") for state_name, state_data in states.items()}
+
+    @staticmethod
+    def merge_concurrent_states(base_markers: Dict[str, str], ours: Dict[str, Any],
+                                theirs: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        """Three-way merge of two concurrently changed states dicts at state granularity.
+
+        A state counts as changed on a side when its marker differs from the common
+        base (including being added or removed). States changed on both sides are
+        conflicts: a modification wins over a removal, otherwise the newer update wins.
+        Returns the merged states and the number of conflicts.
+        """
+        merged = {}
+        conflicts = 0
+
+        for state_name in itertools.chain(ours, (name for name in theirs if name not in ours),
+                                          (name for name in base_markers if name not in ours and name not in theirs)):
+            our_state = ours.get(state_name)
+            their_state = theirs.get(state_name)
+            base_marker = base_markers.get(state_name)
+
+            our_marker = our_state.get("updated", "") if our_state is not None else None
+            their_marker = their_state.get("updated", "") if their_state is not None else None
+
+            if our_marker == base_marker:
+                result = their_state
+            elif their_marker == base_marker or our_marker == their_marker:
+                result = our_state
+            else:
+                conflicts += 1
+                if our_state is None or their_state is None:
+                    result = our_state if their_state is None else their_state
+                else:
+                    result = our_state if our_marker >= their_marker else their_state
+
+            if result is not None:
+                merged[state_name] = result
+
+        return merged, conflicts
+
+# ============================================================================
+# STATE BLOCKS
+# ============================================================================
+
+class LazyState(dict):
+    """State whose objects and history are decoded from their compressed blocks on first access."""
+
+    def __init__(self, entry: Dict[str, Any]):
+        entry = dict(entry)
+        # field -> ("block", block) or ("raw", encoded JSON) of the fields not decoded yet
+        self._encoded = {}
+        # field -> (block, digest of its JSON) of decoded fields, to recognize unchanged data when saving
+        self._decoded_blocks = {}
+        for field, (block_key, raw_key) in StateBlocks.FIELDS.items():
+            if block_key in entry:
+                self._encoded[field] = ("block", entry.pop(block_key))
+            elif raw_key in entry:
+                self._encoded[field] = ("raw", entry.pop(raw_key))
+        super().__init__(entry)
+
+    def __missing__(self, key):
+        if key not in self._encoded:
+            raise KeyError(key)
+
+        kind, value = self._encoded.pop(key)
+        raw = value if kind == "raw" else StateBlocks.decompress(value)
+        decoded = json.loads(raw)
+        if kind == "block":
+            self._decoded_blocks[key] = (value, hashlib.sha1(raw).hexdigest())
+        dict.__setitem__(self, key, decoded)
+        return decoded
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self._encoded
+
+    def __setitem__(self, key, value):
+        self._encoded.pop(key, None)
+        self._decoded_blocks.pop(key, None)
+        dict.__setitem__(self, key, value)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def is_decoded(self, field: str = "objects") -> bool:
+        return dict.__contains__(self, field)
+
+    def __deepcopy__(self, memo):
+        # Copying through __setitem__ would forget the blocks of decoded fields,
+        # so unchanged copies would be compressed again when saved
+        duplicate = LazyState({})
+        memo[id(self)] = duplicate
+        duplicate._encoded = dict(self._encoded)
+        duplicate._decoded_blocks = dict(self._decoded_blocks)
+        for key, value in dict.items(self):
+            dict.__setitem__(duplicate, key, copy.deepcopy(value, memo))
+        return duplicate
+
+class StateBlocks:
+    """Per-state compressed blocks of the objects and history of states.
+
+    Every state is compressed on its own, so listing states and loading one state
+    only decompress what is used. The codec is chosen per block by the policy.
+    """
+
+    # field -> (file key of its block, entry key of its pending encoded JSON)
+    FIELDS = {
+        "objects": ("block", "raw"),
+        "history": ("history_block", "history_raw"),
+    }
+
+    CODECS = {
+        "zlib": zlib.decompress,
+        "bz2": bz2.decompress,
+        "lzma": lzma.decompress,
+    }
+
+    @staticmethod
+    def candidates(raw_size: int, policy: str) -> List[Tuple[str, Any]]:
+        """Get the (codec, compress function) pairs to try for a block."""
+        if policy == 'FAST':
+            return [("zlib", lambda raw: zlib.compress(raw, 1))]
+        if policy == 'SMALLEST':
+            return [
+                ("zlib", lambda raw: zlib.compress(raw, 9)),
+                ("bz2", lambda raw: bz2.compress(raw, 9)),
+                ("lzma", lambda raw: lzma.compress(raw, preset=6)),
+            ]
+        # Large blocks are worth lzma's slower but much stronger compression
+        if raw_size >= BLOCK_LARGE_SIZE:
+            return [("lzma", lambda raw: lzma.compress(raw, preset=1))]
+        return [("zlib", lambda raw: zlib.compress(raw, 6))]
+
+    @staticmethod
+    def compress(raw: bytes, policy: str) -> Optional[Dict[str, Any]]:
+        """Compress encoded objects into a block, or None if it is not worth it."""
+        if policy == 'NONE' or len(raw) < BLOCK_MIN_SIZE:
+            return None
+
+        best_codec, best_data = None, None
+        for codec, compress in StateBlocks.candidates(len(raw), policy):
+            data = compress(raw)
+            if best_data is None or len(data) < len(best_data):
+                best_codec, best_data = codec, data
+
+        if len(best_data) > len(raw) * BLOCK_MAX_RATIO:
+            return None
+
+        return {
+            "codec": best_codec,
+            "raw_size": len(raw),
+            "data": base64.b64encode(best_data).decode("ascii"),
+        }
+
+    @staticmethod
+    def decompress(block: Dict[str, Any]) -> bytes:
+        """Decompress a block back into encoded objects."""
+        decompress = StateBlocks.CODECS.get(block["codec"])
+        if not decompress:
+            raise ValueError(f"Unknown state block codec '{block['codec']}'")
+
+        with instrumentation.timed("decompress"):
+            return decompress(base64.b64decode(block["data"]))
+
+    @staticmethod
+    def encode_json(value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    @staticmethod
+    def object_count(state: Dict[str, Any]) -> int:
+        """Get the object count of a state without decoding its objects."""
+        if isinstance(state, LazyState) and not state.is_decoded():
+            return state.get("object_count", 0)
+        return len(state.get("objects", {}))
+
+    @staticmethod
+    def wrap_state(state: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn a state read from a file into a lazily decoded state if it has blocks."""
+        if any(block_key in state for block_key, _ in StateBlocks.FIELDS.values()):
+            return LazyState(state)
+        return state
+
+    @staticmethod
+    def wrap_states(states_data: Dict[str, Any]) -> Dict[str, Any]:
+        states = states_data["states"]
+        for state_name, state in states.items():
+            states[state_name] = StateBlocks.wrap_state(state)
+        return states_data
+
+    @staticmethod
+    def freeze_state(state: Dict[str, Any]) -> Dict[str, Any]:
+        """Get an immutable entry of a state: metadata plus existing blocks or encoded JSON.
+
+        This is the cheap part of a save and runs on the caller's thread, so later
+        changes to the state cannot race with the background compression.
+        """
+        entry = {key: value for key, value in dict.items(state) if key not in StateBlocks.FIELDS}
+        lazy = isinstance(state, LazyState)
+
+        for field, (block_key, raw_key) in StateBlocks.FIELDS.items():
+            if lazy and field in state._encoded:
+                kind, value = state._encoded[field]
+                entry[block_key if kind == "block" else raw_key] = value
+                continue
+
+            if not dict.__contains__(state, field):
+                continue
+
+            raw = StateBlocks.encode_json(dict.__getitem__(state, field))
+            decoded_block = state._decoded_blocks.get(field) if lazy else None
+            if decoded_block and hashlib.sha1(raw).hexdigest() == decoded_block[1]:
+                entry[block_key] = decoded_block[0]
+            else:
+                entry[raw_key] = raw
+
+        if dict.__contains__(state, "objects"):
+            entry["object_count"] = len(dict.__getitem__(state, "objects"))
+        return entry
+
+    @staticmethod
+    def finish_entry(entry: Dict[str, Any], policy: str, stats: Dict[str, int]) -> Dict[str, Any]:
+        """Turn a frozen entry into its file form, compressing pending fields."""
+        finished = None
+        for field, (block_key, raw_key) in StateBlocks.FIELDS.items():
+            # Existing blocks are only expanded again when compression was turned off
+            if raw_key not in entry and not (policy == 'NONE' and block_key in entry):
+                continue
+
+            if finished is None:
+                finished = dict(entry)
+            raw = finished.pop(raw_key, None)
+            if raw is None:
+                raw = StateBlocks.decompress(finished.pop(block_key))
+
+            block = StateBlocks.compress(raw, policy)
+            if block is None:
+                finished[field] = json.loads(raw)
+            else:
+                finished[block_key] = block
+                stats["raw"] += len(raw)
+                stats["compressed"] += len(block["data"])
+
+        return entry if finished is None else finished
+
+    @staticmethod
+    def entry_metadata(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the metadata of a frozen entry, without its blocks or encoded JSON."""
+        return {
+            key: value for key, value in entry.items()
+            if not any(key in keys for keys in StateBlocks.FIELDS.values())
+        }
+
+# ============================================================================
+# STATES STORE
+# ============================================================================
+
+class StatesStore:
+    """Reads and writes one states file that may be shared over network storage.
+
+    Reads are served from a local copy as long as the remote file signature is
+    unchanged. Writes use optimistic concurrency: every file carries a revision
+    counter, and a commit takes an advisory lock file, merges at state granularity
+    if someone else committed since our data was read, and bumps the revision.
+
+    With background writes, compression and the commit run on a writer thread;
+    until then reads return the pending data, and newer writes supersede older
+    pending ones. Does not use bpy, so concurrent sessions can be exercised from
+    plain processes.
+    """
+
+    def __init__(self, states_path: str, cache_dir: Optional[str] = None,
+                 lock_timeout: float = LOCK_TIMEOUT, stale_timeout: float = LOCK_STALE_TIMEOUT,
+                 background_writes: bool = False):
+        self.states_path = states_path
+        self.lock_path = states_path + LOCK_SUFFIX
+        self.index_path = states_path + INDEX_SUFFIX
+        self.lock_timeout = lock_timeout
+        self.stale_timeout = stale_timeout
+        self.background_writes = background_writes
+
+        self.cache_path = None
+        if cache_dir:
+            key = hashlib.sha1(os.path.abspath(states_path).encode("utf-8")).hexdigest()[:16]
+            self.cache_path = os.path.join(cache_dir, f"{key}{JSON_EXTENSION}")
+
+        # (remote signature, raw bytes) of the last read or written remote content
+        self._cached = None
+        # Revision of the cached content, None until it was parsed
+        self._cached_revision = None
+        # revision -> state markers, the merge bases of data handed out recently
+        self._markers = collections.OrderedDict()
+        # (remote signature, state name -> byte range and metadata) of the last index
+        self._index = None
+
+        # Serializes cache and commit access between the caller and the writer thread
+        self._io_lock = threading.RLock()
+        # (snapshot, policy) waiting for and being written by the writer thread
+        self._condition = threading.Condition()
+        self._pending = None
+        self._in_flight = None
+        self._writer = None
+        self._closing = False
+        self.last_error = None
+
+    def _remember_markers(self, data: Dict[str, Any]) -> None:
+        self._markers[data.get("revision", 0)] = DataHandler.state_markers(data["states"])
+        self._markers.move_to_end(data.get("revision", 0))
+        while len(self._markers) > STORE_REVISION_HISTORY:
+            self._markers.popitem(last=False)
+
+    def _load_local_cache(self) -> None:
+        """Pick up the local copy written by an earlier session."""
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+
+        try:
+            with open(self.cache_path + ".meta", 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(self.cache_path, 'rb') as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return
+
+        if meta.get("path") == self.states_path:
+            self._cached = (tuple(meta["signature"]), content)
+            self._cached_revision = None
+
+    def _store_cache(self, signature, content: bytes, revision: Optional[int] = None) -> None:
+        self._cached = (signature, content)
+        self._cached_revision = revision
+        if not self.cache_path:
+            return
+
+        try:
+            FileIO.write_file_atomic(self.cache_path, content)
+            meta = {"path": self.states_path, "signature": list(signature)}
+            FileIO.write_file_atomic(self.cache_path + ".meta", json.dumps(meta).encode("utf-8"))
+        except OSError as e:
+            # The local copy is only an optimization
+            print(f"Could not write local states cache: {e}")
+
+    def _read_content(self, refresh: bool = False) -> Optional[bytes]:
+        """Get the current remote content, going to the network only if its signature changed
+        or a refresh is requested."""
+        signature = FileIO.get_file_signature(self.states_path)
+        if signature is None:
+            return None
+
+        if self._cached is None:
+            self._load_local_cache()
+
+        if not refresh and self._cached and self._cached[0] == signature:
+            return self._cached[1]
+
+        with instrumentation.timed("remote_read"):
+            with open(self.states_path, 'rb') as f:
+                content = f.read()
+
+        # Re-check, the file may have been replaced while reading
+        if FileIO.get_file_signature(self.states_path) == signature:
+            self._store_cache(signature, content)
+        return content
+
+    def _latest_snapshot(self):
+        with self._condition:
+            return self._pending or self._in_flight
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        """Read the states data, or None if the file does not exist yet."""
+        latest = self._latest_snapshot()
+        if latest:
+            # Not yet committed; keep the base revision so the next write merges correctly
+            snapshot = latest[0]
+            data = dict(snapshot["header"])
+            data["states"] = {name: LazyState(entry) for name, entry in snapshot["entries"].items()}
+            return data
+
+        with self._io_lock:
+            content = self._read_content()
+            if content is None:
+                return None
+
+            data = DataHandler.deserialize_from_json(content.decode("utf-8"))
+            if not DataHandler.validate_states_data(data):
+                raise ValueError("Invalid states file format")
+
+            if self._cached and self._cached[1] is content:
+                self._cached_revision = data.get("revision", 0)
+
+            self._remember_markers(data)
+
+        return StateBlocks.wrap_states(data)
+
+    def _load_sidecar_index(self, signature) -> Optional[Dict[str, Dict[str, Any]]]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                sidecar = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if sidecar.get("version") != STATES_INDEX_VERSION or sidecar.get("signature") != list(signature):
+            return None
+        return sidecar["states"]
+
+    def read_index(self) -> Dict[str, Dict[str, Any]]:
+        """Get the byte range and metadata of every state without parsing any objects.
+
+        The index is shared with other sessions through a sidecar file that is
+        validated against the states file signature, so after a change only the
+        first session scans the file.
+        """
+        latest = self._latest_snapshot()
+        if latest:
+            return {name: StateBlocks.entry_metadata(entry) for name, entry in latest[0]["entries"].items()}
+
+        with self._io_lock:
+            signature = FileIO.get_file_signature(self.states_path)
+            if signature is None:
+                return {}
+
+            if self._index and self._index[0] == signature:
+                return self._index[1]
+
+            states = self._load_sidecar_index(signature)
+            if states is None:
+                content = self._read_content()
+                with instrumentation.timed("index_scan"):
+                    states = StatesFileScanner.scan_bytes(content)["states"]
+
+                # Only an index of content that matched a stable signature can be reused
+                if not (self._cached and self._cached[1] is content):
+                    return states
+                signature = self._cached[0]
+
+                sidecar = {"version": STATES_INDEX_VERSION, "signature": list(signature), "states": states}
+                try:
+                    FileIO.write_file_atomic(self.index_path, json.dumps(sidecar).encode("utf-8"))
+                except OSError as e:
+                    # The sidecar is only an optimization, e.g. for read-only shares
+                    print(f"Could not write states index: {e}")
+
+            self._index = (signature, states)
+            return states
+
+    def read_state(self, state_name: str) -> Optional[Dict[str, Any]]:
+        """Read a single state, or None if it does not exist, parsing only its slice of the file."""
+        latest = self._latest_snapshot()
+        if latest:
+            entry = latest[0]["entries"].get(state_name)
+            return LazyState(entry) if entry is not None else None
+
+        with self._io_lock:
+            # A second attempt re-indexes in case the file was replaced while reading
+            for _ in range(2):
+                index = self.read_index()
+                if state_name not in index:
+                    return None
+
+                start, end = index[state_name]["start"], index[state_name]["end"]
+                signature = self._index[0] if self._index else None
+
+                if signature and self._cached and self._cached[0] == signature:
+                    raw = self._cached[1][start:end]
+                else:
+                    with open(self.states_path, 'rb') as f:
+                        f.seek(start)
+                        raw = f.read(end - start)
+
+                if signature and FileIO.get_file_signature(self.states_path) == signature:
+                    return StateBlocks.wrap_state(json.loads(raw))
+
+        raise IOError(f"States file changed while reading state '{state_name}'")
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Hold the advisory lock file of the states file."""
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            try:
+                # O_EXCL creation is atomic, also on NFSv3 and later
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    age = time.time() - os.stat(self.lock_path).st_mtime
+                except OSError:
+                    continue
+
+                # The holder crashed without releasing the lock
+                if age > self.stale_timeout:
+                    print(f"Removing stale lock file {self.lock_path}")
+                    with contextlib.suppress(OSError):
+                        os.remove(self.lock_path)
+                    continue
+
+                if time.monotonic() > deadline:
+                    raise TimeoutError(ERROR_STATES_LOCKED)
+                time.sleep(LOCK_RETRY_INTERVAL)
+
+        with os.fdopen(fd, 'w') as f:
+            f.write(f"{socket.gethostname()} {os.getpid()}")
+
+        try:
+            yield
+        finally:
+            with contextlib.suppress(OSError):
+                os.remove(self.lock_path)
+
+    def write(self, states_data: Dict[str, Any], policy: str = 'NONE') -> Optional[Dict[str, int]]:
+        """Commit the states data, merging concurrent commits made since it was read.
+
+        Without background writes the commit happens right away, the data's revision
+        is updated and the new revision and number of merged conflicts are returned.
+        Otherwise the data is handed to the writer thread and None is returned.
+        """
+        snapshot = {
+            "header": {key: value for key, value in states_data.items() if key != "states"},
+            "entries": {name: StateBlocks.freeze_state(state) for name, state in states_data["states"].items()},
+        }
+
+        if not self.background_writes:
+            result = self._commit(snapshot, policy)
+            states_data["revision"] = result["revision"]
+            return result
+
+        with self._condition:
+            self._pending = (snapshot, policy)
+            self._condition.notify_all()
+
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writer_loop, name="StatesWriter", daemon=True)
+                self._writer.start()
+
+        return None
+
+    def add_states(self, states: Dict[str, Dict[str, Any]], conflict_policy: str,
+                   compression_policy: str = 'NONE', blend_name: str = "") -> List[str]:
+        """Add states with a conflict policy of DataHandler.merge_state and commit them.
+
+        Concurrent commits, e.g. of several artists publishing to a shared library,
+        are merged like any other write. Returns the names the states were stored under.
+        """
+        states_data = self.read() or DataHandler.create_empty_states_data(blend_name)
+
+        stored_names = []
+        for state_name, state_data in states.items():
+            stored_name = DataHandler.merge_state(states_data["states"], state_name, state_data, conflict_policy)
+            if stored_name:
+                stored_names.append(stored_name)
+
+        if stored_names:
+            self.write(states_data, compression_policy)
+        return stored_names
+
+    def _commit(self, snapshot: Dict[str, Any], policy: str) -> Dict[str, int]:
+        """Compress and write a snapshot under the lock."""
+        start = time.perf_counter()
+        stats = {"raw": 0, "compressed": 0}
+        states = {
+            name: StateBlocks.finish_entry(entry, policy, stats)
+            for name, entry in snapshot["entries"].items()
+        }
+        if stats["raw"]:
+            instrumentation.record("compress", time.perf_counter() - start)
+            instrumentation.set_value("compression_ratio", stats["raw"] / stats["compressed"])
+
+        base_revision = snapshot["header"].get("revision", 0)
+        conflicts = 0
+
+        with self._io_lock, self.lock():
+            content = self._read_content()
+            if content is not None:
+                # Coarse mtimes (e.g. on NFS) can hide another host's same-size commit from
+                # the signature, so the revision is always read from the file itself
+                file_revision = StatesFileScanner.read_header(self.states_path).get("revision", 0)
+
+                # The common case: nobody committed since we last read or wrote the file
+                if (self._cached and self._cached[1] is content and self._cached_revision == base_revision
+                        and file_revision == base_revision):
+                    remote_revision = base_revision
+                else:
+                    remote = DataHandler.deserialize_from_json(content.decode("utf-8"))
+                    if remote.get("revision", 0) != file_revision:
+                        # The local copy is stale although the signature matched
+                        content = self._read_content(refresh=True)
+                        remote = DataHandler.deserialize_from_json(content.decode("utf-8"))
+                    remote_revision = remote.get("revision", 0)
+
+                if remote_revision != base_revision:
+                    # Unknown bases only happen for data created before the file existed
+                    base_markers = self._markers.get(base_revision, {})
+                    states, conflicts = DataHandler.merge_concurrent_states(base_markers, states, remote["states"])
+                    print(f"Merged concurrent changes of revision {remote_revision} "
+                          f"({conflicts} conflicts)")
+            else:
+                remote_revision = 0
+
+            file_data = dict(snapshot["header"], revision=remote_revision + 1, states=states)
+            content = DataHandler.serialize_to_json(file_data).encode("utf-8")
+            FileIO.write_file_atomic(self.states_path, content)
+
+            self._store_cache(FileIO.get_file_signature(self.states_path), content, file_data["revision"])
+            self._remember_markers(file_data)
+
+        return {"revision": file_data["revision"], "conflicts": conflicts}
+
+    def _writer_loop(self) -> None:
+        """Commit pending snapshots in the background, newest first, retrying failures."""
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closing:
+                    self._condition.wait()
+                # Once closed, failing writes are not retried, they would outlive the session
+                if self._pending is None or (self._closing and self.last_error):
+                    self._writer = None
+                    self._condition.notify_all()
+                    return
+                self._in_flight, self._pending = self._pending, None
+
+            result = None
+            try:
+                result = self._commit(*self._in_flight)
+                self.last_error = None
+            except Exception as e:
+                print(f"Error writing states file, retrying: {e}")
+                self.last_error = str(e)
+
+            with self._condition:
+                # A newer pending snapshot already contains the failed one's changes
+                if self.last_error and self._pending is None:
+                    self._pending = self._in_flight
+
+                # Snapshots written meanwhile were read from the in-flight one, so the commit
+                # that just landed is their merge base; otherwise its states would look
+                # unchanged by us and survive deletions and renames
+                if result and self._pending:
+                    pending_header = self._pending[0]["header"]
+                    if pending_header.get("revision", 0) == self._in_flight[0]["header"].get("revision", 0):
+                        pending_header["revision"] = result["revision"]
+                self._in_flight = None
+                self._condition.notify_all()
+
+            if self.last_error:
+                time.sleep(WRITE_RETRY_INTERVAL)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all pending writes are committed."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._pending is None and self._in_flight is None, timeout
+            )
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Stop the writer thread once the pending writes are committed or have failed once.
+
+        Returns False if it was still running after the timeout.
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: self._writer is None, timeout)
+
+# ============================================================================
+# STATES FILE SCANNER
+# ============================================================================
+
+class StatesFileScanner:
+    """Finds the byte range and metadata of every state in a states file without building its objects."""
+
+    WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+    # Nested values are skipped by the C decoder; the hook turns every object into its
+    # member count instead of a dict, so skipping 'objects' also yields the object count
+    _skip_decoder = json.JSONDecoder(object_pairs_hook=len)
+
+    @staticmethod
+    def _skip_whitespace(text: str, pos: int) -> int:
+        return StatesFileScanner.WHITESPACE.match(text, pos).end()
+
+    @staticmethod
+    def _iter_members(data: bytes, text: str, pos: int):
+        """Yield (key, value start) of the JSON object at pos; the consumer must send back the value end."""
+        pos = StatesFileScanner._skip_whitespace(text, pos)
+        if text[pos] != "{":
+            raise ValueError(f"Expected object at offset {pos}")
+
+        pos = StatesFileScanner._skip_whitespace(text, pos + 1)
+        if text[pos] == "}":
+            return pos + 1
+
+        while True:
+            _, key_end = json.decoder.scanstring(text, pos + 1)
+            # Keys are decoded from the raw bytes, the latin-1 text is only used for offsets
+            key = json.loads(data[pos:key_end])
+
+            pos = StatesFileScanner._skip_whitespace(text, key_end)
+            if text[pos] != ":":
+                raise ValueError(f"Expected ':' at offset {pos}")
+            value_start = StatesFileScanner._skip_whitespace(text, pos + 1)
+
+            value_end = yield key, value_start
+
+            pos = StatesFileScanner._skip_whitespace(text, value_end)
+            if text[pos] == "}":
+                return pos + 1
+            if text[pos] != ",":
+                raise ValueError(f"Expected ',' or '}}' at offset {pos}")
+            pos = StatesFileScanner._skip_whitespace(text, pos + 1)
+
+    @staticmethod
+    def _walk(data: bytes, text: str, pos: int, handle_value) -> int:
+        """Walk the members of the object at pos; handle_value(key, start) returns the value end."""
+        members = StatesFileScanner._iter_members(data, text, pos)
+        try:
+            key, value_start = next(members)
+            while True:
+                key, value_start = members.send(handle_value(key, value_start))
+        except StopIteration as stop:
+            return stop.value
+
+    @staticmethod
+    def scan_bytes(data: bytes) -> Dict[str, Any]:
+        """Scan states file content.
+
+        Returns {"header": {top-level scalars}, "states": {name: {"start", "end",
+        "object_count", <scalar metadata such as created/updated>}}} where start/end
+        are the byte offsets of the state's JSON object.
+        """
+        # latin-1 maps every byte to one character, so text offsets are byte offsets
+        text = data.decode("latin-1")
+        header = {}
+        states = {}
+
+        def skip_value(start):
+            value, end = StatesFileScanner._skip_decoder.raw_decode(text, start)
+            return value, end
+
+        def handle_state_member(entry):
+            def handle(key, start):
+                if text[start] in "{[":
+                    count, end = skip_value(start)
+                    if key == "objects":
+                        entry["object_count"] = count
+                    return end
+                _, end = skip_value(start)
+                entry.setdefault(key, json.loads(data[start:end]))
+                return end
+            return handle
+
+        def handle_state(state_name, start):
+            # Compressed states store their object count as metadata
+            entry = {"start": start}
+            end = StatesFileScanner._walk(data, text, start, handle_state_member(entry))
+            entry.setdefault("object_count", 0)
+            entry.setdefault("created", "")
+            entry.setdefault("updated", "")
+            entry["end"] = end
+            states[state_name] = entry
+            return end
+
+        def handle_top_level(key, start):
+            if key == "states":
+                return StatesFileScanner._walk(data, text, start, handle_state)
+            _, end = skip_value(start)
+            if text[start] not in "{[":
+                header[key] = json.loads(data[start:end])
+            return end
+
+        StatesFileScanner._walk(data, text, StatesFileScanner._skip_whitespace(text, 0), handle_top_level)
+        return {"header": header, "states": states}
+
+    @staticmethod
+    def _scan_header(data: bytes) -> Dict[str, Any]:
+        """Get the top-level scalars that precede 'states'; raises ValueError or IndexError
+        if the data ends before 'states'."""
+        text = data.decode("latin-1")
+        header = {}
+
+        members = StatesFileScanner._iter_members(data, text, StatesFileScanner._skip_whitespace(text, 0))
+        try:
+            key, start = next(members)
+            while key != "states":
+                _, end = StatesFileScanner._skip_decoder.raw_decode(text, start)
+                if text[start] not in "{[":
+                    header[key] = json.loads(data[start:end])
+                key, start = members.send(end)
+        except StopIteration:
+            pass
+        return header
+
+    @staticmethod
+    def read_header(file_path: str) -> Dict[str, Any]:
+        """Read the top-level scalars that precede 'states', reading only the start of the file."""
+        size = HEADER_READ_SIZE
+        with open(file_path, 'rb') as f:
+            while True:
+                f.seek(0)
+                data = f.read(size)
+                try:
+                    return StatesFileScanner._scan_header(data)
+                except (ValueError, IndexError):
+                    # Cut off inside the header, read more unless this was the whole file
+                    if len(data) < size:
+                        raise
+                    size *= 4
+
+    @staticmethod
+    def scan_file(file_path: str) -> Dict[str, Any]:
+        """Scan a states file from disk."""
+        with open(file_path, 'rb') as f:
+            return StatesFileScanner.scan_bytes(f.read())
+
+    @staticmethod
+    def read_states(file_path: str, ranges: Dict[str, Tuple[int, int]]) -> Dict[str, Dict[str, Any]]:
+        """Read and parse only the given states, each from its own byte range."""
+        states = {}
+        with open(file_path, 'rb') as f:
+            for state_name, (start, end) in sorted(ranges.items(), key=lambda item: item[1][0]):
+                f.seek(start)
+                states[state_name] = StateBlocks.wrap_state(json.loads(f.read(end - start)))
+        return states
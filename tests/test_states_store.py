@@ -0,0 +1,451 @@
+"""
+Tests of the bpy-free storage layer: concurrent sessions sharing one states file
+are run as plain processes.
+"""
+
+import copy
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+# The store is imported on its own, the addon package itself needs bpy
+PACKAGE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scene_state_saver")
+sys.path.insert(0, PACKAGE_DIRECTORY)
+
+from store import DataHandler, LazyState, StateBlocks, StatesFileScanner, StatesStore, INDEX_SUFFIX, LOCK_SUFFIX
+
+# One session: read the states, add a state, commit, repeated
+SESSION_SCRIPT = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from store import DataHandler, StatesStore
+
+states_path, cache_dir, session, count = sys.argv[2], sys.argv[3], sys.argv[4], int(sys.argv[5])
+store = StatesStore(states_path, cache_dir)
+for i in range(count):
+    states_data = store.read() or DataHandler.create_empty_states_data("shot")
+    objects = {"Cube": {"location": [float(i), 0.0, 0.0]}}
+    states_data["states"][f"{session}-{i}"] = DataHandler.create_state_data(objects)
+    store.write(states_data, 'FAST')
+"""
+
+# One artist: publish states to a library member file one at a time
+PUBLISH_SCRIPT = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from store import DataHandler, StatesStore
+
+member_path, artist, count = sys.argv[2], sys.argv[3], int(sys.argv[4])
+for i in range(count):
+    state = DataHandler.create_state_data({"Cube": {"location": [float(i), 0.0, 0.0]}})
+    StatesStore(member_path).add_states({f"{artist}-{i}": state}, 'RENAME', 'FAST', "shot")
+"""
+
+
+def make_objects(count, offset=0.0):
+    """Build objects data with unicode names, large enough to be compressed."""
+    return {f"Würfel.{i:03d}": {"location": [i + offset, 0.0, 0.0], "hide_render": False} for i in range(count)}
+
+
+def make_states_data(**states):
+    """Build states data with the given name -> 'updated' states."""
+    states_data = DataHandler.create_empty_states_data("shot")
+    for state_name, updated in states.items():
+        states_data["states"][state_name] = {"created": updated, "updated": updated, "objects": {}}
+    return states_data
+
+
+class ConcurrentSessionsTest(unittest.TestCase):
+    """Several sessions committing to the same states file."""
+
+    SESSIONS = 6
+    STATES_PER_SESSION = 15
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.states_path = os.path.join(self.directory.name, "shot_states.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_concurrent_processes_keep_all_states(self):
+        processes = [
+            subprocess.Popen([
+                sys.executable, "-c", SESSION_SCRIPT, PACKAGE_DIRECTORY, self.states_path,
+                os.path.join(self.directory.name, f"cache-{session}"), f"s{session}",
+                str(self.STATES_PER_SESSION),
+            ])
+            for session in range(self.SESSIONS)
+        ]
+        for process in processes:
+            self.assertEqual(process.wait(timeout=120), 0)
+
+        with open(self.states_path, encoding="utf-8") as f:
+            file_data = json.load(f)
+
+        expected = {f"s{session}-{i}" for session in range(self.SESSIONS) for i in range(self.STATES_PER_SESSION)}
+        self.assertEqual(set(file_data["states"]), expected)
+        self.assertGreaterEqual(file_data["revision"], len(expected))
+        self.assertFalse(os.path.exists(self.states_path + LOCK_SUFFIX))
+
+    def test_stale_lock_is_broken(self):
+        with open(self.states_path + LOCK_SUFFIX, "w") as f:
+            f.write("crashed-host 1")
+        old = time.time() - 120
+        os.utime(self.states_path + LOCK_SUFFIX, (old, old))
+
+        store = StatesStore(self.states_path, stale_timeout=60)
+        store.write(make_states_data(A="2024-01-01T00:00:00"))
+        self.assertEqual(set(store.read()["states"]), {"A"})
+
+    def test_held_lock_times_out(self):
+        with open(self.states_path + LOCK_SUFFIX, "w") as f:
+            f.write("other-host 1")
+
+        store = StatesStore(self.states_path, lock_timeout=0.2)
+        with self.assertRaises(TimeoutError):
+            store.write(make_states_data(A="2024-01-01T00:00:00"))
+
+    def test_commit_hidden_from_file_signature_is_merged(self):
+        StatesStore(self.states_path).write(make_states_data(A="2024-01-01T00:00:00", B="2024-01-01T00:00:00"))
+        ours = StatesStore(self.states_path)
+        ours_data = ours.read()
+        signature = os.stat(self.states_path)
+
+        # Another host commits a same-size file within the mtime granularity
+        theirs = StatesStore(self.states_path)
+        theirs_data = theirs.read()
+        theirs_data["states"]["A"]["updated"] = "2024-01-02T00:00:00"
+        theirs.write(theirs_data)
+        self.assertEqual(os.stat(self.states_path).st_size, signature.st_size)
+        os.utime(self.states_path, ns=(signature.st_atime_ns, signature.st_mtime_ns))
+
+        ours_data["states"]["B"]["updated"] = "2024-01-03T00:00:00"
+        ours.write(ours_data)
+
+        states = StatesStore(self.states_path).read()["states"]
+        self.assertEqual(states["A"]["updated"], "2024-01-02T00:00:00")
+        self.assertEqual(states["B"]["updated"], "2024-01-03T00:00:00")
+
+    def test_delete_during_background_commit(self):
+        StatesStore(self.states_path).write(make_states_data(A="2024-01-01T00:00:00"))
+        store = StatesStore(self.states_path, background_writes=True)
+
+        # Another host holds the lock, so the first commit stays in flight
+        with open(self.states_path + LOCK_SUFFIX, "w") as f:
+            f.write("other-host 1")
+        states_data = store.read()
+        states_data["states"]["X"] = make_states_data(X="2024-01-02T00:00:00")["states"]["X"]
+        store.write(states_data)
+        deadline = time.monotonic() + 5
+        while store._in_flight is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        states_data = store.read()
+        del states_data["states"]["X"]
+        store.write(states_data)
+
+        os.remove(self.states_path + LOCK_SUFFIX)
+        self.assertTrue(store.flush(10))
+        self.assertIsNone(store.last_error)
+        self.assertEqual(set(StatesStore(self.states_path).read()["states"]), {"A"})
+
+    def test_close_commits_and_stops_writer(self):
+        store = StatesStore(self.states_path, background_writes=True)
+        store.write(make_states_data(A="2024-01-01T00:00:00"))
+        writer = store._writer
+
+        self.assertTrue(store.close(10))
+        writer.join(10)
+        self.assertFalse(writer.is_alive())
+        self.assertEqual(set(StatesStore(self.states_path).read()["states"]), {"A"})
+
+
+class LibraryPublishTest(unittest.TestCase):
+    """Several artists publishing to the same library member file."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.member_path = os.path.join(self.directory.name, "shot_states.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_concurrent_publishers_keep_all_states(self):
+        processes = [
+            subprocess.Popen([sys.executable, "-c", PUBLISH_SCRIPT, PACKAGE_DIRECTORY, self.member_path, artist, "20"])
+            for artist in ("anna", "ben")
+        ]
+        for process in processes:
+            self.assertEqual(process.wait(timeout=120), 0)
+
+        states = StatesStore(self.member_path).read()["states"]
+        self.assertEqual(set(states), {f"{artist}-{i}" for artist in ("anna", "ben") for i in range(20)})
+
+    def test_conflict_policy_applies_to_existing_states(self):
+        store = StatesStore(self.member_path)
+        self.assertEqual(store.add_states(make_states_data(A="2024-01-01T00:00:00")["states"], 'RENAME'), ["A"])
+        self.assertEqual(store.add_states(make_states_data(A="2024-01-02T00:00:00")["states"], 'RENAME'), ["A (2)"])
+        self.assertEqual(store.add_states(make_states_data(A="2024-01-03T00:00:00")["states"], 'SKIP'), [])
+        self.assertEqual(set(StatesStore(self.member_path).read()["states"]), {"A", "A (2)"})
+
+
+class StateBlocksTest(unittest.TestCase):
+    """Compressed per-state blocks and lazily decoded states."""
+
+    def pack(self, state, policy):
+        """Freeze, finish and round-trip a state through JSON, as a commit and a later read do."""
+        entry = StateBlocks.finish_entry(StateBlocks.freeze_state(state), policy, {"raw": 0, "compressed": 0})
+        return StateBlocks.wrap_state(json.loads(json.dumps(entry, ensure_ascii=False)))
+
+    def test_small_state_stays_inline(self):
+        state = self.pack(DataHandler.create_state_data(make_objects(2)), 'BALANCED')
+        self.assertNotIsInstance(state, LazyState)
+        self.assertEqual(state["objects"], make_objects(2))
+
+    def test_compressed_round_trip(self):
+        for policy in ('FAST', 'BALANCED', 'SMALLEST'):
+            with self.subTest(policy=policy):
+                state = self.pack(DataHandler.create_state_data(make_objects(200)), policy)
+                self.assertIsInstance(state, LazyState)
+                self.assertFalse(state.is_decoded())
+                self.assertEqual(StateBlocks.object_count(state), 200)
+                self.assertEqual(state["objects"], make_objects(200))
+                self.assertTrue(state.is_decoded())
+
+    def test_none_policy_expands_blocks(self):
+        entry = StateBlocks.freeze_state(self.pack(DataHandler.create_state_data(make_objects(200)), 'FAST'))
+        self.assertIn("block", entry)
+
+        finished = StateBlocks.finish_entry(entry, 'NONE', {"raw": 0, "compressed": 0})
+        self.assertNotIn("block", finished)
+        self.assertEqual(finished["objects"], make_objects(200))
+
+    def test_unchanged_block_is_reused(self):
+        state = self.pack(DataHandler.create_state_data(make_objects(200)), 'FAST')
+        block = StateBlocks.freeze_state(state)["block"]
+
+        state["objects"]
+        self.assertIs(StateBlocks.freeze_state(state)["block"], block)
+
+        state["objects"]["Würfel.001"]["location"][0] = 5.0
+        entry = StateBlocks.freeze_state(state)
+        self.assertNotIn("block", entry)
+        self.assertIn("raw", entry)
+
+    def test_deepcopy(self):
+        state = self.pack(DataHandler.create_state_data(make_objects(200)), 'FAST')
+        undecoded = copy.deepcopy(state)
+        state["objects"]
+        decoded = copy.deepcopy(state)
+
+        self.assertEqual(undecoded["objects"], make_objects(200))
+        self.assertIn("block", StateBlocks.freeze_state(decoded))
+        decoded["objects"]["Würfel.001"]["location"][0] = 5.0
+        self.assertEqual(state["objects"]["Würfel.001"]["location"][0], 1.0)
+        self.assertNotIn("block", StateBlocks.freeze_state(decoded))
+
+    def test_store_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = StatesStore(os.path.join(directory, "shot_states.json"))
+            states_data = DataHandler.create_empty_states_data("shot")
+            states_data["states"]["Größe ✓"] = DataHandler.create_state_data(make_objects(200))
+            states_data["states"]["small"] = DataHandler.create_state_data(make_objects(1))
+            store.write(states_data, 'SMALLEST')
+
+            states = StatesStore(store.states_path).read()["states"]
+            self.assertEqual(states["Größe ✓"]["objects"], make_objects(200))
+            self.assertEqual(states["small"]["objects"], make_objects(1))
+
+
+class StateHistoryTest(unittest.TestCase):
+    """Previous versions of states kept as reverse deltas."""
+
+    def test_versions_round_trip(self):
+        versions = [make_objects(5, offset) for offset in (0.0, 1.0, 2.0)]
+        state = DataHandler.create_state_data(versions[0])
+        for objects in versions[1:]:
+            DataHandler.update_state_data(state, objects, 5)
+
+        self.assertEqual(state["objects"], versions[2])
+        self.assertEqual(DataHandler.get_state_version(state, 1), versions[1])
+        self.assertEqual(DataHandler.get_state_version(state, 2), versions[0])
+
+    def test_delta_holds_only_changes(self):
+        objects = make_objects(5)
+        changed = copy.deepcopy(objects)
+        changed["Würfel.001"]["location"][0] = 9.0
+        del changed["Würfel.002"]
+        changed["Kegel"] = {"location": [0.0, 0.0, 0.0]}
+
+        state = DataHandler.create_state_data(objects)
+        DataHandler.update_state_data(state, changed, 5)
+
+        self.assertEqual(state["history"][0]["changes"], {
+            "Würfel.001": objects["Würfel.001"], "Würfel.002": objects["Würfel.002"], "Kegel": None,
+        })
+        self.assertEqual(DataHandler.get_state_version(state, 1), objects)
+
+    def test_unchanged_update_adds_no_version(self):
+        state = DataHandler.create_state_data(make_objects(5))
+        DataHandler.update_state_data(state, make_objects(5), 5)
+        self.assertNotIn("history", state)
+
+    def test_depth_limits_versions(self):
+        state = DataHandler.create_state_data(make_objects(3))
+        for offset in range(1, 5):
+            DataHandler.update_state_data(state, make_objects(3, offset), 2)
+
+        self.assertEqual(len(state["history"]), 2)
+        self.assertEqual(DataHandler.get_state_version(state, 2), make_objects(3, 2))
+        with self.assertRaises(ValueError):
+            DataHandler.get_state_version(state, 3)
+        with self.assertRaises(ValueError):
+            DataHandler.get_state_version_fields(state, 0)
+
+    def test_versioned_fields(self):
+        state = DataHandler.create_state_data(make_objects(3))
+        DataHandler.update_state_data(state, make_objects(3), 5, {"collections": {"Props": {"exclude": True}}})
+        DataHandler.update_state_data(state, make_objects(3), 5, {"collections": {"Props": {"exclude": False}}})
+        DataHandler.update_state_data(state, make_objects(3), 5, {"collections": None})
+
+        self.assertNotIn("collections", state)
+        self.assertEqual(DataHandler.get_state_version_fields(state, 1)["collections"], {"Props": {"exclude": False}})
+        self.assertEqual(DataHandler.get_state_version_fields(state, 2)["collections"], {"Props": {"exclude": True}})
+        self.assertIsNone(DataHandler.get_state_version_fields(state, 3)["collections"])
+        self.assertEqual(DataHandler.get_state_version(state, 3), make_objects(3))
+
+    def test_history_survives_compressed_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            states_path = os.path.join(directory, "shot_states.json")
+            states_data = DataHandler.create_empty_states_data("shot")
+            states_data["states"]["A"] = DataHandler.create_state_data(make_objects(200))
+            DataHandler.update_state_data(states_data["states"]["A"], make_objects(200, 1.0), 5)
+            StatesStore(states_path).write(states_data, 'FAST')
+
+            state = StatesStore(states_path).read_state("A")
+            self.assertFalse(state.is_decoded("history"))
+            self.assertEqual(DataHandler.get_state_version(state, 1), make_objects(200))
+
+
+class StatesIndexTest(unittest.TestCase):
+    """Scanning states files and reading single states by byte range."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.states_path = os.path.join(self.directory.name, "shot_states.json")
+
+        self.states_data = DataHandler.create_empty_states_data("shot")
+        self.states_data["states"]["Größe ✓"] = DataHandler.create_state_data(make_objects(200))
+        self.states_data["states"]["small \"quoted\""] = DataHandler.create_state_data(make_objects(2))
+        self.states_data["states"]["empty"] = DataHandler.create_state_data({})
+        StatesStore(self.states_path).write(self.states_data, 'FAST')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_scan_matches_parsed_file(self):
+        with open(self.states_path, 'rb') as f:
+            data = f.read()
+        file_data = json.loads(data)
+
+        # Files written by other tools may escape non-ASCII characters
+        for content in (data, json.dumps(file_data).encode("utf-8")):
+            scanned = StatesFileScanner.scan_bytes(content)
+            self.assertEqual(scanned["header"]["blend_file"], "shot")
+            self.assertEqual(scanned["header"]["revision"], 1)
+            self.assertEqual(set(scanned["states"]), set(self.states_data["states"]))
+
+            for state_name, entry in scanned["states"].items():
+                state = file_data["states"][state_name]
+                self.assertEqual(json.loads(content[entry["start"]:entry["end"]]), state)
+                self.assertEqual(entry["object_count"], len(self.states_data["states"][state_name]["objects"]))
+                self.assertEqual(entry["updated"], state["updated"])
+
+    def test_read_state_matches_full_read(self):
+        states = StatesStore(self.states_path).read()["states"]
+        store = StatesStore(self.states_path)
+        for state_name in self.states_data["states"]:
+            self.assertEqual(store.read_state(state_name)["objects"], states[state_name]["objects"])
+        self.assertIsNone(store.read_state("missing"))
+
+    def test_read_state_after_file_changed(self):
+        store = StatesStore(self.states_path)
+        self.assertEqual(store.read_state("empty")["objects"], {})
+
+        other = StatesStore(self.states_path)
+        states_data = other.read()
+        states_data["states"]["empty"] = DataHandler.create_state_data(make_objects(3))
+        other.write(states_data)
+
+        self.assertEqual(store.read_state("empty")["objects"], make_objects(3))
+
+    def test_sidecar_is_shared_while_signature_matches(self):
+        StatesStore(self.states_path).read_index()
+        with open(self.states_path + INDEX_SUFFIX, encoding="utf-8") as f:
+            sidecar = json.load(f)
+        sidecar["states"]["empty"]["object_count"] = 42
+        with open(self.states_path + INDEX_SUFFIX, "w", encoding="utf-8") as f:
+            json.dump(sidecar, f)
+
+        # Another session trusts the sidecar instead of scanning the file
+        self.assertEqual(StatesStore(self.states_path).read_index()["empty"]["object_count"], 42)
+
+    def test_stale_sidecar_is_rebuilt(self):
+        StatesStore(self.states_path).read_index()
+
+        other = StatesStore(self.states_path)
+        states_data = other.read()
+        states_data["states"]["new"] = DataHandler.create_state_data(make_objects(1))
+        other.write(states_data)
+
+        index = StatesStore(self.states_path).read_index()
+        self.assertEqual(index["new"]["object_count"], 1)
+        self.assertEqual(set(index), set(self.states_data["states"]) | {"new"})
+
+        with open(self.states_path + INDEX_SUFFIX, encoding="utf-8") as f:
+            self.assertIn("new", json.load(f)["states"])
+
+
+class MergeRulesTest(unittest.TestCase):
+    """Three-way merge of concurrently changed states."""
+
+    BASE = "2024-01-01T00:00:00"
+
+    def merge(self, ours, theirs):
+        base_markers = DataHandler.state_markers(make_states_data(A=self.BASE, B=self.BASE)["states"])
+        return DataHandler.merge_concurrent_states(
+            base_markers, make_states_data(**ours)["states"], make_states_data(**theirs)["states"]
+        )
+
+    def test_changes_on_different_states_are_kept(self):
+        merged, conflicts = self.merge({"A": "2024-01-02T00:00:00", "B": self.BASE},
+                                       {"A": self.BASE, "B": "2024-01-03T00:00:00", "C": self.BASE})
+        self.assertEqual(conflicts, 0)
+        self.assertEqual(merged["A"]["updated"], "2024-01-02T00:00:00")
+        self.assertEqual(merged["B"]["updated"], "2024-01-03T00:00:00")
+        self.assertIn("C", merged)
+
+    def test_newer_update_wins(self):
+        merged, conflicts = self.merge({"A": "2024-01-03T00:00:00", "B": self.BASE},
+                                       {"A": "2024-01-02T00:00:00", "B": self.BASE})
+        self.assertEqual(conflicts, 1)
+        self.assertEqual(merged["A"]["updated"], "2024-01-03T00:00:00")
+
+    def test_modification_beats_deletion(self):
+        merged, conflicts = self.merge({"B": self.BASE}, {"A": "2024-01-02T00:00:00", "B": self.BASE})
+        self.assertEqual(conflicts, 1)
+        self.assertEqual(merged["A"]["updated"], "2024-01-02T00:00:00")
+
+    def test_deletion_of_unchanged_state_is_kept(self):
+        merged, conflicts = self.merge({"B": self.BASE}, {"A": self.BASE, "B": self.BASE})
+        self.assertEqual(conflicts, 0)
+        self.assertNotIn("A", merged)
+
+
+if __name__ == "__main__":
+    unittest.main()